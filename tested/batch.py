@@ -0,0 +1,196 @@
+"""
+Judge many submissions for the same exercise in a single invocation.
+
+This is intended for re-judging all submissions of an exercise, for example after
+fixing the test suite. The test suite is parsed once, and the parts of a judgement
+that do not depend on the submission (checking the supported features, planning
+the execution units and, where possible, generating the test code) are done once
+and shared between all judgements.
+
+The submissions are judged concurrently by a bounded pool of worker processes, so
+the judgements are isolated from each other. The judgement of each submission is
+written to its own file in the output directory.
+"""
+
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+from argparse import ArgumentParser, FileType
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import StringIO
+from pathlib import Path
+
+from attrs import evolve
+
+from tested.configs import DodonaConfig, create_bundle, read_config
+from tested.judge.core import ExercisePreparation, judge, prepare_exercise
+from tested.main import load_suite
+from tested.testsuite import Suite
+
+_logger = logging.getLogger(__name__)
+
+# The shared state of a worker process, see _initialise_worker.
+_suite: Suite | None = None
+_language: str | None = None
+_preparation: ExercisePreparation | None = None
+
+
+def find_submissions(path: Path) -> list[Path]:
+    """
+    Find the submissions to judge.
+
+    :param path: Either a directory, in which case all files in the directory are
+                 submissions, or a manifest file, containing the path of one
+                 submission per line (relative to the manifest).
+    """
+    if path.is_dir():
+        return sorted(x for x in path.iterdir() if x.is_file())
+    with open(path, "r") as manifest:
+        lines = (line.strip() for line in manifest)
+        return [path.parent / line for line in lines if line]
+
+
+def _initialise_worker(suite: Suite, language: str, preparation: ExercisePreparation):
+    global _suite, _language, _preparation
+    _suite = suite
+    _language = language
+    _preparation = preparation
+
+
+def _judge_submission(config: DodonaConfig, result: Path) -> Path:
+    assert _suite is not None and _preparation is not None
+    with open(result, "w") as out:
+        bundle = create_bundle(config, out, _suite)
+        if bundle.config.programming_language != _language:
+            # The submission selected another language with a shebang.
+            judge(bundle)
+            return result
+        harness = _preparation.harness
+        if harness is not None:
+            # The generated harness contains the secrets, so use the same ones.
+            bundle.global_config.testcase_separator_secret = (
+                harness.testcase_separator_secret
+            )
+            bundle.global_config.context_separator_secret = (
+                harness.context_separator_secret
+            )
+        judge(bundle, _preparation)
+    return result
+
+
+def judge_batch(
+    config: DodonaConfig, submissions: list[Path], output: Path, jobs: int
+) -> list[Path]:
+    """
+    Judge multiple submissions for the same exercise.
+
+    The source in the configuration is ignored. The content of the workdir in the
+    configuration is copied to the workdir of each submission.
+
+    :param config: The configuration of the exercise.
+    :param submissions: The submissions to judge.
+    :param output: The directory in which the judgements are written, as
+                   "<name of the submission>.jsonl". This directory also contains
+                   the workdirs of the judgements.
+    :param jobs: The maximal number of submissions judged at the same time.
+
+    :return: The files containing the judgements.
+    """
+    names = [submission.name for submission in submissions]
+    if len(set(names)) != len(names):
+        raise ValueError("The file names of the submissions must be unique.")
+
+    workdirs = output / "workdirs"
+    workdirs.mkdir(parents=True)
+    suite = load_suite(config)
+
+    # The language is passed explicitly, since the source is not a submission.
+    language = config.programming_language
+    shared_bundle = create_bundle(config, StringIO(), suite, language)
+    preparation = prepare_exercise(shared_bundle, workdirs / "harness")
+
+    configs = []
+    for i, submission in enumerate(submissions):
+        # Copy the submission, since TESTed may modify it (e.g. the shebang).
+        source = workdirs / str(i) / submission.name
+        workdir = workdirs / str(i) / "workdir"
+        workdir.mkdir(parents=True)
+        shutil.copy2(submission, source)
+        if config.workdir.is_dir():
+            shutil.copytree(config.workdir, workdir, dirs_exist_ok=True)
+        configs.append(evolve(config, source=source, workdir=workdir))
+
+    _logger.info(f"Judging {len(submissions)} submissions with {jobs} workers")
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        # Forking shares the suite and the preparation without pickling them.
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_initialise_worker,
+        initargs=(suite, language, preparation),
+    ) as executor:
+        futures = {
+            executor.submit(_judge_submission, c, output / f"{name}.jsonl"): name
+            for c, name in zip(configs, names)
+        }
+        for future in as_completed(futures):
+            results.append(future.result())
+            _logger.info(f"Judged {futures[future]}")
+
+    return sorted(results)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Judge many submissions for the same exercise.")
+    parser.add_argument(
+        "-c",
+        "--config",
+        type=FileType("r"),
+        help="Where to read the config of the exercise from",
+        default="-",
+    )
+    parser.add_argument(
+        "-s",
+        "--submissions",
+        type=Path,
+        help="A directory with submissions or a manifest with one path per line",
+        required=True,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="The directory where the judgements will be written to",
+        required=True,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="The maximal number of concurrent judgements (default: number of CPUs)",
+        default=os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Include verbose logs.",
+    )
+    args = parser.parse_args()
+
+    if args.verbose:
+        log = logging.getLogger()
+        log.setLevel(logging.INFO)
+        ch = logging.StreamHandler(stream=sys.stderr)
+        formatter = logging.Formatter("%(name)s:%(levelname)s:%(message)s")
+        ch.setFormatter(formatter)
+        log.addHandler(ch)
+
+    judge_batch(
+        read_config(args.config),
+        find_submissions(args.submissions),
+        args.output,
+        args.jobs,
+    )
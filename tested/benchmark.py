@@ -0,0 +1,138 @@
+"""
+Benchmarks for the performance-sensitive parts of TESTed that do not show up in the
+normal tests, since they depend on the machine and the file system.
+
+Run ``python -m tested.benchmark --help`` for the available benchmarks.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from tested.configs import DodonaConfig
+from tested.judge.directories import CopyFunction, clone_file, link_file
+from tested.languages import get_language
+from tested.main import run
+from tested.parsing import get_converter
+
+
+def benchmark_directories(files: int, size: int, units: int):
+    """
+    Compare the ways to set up the directories of the execution units, see
+    :mod:`tested.judge.directories`. A workdir with the given number of files of
+    the given size (in bytes) is copied for the given number of units.
+    """
+    strategies: dict[str, CopyFunction] = {
+        "copy": shutil.copy2,
+        "clone": clone_file,
+        "link": link_file,
+    }
+    with tempfile.TemporaryDirectory(dir=".") as directory:
+        workdir = Path(directory, "workdir")
+        workdir.mkdir()
+        data = os.urandom(size)
+        for i in range(files):
+            (workdir / f"data-{i}.bin").write_bytes(data)
+            # Only read-only files are linked.
+            (workdir / f"data-{i}.bin").chmod(0o444)
+        for name, copy_function in strategies.items():
+            start = time.perf_counter()
+            for unit in range(units):
+                destination = Path(directory, f"{name}-{unit}")
+                shutil.copytree(workdir, destination, copy_function=copy_function)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>6}: {elapsed:.3f} s for {units} units")
+
+
+def benchmark_jvm_startup(
+    language: str,
+    exercise: Path,
+    suite: str,
+    solution: str,
+    runs: int,
+):
+    """
+    Compare judging an exercise in Java or Kotlin with and without class data
+    sharing, see :mod:`tested.judge.cds`. The first judgement with class data
+    sharing creates the archive, so it is reported on its own.
+    """
+    extension = get_language(None, language).file_extension()
+    with tempfile.TemporaryDirectory(dir=".") as directory:
+        cache = Path(directory, "cache").absolute()
+        for sharing in (False, True):
+            timings = []
+            for i in range(runs + sharing):
+                workdir = Path(directory, f"{sharing}-{i}")
+                workdir.mkdir()
+                if (files := exercise / "workdir").is_dir():
+                    shutil.copytree(files, workdir, dirs_exist_ok=True)
+                config = {
+                    "memory_limit": 536870912,
+                    "time_limit": 3600,
+                    "programming_language": language,
+                    "natural_language": "en",
+                    "resources": exercise / "evaluation",
+                    "source": exercise / "solution" / f"{solution}.{extension}",
+                    "judge": Path(".").absolute(),
+                    "workdir": workdir,
+                    "test_suite": suite,
+                    "options": {
+                        "linter": False,
+                        "cache_directory": str(cache),
+                        "class_data_sharing": sharing,
+                    },
+                }
+                start = time.perf_counter()
+                run(get_converter().structure(config, DodonaConfig), io.StringIO())
+                timings.append(time.perf_counter() - start)
+            name = "sharing" if sharing else "default"
+            if sharing:
+                print(f"{name:>8}: {timings.pop(0):.3f} s to create the archive")
+            mean = sum(timings) / len(timings)
+            print(f"{name:>8}: {mean:.3f} s per judgement ({runs} judgements)")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Run a benchmark.")
+    benchmarks = parser.add_subparsers(dest="benchmark", required=True)
+
+    directories = benchmarks.add_parser(
+        "directories", help="Compare the ways to set up execution directories."
+    )
+    directories.add_argument(
+        "--files", type=int, default=10, help="Files in the workdir."
+    )
+    directories.add_argument(
+        "--size", type=int, default=10 * 1024 * 1024, help="Size of each file."
+    )
+    directories.add_argument("--units", type=int, default=20, help="Execution units.")
+
+    jvm = benchmarks.add_parser(
+        "jvm", help="Compare starting the JVM with and without class data sharing."
+    )
+    jvm.add_argument("--language", choices=["java", "kotlin"], default="java")
+    jvm.add_argument(
+        "--exercise",
+        type=Path,
+        default=Path("tests/exercises/echo"),
+        help="The exercise to judge.",
+    )
+    jvm.add_argument("--suite", default="full.tson", help="The test suite.")
+    jvm.add_argument("--solution", default="correct", help="The solution.")
+    jvm.add_argument("--runs", type=int, default=5, help="Judgements per variant.")
+
+    args = parser.parse_args()
+    if args.benchmark == "directories":
+        benchmark_directories(args.files, args.size, args.units)
+    elif args.benchmark == "jvm":
+        benchmark_jvm_startup(
+            args.language,
+            args.exercise.absolute(),
+            args.suite,
+            args.solution,
+            args.runs,
+        )
@@ -3,6 +3,7 @@ Module for handling and bundling various configuration options for TESTed.
 """
 
 import logging
+from enum import StrEnum
 from pathlib import Path
 from typing import IO, TYPE_CHECKING, Any, Optional
 
@@ -19,6 +20,17 @@ if TYPE_CHECKING:
 _logger = logging.getLogger(__name__)
 
 
+class ExecutionEngine(StrEnum):
+    """
+    How the execution units are run in parallel.
+    """
+
+    # Every unit that runs has its own thread.
+    THREADS = "threads"
+    # All units are tasks of one event loop, see tested.judge.engine.
+    ASYNCIO = "asyncio"
+
+
 @define(frozen=True)
 class Options:
     """
@@ -32,6 +44,12 @@ class Options:
     disable this for exercises that already are multithreaded. It may also be worth
     investigating if the exercise is computationally heady.
     """
+    engine: ExecutionEngine = ExecutionEngine.THREADS
+    """
+    How the contexts are executed in parallel, if parallel is enabled. With the
+    "asyncio" engine, the execution units do not need a thread each, and they are
+    stopped at once when the time runs out.
+    """
     mode: ExecutionMode = ExecutionMode.PRECOMPILATION
     """
     The default mode for the judge.
@@ -65,6 +83,50 @@ class Options:
     Longer exercises, or exercises where the solution might depend on optimization
     may need this option.
     """
+    cache_directory: Path | None = None
+    """
+    Directory for the caches that are shared between judgements, such as the
+    compilation cache. By default, nothing is cached.
+    """
+    cache_size: int = 512 * 1024 * 1024
+    """
+    The maximal size (in bytes) of each cache in the cache directory. If a cache
+    grows larger, the least recently used entries are removed.
+    """
+    speculative_compilation: float | None = None
+    """
+    If the precompilation failed in at least this fraction of the previous
+    judgements of the exercise, the units of each tab are already compiled on their
+    own while the precompilation runs, instead of after it failed. This uses more
+    CPU time, but saves time for exercises that often fail to compile. Requires a
+    cache directory. By default, this is disabled.
+    """
+    link_workdir_files: bool = False
+    """
+    Hard link the read-only files of the workdir in the directories of the execution
+    units, instead of copying them. This is faster for exercises with large data
+    files: make them read-only to benefit from this. Other files are still copied.
+    """
+    linter_server: bool = False
+    """
+    Run the linters that start a JVM or Node.js (checkstyle, ktlint, CodeNarc and
+    ESLint) through a server that stays alive between judgements, if the server is
+    installed. See :mod:`tested.judge.servers`. This is only useful if TESTed
+    itself stays alive as well, e.g. in daemon mode.
+    """
+    class_data_sharing: bool = False
+    """
+    Start the JVM for Java and Kotlin executions with a class data sharing archive
+    (AppCDS) of the JDK and the harness, which makes starting it faster. The archive
+    is created by the first execution and kept in the cache directory. See
+    :mod:`tested.judge.cds`. Requires a cache directory and JDK 19 or newer.
+    """
+    compiler_server: bool = False
+    """
+    Compile Java and Kotlin in a compile server that stays alive between compilations,
+    instead of starting the compiler for each compilation. See
+    :mod:`tested.judge.compilers`. Requires JDK 11 or newer.
+    """
 
 
 @fallback_field(get_converter(), {"testplan": "test_suite", "plan_name": "test_suite"})
@@ -0,0 +1,182 @@
+"""
+Run TESTed as a long-lived daemon, listening on a Unix socket.
+
+Starting TESTed for every submission means paying for the interpreter start-up and
+for importing all dependencies (cattrs, jsonschema, pylint, all language modules...)
+every time. In daemon mode, this is done once. Every connection to the socket is
+one job: the client sends the Dodona configuration (as JSON), closes its writing
+end of the connection, and the judgement is streamed back on the same connection.
+
+Each job is judged in a forked child process. The children share the warm
+interpreter of the daemon, but all state of a judgement (the bundle, the output
+manager, the locale, in-process linters, ...) is isolated per job.
+
+When the daemon receives SIGTERM or SIGINT, it stops accepting new jobs, but waits
+until all running jobs are finished (the "drain").
+"""
+
+import importlib
+import io
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import IO, BinaryIO, cast
+
+from tested.configs import read_config
+from tested.main import run
+
+_logger = logging.getLogger(__name__)
+
+
+def preload_modules():
+    """
+    Import everything that is otherwise imported lazily during a judgement, so the
+    forked children get it for free.
+    """
+    import tested.dsl
+    import tested.judge
+    import tested.oracles
+    from tested.languages import LANGUAGES
+
+    for language in LANGUAGES:
+        for module in ("generators", "linter"):
+            name = f"tested.languages.{language}.{module}"
+            try:
+                importlib.import_module(name)
+            except ModuleNotFoundError as e:
+                if e.name != name:
+                    raise
+                _logger.debug(f"Language {language} has no module {module}")
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one job: read the config until EOF and judge it.
+    """
+
+    def handle(self):
+        rfile, wfile = cast(BinaryIO, self.rfile), cast(BinaryIO, self.wfile)
+        config = read_config(io.TextIOWrapper(rfile, encoding="utf-8"))
+        _logger.info(f"Judging {config.source} in {config.workdir}")
+        out = io.TextIOWrapper(wfile, encoding="utf-8", write_through=True)
+        try:
+            run(config, out)
+        except Exception as e:
+            _logger.exception("Judgement crashed", exc_info=e)
+        finally:
+            out.flush()
+
+
+class JudgeServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    # Wait for all children when closing the server.
+    block_on_close = True
+
+    def __init__(self, socket_path: Path, max_jobs: int):
+        self.max_children = max_jobs
+        super().__init__(str(socket_path), JobHandler)
+
+    def finish_request(self, request, client_address):
+        # This runs in the forked child, which must not drain the daemon on signals.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        super().finish_request(request, client_address)
+
+
+def serve(socket_path: Path, max_jobs: int = 4):
+    """
+    Start the daemon and block until it is stopped.
+
+    :param socket_path: Where the Unix socket should be created.
+    :param max_jobs: The maximal number of concurrent jobs.
+    """
+    preload_modules()
+    # The socket accepts connections once the server listens, which is after it
+    # was bound. Create it under another name, so it only appears when it is ready.
+    binding_path = socket_path.with_name(f".{socket_path.name}.{os.getpid()}")
+    binding_path.unlink(missing_ok=True)
+    server = JudgeServer(binding_path, max_jobs)
+    os.replace(binding_path, socket_path)
+
+    def _drain(signum, _frame):
+        _logger.info(f"Received signal {signum}, draining jobs...")
+        # Shutdown must happen on another thread than the one serving.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _drain)
+    signal.signal(signal.SIGINT, _drain)
+
+    _logger.info(f"Listening on {socket_path} with {max_jobs} concurrent jobs")
+    try:
+        server.serve_forever()
+    finally:
+        # Waits for the running jobs.
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+    _logger.info("All jobs finished, stopping daemon")
+
+
+def submit(socket_path: Path, config: str, output: IO):
+    """
+    Send a job to a running daemon and copy the judgement to the output.
+
+    :param socket_path: The socket of the daemon.
+    :param config: The Dodona configuration, as JSON.
+    :param output: Where the judgement is written to.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(socket_path))
+        client.sendall(config.encode("utf-8"))
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile("r", encoding="utf-8") as judgement:
+            for chunk in iter(lambda: judgement.read(4096), ""):
+                output.write(chunk)
+                output.flush()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Run TESTed as a daemon.")
+    parser.add_argument(
+        "-s",
+        "--socket",
+        type=Path,
+        help="Path of the Unix socket to listen on or to send the job to.",
+        required=True,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="The maximal number of concurrent jobs (default: number of CPUs).",
+        default=os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "--submit",
+        action="store_true",
+        help="Act as a client: send the config on stdin to the daemon.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Include verbose logs.",
+    )
+    args = parser.parse_args()
+
+    if args.verbose:
+        log = logging.getLogger()
+        log.setLevel(logging.DEBUG)
+        ch = logging.StreamHandler(stream=sys.stderr)
+        formatter = logging.Formatter("%(name)s:%(levelname)s:%(message)s")
+        ch.setFormatter(formatter)
+        log.addHandler(ch)
+
+    if args.submit:
+        submit(args.socket, sys.stdin.read(), sys.stdout)
+    else:
+        serve(args.socket, args.jobs)
@@ -0,0 +1,402 @@
+"""
+Persistent, content-addressed caches that are shared between judgements.
+
+A cache is a directory in the cache directory of the options. Each entry of the
+cache is a subdirectory, named after the hash of the key of the entry. The entry
+contains the cached files and a metadata file.
+
+Entries are evicted in least-recently-used order: the modification time of an entry
+is updated on every hit, and when the total size of the cache exceeds the limit,
+the oldest entries are removed.
+
+Multiple judgements (even in different processes) can use the same cache: entries
+are written to a temporary directory first, and then atomically renamed.
+
+The generated code contains the separator secrets, which are different for each
+judgement. To share compilations between judgements, the secrets are replaced by
+placeholders in the keys and in the cached files of the compilations, and the
+placeholders by the secrets of the judgement when the files are restored. The
+placeholders have the same length as the secrets, and the secrets are ASCII, so
+they appear as-is in the artifacts of the compilers (or as UTF-16, e.g. in .NET
+assemblies).
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from tested.configs import Bundle, DodonaConfig
+from tested.judge.utils import BaseExecutionResult, filter_files
+from tested.languages.language import Command, FileFilter
+
+_logger = logging.getLogger(__name__)
+
+_METADATA = "metadata.json"
+_FILES = "files"
+
+# The placeholders for the testcase and context separator secrets, with the same
+# length as the secrets (see tested.utils.get_identifier).
+_PLACEHOLDERS = ("Qz0tSEPtc", "Qz0tSEPct")
+# The placeholder for the directory of a compilation in the compiler output.
+_DIRECTORY = "<directory>"
+
+Transform = Callable[[bytes], bytes]
+
+
+class FileCache:
+    """
+    A cache of files, with hit and miss counters.
+
+    This class is thread-safe.
+    """
+
+    __slots__ = ["directory", "max_size", "hits", "misses", "_lock"]
+
+    directory: Path
+    max_size: int
+    hits: int
+    misses: int
+
+    def __init__(self, directory: Path, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / key
+
+    def _count(self, key: str, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        _logger.debug(f"Cache {'hit' if hit else 'miss'} for {key} in {self.directory}")
+
+    def _metadata(self, key: str) -> dict[str, Any]:
+        entry = self._entry(key)
+        with open(entry / _METADATA, "r") as f:
+            metadata = json.load(f)
+        # Mark the entry as recently used.
+        os.utime(entry)
+        return metadata
+
+    def get(self, key: str) -> tuple[Path, dict[str, Any]] | None:
+        """
+        Look up an entry in the cache. The files are not copied, so they might be
+        evicted while they are used: use :meth:`restore` to get them.
+
+        :param key: The key of the entry.
+        :return: The directory with the cached files and the metadata, or None if
+                 the entry is not in the cache.
+        """
+        try:
+            metadata = self._metadata(key)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._count(key, hit=False)
+            return None
+        self._count(key, hit=True)
+        return self._entry(key) / _FILES, metadata
+
+    def restore(
+        self, key: str, destination: Path, transform: Transform | None = None
+    ) -> dict[str, Any] | None:
+        """
+        Copy the files of an entry to a directory. Existing files are replaced. If
+        the entry is (partly) evicted while it is copied, this is a miss.
+
+        :param key: The key of the entry.
+        :param destination: The directory to copy the files to.
+        :param transform: Optional, applied to the content of the files.
+        :return: The metadata, or None if the entry is not in the cache.
+        """
+        files = self._entry(key) / _FILES
+        try:
+            metadata = self._metadata(key)
+            for name in metadata["files"]:
+                source = files / name
+                target = destination / name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                # The target might be a hard link to a file in another directory.
+                target.unlink(missing_ok=True)
+                if transform is None:
+                    shutil.copy2(source, target)
+                else:
+                    target.write_bytes(transform(source.read_bytes()))
+                    # Keep the modification time, since some compilers rely on it.
+                    shutil.copystat(source, target)
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            self._count(key, hit=False)
+            return None
+        self._count(key, hit=True)
+        return metadata
+
+    def put(
+        self,
+        key: str,
+        source: Path,
+        files: list[Path],
+        metadata: dict[str, Any] | None = None,
+        transform: Transform | None = None,
+    ):
+        """
+        Add an entry to the cache. If the entry already exists, nothing happens.
+
+        :param key: The key of the entry.
+        :param source: The directory containing the files.
+        :param files: The files to cache, relative to the source directory.
+        :param metadata: Additional data to store with the entry. Must be valid JSON.
+        :param transform: Optional, applied to the content of the files.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = Path(tempfile.mkdtemp(dir=self.directory, prefix=".tmp-"))
+        size = 0
+        for file in files:
+            destination = temporary / _FILES / file
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            if transform is None:
+                shutil.copy2(source / file, destination)
+            else:
+                destination.write_bytes(transform((source / file).read_bytes()))
+                shutil.copystat(source / file, destination)
+            size += destination.stat().st_size
+        (temporary / _FILES).mkdir(exist_ok=True)
+        metadata = {"files": [str(x) for x in files], **(metadata or dict())}
+        # Count the metadata as well, since some entries have no files.
+        size += len(json.dumps(metadata))
+        with open(temporary / _METADATA, "w") as f:
+            json.dump({"size": size, **metadata}, f)
+
+        try:
+            temporary.rename(self._entry(key))
+        except OSError:
+            # Another judgement added the same entry in the meantime.
+            shutil.rmtree(temporary, ignore_errors=True)
+            return
+        _logger.debug(f"Added {key} to {self.directory} ({size} bytes)")
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits in its size.
+        """
+        entries = []
+        total = 0
+        for entry in self.directory.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                with open(entry / _METADATA, "r") as f:
+                    size = json.load(f)["size"]
+                entries.append((entry.stat().st_mtime, size, entry))
+                total += size
+            except (OSError, ValueError, KeyError):
+                continue
+
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            _logger.debug(f"Evicting {entry} from the cache")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+_caches: dict[Path, FileCache] = dict()
+_caches_lock = threading.Lock()
+
+
+def get_cache(bundle: Bundle | DodonaConfig, name: str) -> FileCache | None:
+    """
+    Get a cache from the cache directory in the options.
+
+    The same instance is returned for the same cache, so the counters are shared
+    by all judgements in this process.
+
+    :param bundle: The configuration bundle, or the configuration.
+    :param name: The name of the cache.
+    :return: The cache, or None if caching is disabled.
+    """
+    options = bundle.config.options if isinstance(bundle, Bundle) else bundle.options
+    cache_directory = options.cache_directory
+    if cache_directory is None:
+        return None
+    directory = Path(cache_directory, name).absolute()
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = FileCache(directory, options.cache_size)
+        return _caches[directory]
+
+
+def cache_statistics() -> dict[Path, tuple[int, int]]:
+    """
+    Get the number of hits and misses of all caches used in this process.
+    """
+    with _caches_lock:
+        return {d: (c.hits, c.misses) for d, c in _caches.items()}
+
+
+def hash_file(file: Path) -> str:
+    h = hashlib.sha256()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@functools.cache
+def toolchain_version(executable: str) -> str:
+    """
+    Identify the version of a toolchain, without running it (which can be slow).
+
+    The executable is resolved on the PATH (and symbolic links are followed); the
+    result identifies the actual file, its size and its modification time.
+    """
+    if not (found := shutil.which(executable)):
+        return executable
+    resolved = Path(found).resolve()
+    stat = resolved.stat()
+    return f"{resolved}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class SecretMask:
+    """
+    Replaces the separator secrets of a judgement by placeholders in the files of
+    a compilation, and the other way around (see the module documentation).
+    """
+
+    __slots__ = ["secrets"]
+
+    secrets: list[str]
+
+    def __init__(self, testcase_secret: str, context_secret: str):
+        self.secrets = [testcase_secret, context_secret]
+
+    def supported(self) -> bool:
+        """
+        :return: If the secrets can be replaced without changing the length.
+        """
+        return all(
+            not x or len(x) == len(y) for x, y in zip(self.secrets, _PLACEHOLDERS)
+        )
+
+    def _replacements(self, mask: bool) -> list[tuple[bytes, bytes]]:
+        replacements = []
+        for secret, placeholder in zip(self.secrets, _PLACEHOLDERS):
+            if not secret:
+                continue
+            for encoding in ("utf-8", "utf-16-le"):
+                a, b = secret.encode(encoding), placeholder.encode(encoding)
+                replacements.append((a, b) if mask else (b, a))
+        return replacements
+
+    def mask(self, content: bytes) -> bytes:
+        for old, new in self._replacements(mask=True):
+            content = content.replace(old, new)
+        return content
+
+    def unmask(self, content: bytes) -> bytes:
+        for old, new in self._replacements(mask=False):
+            content = content.replace(old, new)
+        return content
+
+
+def _hash_compilation(command: Command, directory: Path, secrets: SecretMask | None):
+    h = hashlib.sha256()
+    h.update(json.dumps(command).encode())
+    h.update(toolchain_version(command[0]).encode())
+    for file in sorted(directory.rglob("*")):
+        if file.is_file():
+            h.update(str(file.relative_to(directory)).encode())
+            if secrets is None:
+                h.update(hash_file(file).encode())
+            else:
+                content = secrets.mask(file.read_bytes())
+                h.update(hashlib.sha256(content).hexdigest().encode())
+    return h
+
+
+def compilation_key(command: Command, directory: Path, secrets: SecretMask) -> str:
+    """
+    Compute the key for the compilation of the files in a directory.
+
+    The key consists of the compilation command, the version of the compiler, and
+    the paths (relative to the directory) and the content of all files in the
+    directory, with the secrets replaced by placeholders.
+    """
+    return _hash_compilation(command, directory, secrets).hexdigest()
+
+
+def dependencies_key(command: Command, directory: Path) -> str:
+    """
+    Compute the key for the compilation of the initial dependencies of a language.
+
+    This is the same as :func:`compilation_key`, but the dependencies do not
+    contain the secrets.
+    """
+    return _hash_compilation(command, directory, None).hexdigest()
+
+
+def _mask_output(output: str, directory: Path, secrets: SecretMask) -> str:
+    output = output.replace(str(directory.absolute()), _DIRECTORY)
+    return secrets.mask(output.encode()).decode()
+
+
+def _unmask_output(output: str, directory: Path, secrets: SecretMask) -> str:
+    output = secrets.unmask(output.encode()).decode()
+    return output.replace(_DIRECTORY, str(directory.absolute()))
+
+
+def restore_compilation(
+    cache: FileCache, key: str, directory: Path, secrets: SecretMask
+) -> BaseExecutionResult | None:
+    """
+    Restore the results of a compilation from the cache.
+
+    :return: The result of the original compilation, or None if not cached.
+    """
+    if (metadata := cache.restore(key, directory, secrets.unmask)) is None:
+        return None
+    return BaseExecutionResult(
+        stdout=_unmask_output(metadata["stdout"], directory, secrets),
+        stderr=_unmask_output(metadata["stderr"], directory, secrets),
+        exit=metadata["exit"],
+        timeout=False,
+        memory=False,
+    )
+
+
+def store_compilation(
+    cache: FileCache,
+    key: str,
+    directory: Path,
+    result: BaseExecutionResult,
+    files: list[str] | FileFilter,
+    secrets: SecretMask,
+):
+    """
+    Store the results of a compilation in the cache. Only successful compilations
+    are stored.
+
+    :param files: The resulting files of the compilation, as returned by the
+                  language.
+    """
+    if result.timeout or result.memory or result.exit != 0:
+        return
+    artifacts = [x for x in filter_files(files, directory) if (directory / x).is_file()]
+    metadata = {
+        "stdout": _mask_output(result.stdout, directory, secrets),
+        "stderr": _mask_output(result.stderr, directory, secrets),
+        "exit": result.exit,
+    }
+    cache.put(key, directory, artifacts, metadata, secrets.mask)
@@ -0,0 +1,153 @@
+"""
+Class data sharing (AppCDS) archives for the languages on the JVM.
+
+Starting the JVM takes a large part of a short execution unit, which is mostly
+spent loading and verifying the classes of the JDK, the standard library of the
+language (for Kotlin) and the harness. If the ``class_data_sharing`` option is
+enabled, the executions use a dynamic AppCDS archive with these classes, which the
+JVM maps into memory instead:
+
+- An archive can only contain classes from jar files, not from directories. The
+  compiled classes of the harness are therefore copied into a jar, which is put in
+  the class path before the directory of the execution (which has the same
+  classes).
+- The jar and the archive are kept in the ``cds`` directory of the cache directory,
+  named after a hash of the harness, the class path and the JDK.
+- The JVM creates the archive itself when the execution finishes (with
+  ``-XX:+AutoCreateSharedArchive``, which needs JDK 19 or newer). Only the
+  execution that claimed the creation does this; the other executions run without
+  archive until it exists, and then only read it. Since the name of the archive
+  depends on the JDK and the classes, it stays valid.
+
+The logging of the JVM about the archive is disabled, since it is written to
+stdout, where it would end up in the output of the submission.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from tested.configs import DodonaConfig
+from tested.judge.cache import toolchain_version
+
+_logger = logging.getLogger(__name__)
+
+_ARCHIVE_LOGGING = "-Xlog:cds=off,cds+dynamic=off"
+
+# After this many seconds, another execution may try to create a missing archive.
+_CREATION_TIMEOUT = 60
+
+
+@functools.cache
+def jdk_version(executable: str = "java") -> int:
+    """
+    Get the feature version of the JDK (e.g. 21), from its release file, without
+    starting the JVM.
+
+    :return: The version, or 0 if it is unknown.
+    """
+    if not (found := shutil.which(executable)):
+        return 0
+    release = Path(found).resolve().parent.parent / "release"
+    try:
+        content = release.read_text()
+    except OSError:
+        return 0
+    # Old versions are named like 1.8.0, new ones like 21.0.1.
+    if match := re.search(r'^JAVA_VERSION="(?:1\.)?(\d+)', content, re.MULTILINE):
+        return int(match.group(1))
+    return 0
+
+
+def _create_jar(jar: Path, classes: list[Path]):
+    fd, temporary = tempfile.mkstemp(dir=jar.parent, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w") as archive:
+        for file in classes:
+            archive.write(file, file.name)
+    try:
+        # The jar must not change once it exists, since the archive checks it.
+        os.link(temporary, jar)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(temporary)
+
+
+def _claim(lock: Path) -> bool:
+    """
+    Claim the creation of an archive, unless another execution claimed it recently.
+    """
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        pass
+    try:
+        if time.time() - lock.stat().st_mtime < _CREATION_TIMEOUT:
+            return False
+        os.utime(lock)
+        return True
+    except OSError:
+        return False
+
+
+def shared_archive(
+    config: DodonaConfig, directory: Path, harness: list[str], classpath: list[str]
+) -> tuple[list[str], list[str]]:
+    """
+    Get the options for the JVM to use an AppCDS archive for an execution.
+
+    :param config: The configuration.
+    :param directory: The directory of the execution, with the compiled harness.
+    :param harness: Glob patterns for the class files of the harness.
+    :param classpath: The jars in the class path, besides the directory.
+
+    :return: The options for the JVM, and the class path. Without an archive, there
+             are no options, and the class path is the jars and the directory.
+    """
+    options = config.options
+    default: tuple[list[str], list[str]] = [], [*classpath, "."]
+    if not options.class_data_sharing or options.cache_directory is None:
+        return default
+    if jdk_version() < 19:
+        _logger.debug("Class data sharing needs JDK 19 or newer")
+        return default
+    classes = sorted({file for pattern in harness for file in directory.glob(pattern)})
+    if not classes:
+        return default
+
+    h = hashlib.sha256()
+    h.update(toolchain_version("java").encode())
+    for jar in classpath:
+        stat = os.stat(jar)
+        h.update(f"{jar}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    for file in classes:
+        h.update(file.name.encode())
+        h.update(file.read_bytes())
+    key = h.hexdigest()[:32]
+
+    cds = Path(options.cache_directory, "cds").absolute()
+    cds.mkdir(parents=True, exist_ok=True)
+    jar = cds / f"{key}.jar"
+    if not jar.exists():
+        _create_jar(jar, classes)
+    archive = cds / f"{key}.jsa"
+    path = [*classpath, str(jar), "."]
+    if archive.exists():
+        _logger.debug(f"Using class data sharing archive {archive}")
+        return [f"-XX:SharedArchiveFile={archive}", _ARCHIVE_LOGGING], path
+    if _claim(cds / f"{key}.lock"):
+        _logger.debug(f"Creating class data sharing archive {archive}")
+        return [
+            f"-XX:SharedArchiveFile={archive}",
+            "-XX:+AutoCreateSharedArchive",
+            _ARCHIVE_LOGGING,
+        ], path
+    return [], path
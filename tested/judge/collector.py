@@ -1,5 +1,5 @@
 import logging
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 from typing import IO, Literal
 
 from tested.dodona import (
@@ -38,18 +38,28 @@ class OutputManager:
         "open_stack",
         "currently_open",
         "out",
+        "final_messages",
     ]
 
     finalized: bool
     open_stack: list[str]
     currently_open: tuple[int, int, int]
     out: IO
+    final_messages: Callable[[], Iterable[Message]] | None
 
-    def __init__(self, out: IO):
+    def __init__(
+        self, out: IO, final_messages: Callable[[], Iterable[Message]] | None = None
+    ):
+        """
+        :param out: Where the output is written to.
+        :param final_messages: Optional, called right before the judgement is
+                               closed, for messages that are only known at the end.
+        """
         self.finalized = False
         self.open_stack = []
         self.currently_open = (0, 0, 0)
         self.out = out
+        self.final_messages = final_messages
 
     def add_all(self, commands: Iterable[Update]):
         for command in commands:
@@ -66,6 +76,9 @@ class OutputManager:
         will be tracked to ensure a proper structure.
         """
         assert not self.finalized, "OutputManager already finished!"
+        if isinstance(command, CloseJudgement) and self.final_messages is not None:
+            final_messages, self.final_messages = self.final_messages, None
+            self.add_messages(final_messages())
         action, type_ = command.command.split("-")
         _logger.debug(f"Adding {command}")
         _logger.debug(f"Stack is {self.open_stack}")
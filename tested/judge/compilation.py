@@ -3,27 +3,49 @@ Functions responsible for the compilation step.
 """
 
 import logging
+import shutil
+import tempfile
 from pathlib import Path
 
 from tested.configs import Bundle
 from tested.dodona import Status
 from tested.internationalization import get_i18n_string
+from tested.judge.cache import (
+    SecretMask,
+    compilation_key,
+    dependencies_key,
+    get_cache,
+    restore_compilation,
+    store_compilation,
+)
 from tested.judge.planning import CompilationResult, ExecutionPlan
 from tested.judge.utils import (
     BaseExecutionResult,
+    copy_from_paths_to_path,
     copy_workdir_files,
     filter_files,
-    run_command,
 )
+from tested.languages.conventionalize import EXECUTION_PREFIX
 from tested.languages.language import FileFilter, Language
 from tested.languages.utils import convert_stacktrace_to_clickable_feedback
 
 _logger = logging.getLogger(__name__)
 
 
+def _manifest(files: list[str] | FileFilter, directory: Path) -> list[str]:
+    """
+    Get the files that resulted from a compilation. If the language gave a filter
+    instead of a list, the directory is scanned once here, so the execution units
+    that use the results do not need to scan it again.
+    """
+    if not callable(files):
+        return files
+    return [str(x) for x in filter_files(files, directory) if (directory / x).is_file()]
+
+
 def run_compilation(
     bundle: Bundle, directory: Path, dependencies: list[str], remaining: float
-) -> tuple[BaseExecutionResult | None, list[str] | FileFilter]:
+) -> tuple[BaseExecutionResult | None, list[str]]:
     """
     The compilation step in the pipeline. This callback is used in both the
     precompilation and individual mode. The implementation may only depend on
@@ -52,22 +74,101 @@ def run_compilation(
                          the last file is the context_testcase file.
     :param remaining: The max amount of time.
 
+    If a cache directory is configured, successful compilations are cached: if the
+    same command is run again on the same files, the results are copied from the
+    cache instead.
+
     :return: A tuple containing an optional compilation result, and a list of
              files, intended for further processing in the pipeline. For
              configs without compilation, the dependencies can be returned
              verbatim and without compilation results. Note that the judge might
              decide to fallback to individual mode if the compilation result is
-             not positive.
+             not positive. If the language returned a filter for the files, it
+             is applied to the directory after the compilation (the manifest).
     """
     command, files = bundle.language.compilation(dependencies)
+    secrets = SecretMask(
+        bundle.testcase_separator_secret, bundle.context_separator_secret
+    )
+    cache = get_cache(bundle, "compilation") if command else None
+    key = None
+    if cache and secrets.supported():
+        key = compilation_key(command, directory, secrets)
+        if result := restore_compilation(cache, key, directory, secrets):
+            _logger.debug("Restored compilation results from cache for %s", command)
+            return result, _manifest(files, directory)
+
     _logger.debug(
         "Generating files with command %s in directory %s", command, directory
     )
-    result = run_command(directory, remaining, command)
+    result = bundle.language.compile(directory, remaining, command)
+    files = _manifest(files, directory)
     _logger.debug(f"Compilation dependencies are: {files}")
+    if cache and key and result:
+        store_compilation(cache, key, directory, result, files, secrets)
     return result, files
 
 
+def compile_dependencies(
+    bundle: Bundle, destination: Path, remaining: float
+) -> list[str] | None:
+    """
+    Compile the initial dependencies of the language on their own (see
+    :meth:`Language.dependencies_compilation`), and put the results in the
+    destination. The initial dependencies that are not part of the results are
+    removed from the destination.
+
+    The initial dependencies do not depend on the submission, so this is only done
+    if a cache directory is configured: the dependencies are then compiled once for
+    all judgements.
+
+    :param bundle: The configuration bundle.
+    :param destination: The directory with the initial dependencies.
+    :param remaining: The max amount of time.
+
+    :return: The files that replace the initial dependencies, or None if the
+             dependencies must be compiled with the submission.
+    """
+    dependencies = bundle.language.initial_dependencies()
+    command, files = bundle.language.dependencies_compilation(dependencies)
+    cache = get_cache(bundle, "dependencies") if command else None
+    if not cache:
+        return None
+
+    # The name keeps the directory out of the copies of the workdir.
+    with tempfile.TemporaryDirectory(
+        prefix=f"{EXECUTION_PREFIX}-dependencies-", dir=bundle.config.workdir
+    ) as temporary:
+        directory = Path(temporary)
+        dependency_paths = bundle.language.path_to_dependencies()
+        copy_from_paths_to_path(dependency_paths, dependencies, directory)
+        key = dependencies_key(command, directory)
+
+        if metadata := cache.restore(key, directory):
+            compiled = metadata["files"]
+        else:
+            _logger.debug("Compiling dependencies with command %s", command)
+            result = bundle.language.compile(directory, remaining, command)
+            assert result is not None
+            if result.timeout or result.memory or result.exit != 0:
+                _logger.warning(f"Could not compile the dependencies: {result}")
+                return None
+            compiled = [
+                str(x)
+                for x in filter_files(files, directory)
+                if (directory / x).is_file()
+            ]
+            cache.put(key, directory, [Path(x) for x in compiled])
+
+        for file in compiled:
+            # Keep the modification time, since some compilers rely on it.
+            shutil.copy2(directory / file, destination / file)
+
+    for file in set(dependencies) - set(compiled):
+        (destination / file).unlink(missing_ok=True)
+    return compiled
+
+
 def process_compile_results(
     language_config: Language, results: BaseExecutionResult | None
 ) -> CompilationResult:
@@ -126,6 +227,27 @@ def process_compile_results(
     return CompilationResult(messages=messages, status=status, annotations=annotations)
 
 
+def compile_directory(
+    bundle: Bundle, directory: Path, files: list[str] | FileFilter, remaining: float
+) -> tuple[CompilationResult, list[str]]:
+    """
+    Compile all generated files in a directory at once.
+
+    :param bundle: The options.
+    :param directory: The directory with the generated files.
+    :param files: The generated files.
+    :param remaining: The max amount of time.
+    :return: The results of the compilation, and the files that are needed for
+             the execution if the compilation succeeded.
+    """
+    plan_files = filter_files(files, directory)
+    files = copy_workdir_files(bundle, directory, False) + [str(x) for x in plan_files]
+
+    # Do the actual compiling.
+    result, compilation_files = run_compilation(bundle, directory, files, remaining)
+    return process_compile_results(bundle.language, result), compilation_files
+
+
 def precompile(bundle: Bundle, plan: ExecutionPlan) -> CompilationResult:
     """
     Attempt to precompile the execution plan.
@@ -136,19 +258,11 @@ def precompile(bundle: Bundle, plan: ExecutionPlan) -> CompilationResult:
     """
     _logger.info("Starting precompilation phase")
     assert not bundle.language.needs_selector() or plan.selector is not None
-    plan_files = filter_files(plan.files, plan.common_directory)
-    files = copy_workdir_files(bundle, plan.common_directory, False) + [
-        str(x) for x in plan_files
-    ]
-    remaining_time = plan.remaining_time()
-
-    # Do the actual compiling.
-    result, compilation_files = run_compilation(
-        bundle, plan.common_directory, files, remaining_time
+    processed_results, compilation_files = compile_directory(
+        bundle, plan.common_directory, plan.files, plan.remaining_time()
     )
 
     # Update the files if the compilation succeeded.
-    processed_results = process_compile_results(bundle.language, result)
     if processed_results.status == Status.CORRECT:
         plan.files = compilation_files
 
@@ -0,0 +1,186 @@
+"""
+Persistent compile servers for the languages on the JVM.
+
+Compiling with javac or kotlinc starts a new JVM, which then loads and warms up
+the compiler: this often takes longer than the compilation itself, and it happens
+again for every tab in the fallback. If the ``compiler_server`` option is enabled,
+the compilations are done by a compile server instead (see ``CompileServer.java``
+in the Java language): a JVM that stays alive between compilations (and between
+judgements, e.g. in daemon mode), and runs the compiler for each request.
+
+- There is a server for each compiler, class path and JVM options, which is started
+  on first use. It is run with the source-file mode of java (JDK 11 or newer), so it
+  does not need to be compiled first.
+- The requests are sent over the stdin of the server, and are handled one at a
+  time. Since the working directory of the server cannot change, the paths in the
+  arguments must be absolute. The directory is removed from the output again, so
+  the messages are the same as with the normal command.
+- The heap of the server is limited. If the server crashes (e.g. because it ran out
+  of memory), the compilation is done with the normal command, and the next
+  compilation starts a new server. If a compilation runs out of time, its server is
+  killed as well.
+"""
+
+import logging
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from tested.configs import DodonaConfig
+from tested.judge.cds import jdk_version
+from tested.judge.utils import BaseExecutionResult, run_command
+from tested.languages.language import Command
+
+_logger = logging.getLogger(__name__)
+
+_SOURCE = Path(__file__).parent.parent / "languages" / "java" / "CompileServer.java"
+
+
+class _Server:
+    __slots__ = ["process", "lock"]
+
+    process: subprocess.Popen
+    lock: threading.Lock
+
+    def __init__(self, command: list[str]):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        self.lock = threading.Lock()
+
+
+# The servers started by this process, by their command.
+_servers: dict[tuple[str, ...], _Server] = dict()
+_servers_lock = threading.Lock()
+
+
+def _server(classpath: list[str], jvm_options: list[str]) -> _Server:
+    """
+    Get a running compile server, and start it if needed.
+    """
+    if classpath:
+        jvm_options = [*jvm_options, "-cp", os.pathsep.join(classpath)]
+    command = ("java", *jvm_options, str(_SOURCE))
+    with _servers_lock:
+        server = _servers.get(command)
+        if server is None or server.process.poll() is not None:
+            _logger.info(f"Starting compile server {command}")
+            server = _servers[command] = _Server(list(command))
+        return server
+
+
+def _stop(server: _Server):
+    with _servers_lock:
+        for command, other in list(_servers.items()):
+            if other is server:
+                del _servers[command]
+    try:
+        os.killpg(server.process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    server.process.wait()
+
+
+def _request(
+    server: _Server, compiler: str, arguments: list[str], deadline: float
+) -> tuple[int, str] | None:
+    """
+    Send a compilation to a server, and wait for the response.
+
+    :return: The exit code and the output of the compiler, or None if the server
+             crashed.
+    :raises TimeoutError: If the deadline passed.
+    """
+    assert server.process.stdin and server.process.stdout
+    request = "\n".join([compiler, str(len(arguments)), *arguments]) + "\n"
+    try:
+        server.process.stdin.write(request.encode())
+        server.process.stdin.flush()
+    except OSError:
+        return None
+
+    fd = server.process.stdout.fileno()
+    data = b""
+    header = None
+    while header is None or len(data) < header[1]:
+        if header is None and b"\n" in data:
+            line, data = data.split(b"\n", 1)
+            exit_code, length = (int(x) for x in line.split())
+            header = exit_code, length
+            continue
+        if (left := deadline - time.monotonic()) <= 0:
+            raise TimeoutError()
+        ready, _, _ = select.select([fd], [], [], left)
+        if ready:
+            if not (chunk := os.read(fd, 65536)):
+                return None
+            data += chunk
+    return header[0], data.decode(errors="replace")
+
+
+def compile_in_server(
+    config: DodonaConfig,
+    directory: Path,
+    remaining: float,
+    command: Command,
+    compiler: str,
+    arguments: list[str],
+    classpath: list[str],
+    jvm_options: list[str],
+) -> BaseExecutionResult | None:
+    """
+    Compile in a compile server if the ``compiler_server`` option is enabled, or
+    else with the normal command.
+
+    :param directory: The directory with the files to compile.
+    :param remaining: The max amount of time.
+    :param command: The normal command to compile.
+    :param compiler: The compiler in the server: javac (with the javax.tools API of
+                     the JDK of the server) or kotlinc.
+    :param arguments: The arguments for the compiler, with absolute paths.
+    :param classpath: The class path of the server, with the compiler.
+    :param jvm_options: Options for the JVM of the server, e.g. the heap size.
+    """
+    if not config.options.compiler_server or jdk_version() < 11:
+        return run_command(directory, remaining, command)
+
+    start = time.monotonic()
+    server = _server(classpath, jvm_options)
+    timeout = BaseExecutionResult(
+        stdout="", stderr="", exit=0, timeout=True, memory=False
+    )
+    # Wait for the compilations of other judgements first.
+    if not server.lock.acquire(timeout=max(remaining, 0)):
+        return timeout
+    try:
+        response = _request(server, compiler, arguments, start + remaining)
+    except TimeoutError:
+        _logger.warning(f"Compilation in the {compiler} server ran out of time")
+        _stop(server)
+        return timeout
+    finally:
+        server.lock.release()
+    if response is None:
+        # The next compilation starts a new server.
+        _logger.warning(f"The {compiler} server crashed, compiling normally")
+        _stop(server)
+        remaining -= time.monotonic() - start
+        return run_command(directory, remaining, command)
+
+    exit_code, output = response
+    _logger.debug(f"Compiled in the {compiler} server: {exit_code}")
+    return BaseExecutionResult(
+        stdout="",
+        stderr=output.replace(f"{directory.absolute()}{os.sep}", ""),
+        exit=exit_code,
+        timeout=False,
+        memory=False,
+    )
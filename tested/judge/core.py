@@ -1,15 +1,22 @@
 import logging
+import queue
 import shutil
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
 from pathlib import Path
 
-from tested.configs import Bundle
+from attrs import define, evolve, field
+
+from tested.configs import Bundle, ExecutionEngine
 from tested.dodona import (
     AppendMessage,
     CloseContext,
     CloseJudgement,
     CloseTab,
+    Message,
     Metadata,
     StartContext,
     StartJudgement,
@@ -21,15 +28,18 @@ from tested.dodona import (
 from tested.features import is_supported
 from tested.internationalization import get_i18n_string, set_locale
 from tested.judge.collector import OutputManager
-from tested.judge.compilation import precompile
+from tested.judge.compilation import compile_dependencies, compile_directory, precompile
+from tested.judge.durations import get_duration_store, longest_first
+from tested.judge.engine import UnitRunner
 from tested.judge.evaluation import evaluate_context_results, terminate
 from tested.judge.execution import (
+    ContextResult,
     ExecutionResult,
-    compile_unit,
     execute_unit,
+    execute_unit_async,
     set_up_unit,
 )
-from tested.judge.linter import run_linter
+from tested.judge.linter import add_linter_results, start_linter
 from tested.judge.planning import (
     CompilationResult,
     ExecutionPlan,
@@ -38,18 +48,108 @@ from tested.judge.planning import (
     PlanStrategy,
     plan_test_suite,
 )
-from tested.judge.utils import copy_from_paths_to_path
-from tested.languages.conventionalize import submission_file
+from tested.judge.scheduling import UnitScheduler, available_cpus, available_memory
+from tested.judge.speculation import CompilationHistory, get_compilation_history
+from tested.judge.statistics import Statistics, measure
+from tested.judge.utils import cancellable, copy_from_paths_to_path
+from tested.languages.conventionalize import EXECUTION_PREFIX, submission_file
 from tested.languages.generation import (
     generate_execution,
     generate_selector,
     generate_statement,
 )
+from tested.languages.language import Language
 from tested.serialisation import Statement
 from tested.testsuite import LanguageLiterals, MainInput, TextData
 
 _logger = logging.getLogger(__name__)
 
+# The file in the workdir with the timing statistics, if enabled.
+STATISTICS_FILE = "timing-statistics.json"
+
+
+@define
+class GeneratedHarness:
+    """
+    The generated files of a judgement, except for the submission itself.
+
+    The generated code contains the separator secrets, so the harness can only be
+    used by judgements with the same secrets.
+    """
+
+    directory: Path
+    # The files in the directory, in the order expected by the compilation step.
+    files: list[str]
+    selector: str | None
+    testcase_separator_secret: str
+    context_separator_secret: str
+
+
+@define
+class ExercisePreparation:
+    """
+    The parts of a judgement that do not depend on the submission.
+
+    When judging many submissions for the same exercise (see :mod:`tested.batch`),
+    this is computed once and shared between the judgements.
+    """
+
+    unsupported: list[Message] | None
+    plans: dict[PlanStrategy, list[PlannedExecutionUnit]] = field(factory=dict)
+    # Only present if the generated code does not depend on the submission.
+    harness: GeneratedHarness | None = None
+
+
+def _harness_is_shareable(language: Language) -> bool:
+    # Languages that check the submission for void functions generate different
+    # code for different submissions.
+    return type(language).is_void_method is Language.is_void_method
+
+
+def _execution_strategy(bundle: Bundle) -> PlanStrategy:
+    """
+    The strategy for the execution plan, if the precompilation succeeds. In
+    parallel mode, the units are balanced over the available workers.
+    """
+    if bundle.config.options.parallel:
+        return PlanStrategy.BALANCED
+    return PlanStrategy.OPTIMAL
+
+
+def prepare_exercise(
+    bundle: Bundle, harness_directory: Path | None = None
+) -> ExercisePreparation:
+    """
+    Do the part of the judgement that does not depend on the submission.
+
+    :param bundle: The configuration bundle.
+    :param harness_directory: If given, the files are generated in this directory,
+                              so they can be re-used by other judgements.
+    """
+    if messages := is_supported(bundle.language):
+        return ExercisePreparation(unsupported=messages)
+
+    plans = {
+        strategy: plan_test_suite(bundle, strategy)
+        for strategy in (_execution_strategy(bundle), PlanStrategy.TAB)
+    }
+    preparation = ExercisePreparation(unsupported=None, plans=plans)
+
+    if harness_directory is not None and _harness_is_shareable(bundle.language):
+        harness_directory.mkdir(parents=True)
+        files, selector = _generate_harness(
+            bundle, plans[_execution_strategy(bundle)], harness_directory
+        )
+        preparation.harness = GeneratedHarness(
+            directory=harness_directory,
+            files=files,
+            selector=selector,
+            testcase_separator_secret=bundle.testcase_separator_secret,
+            context_separator_secret=bundle.context_separator_secret,
+        )
+
+    return preparation
+
 
 def _is_fatal_compilation_error(compilation_results: CompilationResult) -> bool:
     return compilation_results.status in (
@@ -74,7 +174,7 @@ def _handle_time_or_memory_compilation(
     )
 
 
-def judge(bundle: Bundle):
+def judge(bundle: Bundle, preparation: ExercisePreparation | None = None):
     """
     Evaluate a solution for an exercise. Execute the tests present in the
     test suite. The result (the judgment) is sent to stdout, so Dodona can pick it
@@ -86,18 +186,26 @@ def judge(bundle: Bundle):
     2. Attempt to precompile everything.
        a. If this fails, go to 3.
        b. If this succeeds, go to 4.
-    3. Convert contexts into "tab-level" units.
+    3. Convert contexts into "tab-level" units. For exercises that often fail to
+       compile, this is already done during 2 (see the speculative_compilation
+       option).
     4. For each execution unit:
        a. Compile if necessary (only if 2 failed)
        b. Execute the unit.
        c. Process the results.
 
+    The linter runs in the background during 2 to 4, and its results are added
+    before the results of the first unit.
+
     :param bundle: The configuration bundle.
+    :param preparation: The shared preparation, if available.
     """
     # Begin by checking if the given test suite is executable in this language.
     _logger.info("Checking supported features...")
     set_locale(bundle.config.natural_language)
-    if messages := is_supported(bundle.language):
+    if preparation is None:
+        preparation = prepare_exercise(bundle)
+    if messages := preparation.unsupported:
         report_update(bundle.out, StartJudgement())
         for message in messages:
             report_update(bundle.out, AppendMessage(message=message))
@@ -114,22 +222,32 @@ def judge(bundle: Bundle):
         return  # Not all required features are supported.
 
     # Do the set-up for the judgement.
-    collector = OutputManager(bundle.out)
+    if bundle.config.timing_statistics:
+        statistics = Statistics()
+        collector = OutputManager(
+            bundle.out, lambda: _report_statistics(bundle, statistics)
+        )
+    else:
+        statistics = None
+        collector = OutputManager(bundle.out)
     collector.add(StartJudgement())
     max_time = float(bundle.config.time_limit) * 0.9
     start = time.perf_counter()
 
-    # Run the linter.
-    # TODO: do this in parallel
-    run_linter(bundle, collector, max_time)
-    if time.perf_counter() - start > max_time:
-        terminate(bundle, collector, Status.TIME_LIMIT_EXCEEDED)
-        return
+    # The linter runs while the code is generated, compiled and executed. Its
+    # results are added before the first tab.
+    linting = start_linter(bundle, max_time, statistics)
 
-    planned_units = plan_test_suite(bundle, strategy=PlanStrategy.OPTIMAL)
+    planned_units = preparation.plans[_execution_strategy(bundle)]
 
     # Attempt to precompile everything.
-    common_dir, dependencies, selector = _generate_files(bundle, planned_units)
+    with measure(statistics, "generation"):
+        common_dir, dependencies, selector = _generate_files(
+            bundle,
+            planned_units,
+            max_time - (time.perf_counter() - start),
+            preparation.harness,
+        )
 
     # Create an execution plan.
     plan = ExecutionPlan(
@@ -141,11 +259,24 @@ def judge(bundle: Bundle):
         start_time=start,
     )
 
+    history = get_compilation_history(bundle)
+    speculation = _start_speculative_compilation(
+        bundle, preparation, plan, history, statistics
+    )
+
     _logger.debug("Attempting precompilation")
-    compilation_results = precompile(bundle, plan)
+    with measure(statistics, "precompilation"):
+        compilation_results = precompile(bundle, plan)
+    if history is not None:
+        history.record(compilation_results.status != Status.CORRECT)
 
     # If something went horribly wrong, and the compilation itself caused a timeout or memory issue, bail now.
     if _is_fatal_compilation_error(compilation_results):
+        if speculation is not None:
+            speculation.discard()
+        if not add_linter_results(linting, collector, plan.remaining_time()):
+            terminate(bundle, collector, Status.TIME_LIMIT_EXCEEDED)
+            return
         _handle_time_or_memory_compilation(bundle, collector, compilation_results)
         return
 
@@ -155,46 +286,119 @@ def judge(bundle: Bundle):
         and bundle.config.options.allow_fallback
     ):
         _logger.warning("Precompilation failed. Falling back to unit compilation.")
-        planned_units = plan_test_suite(bundle, strategy=PlanStrategy.TAB)
-        plan.units = planned_units
-        compilation_results = None
+        if speculation is not None:
+            plan = speculation.plan
+            unit_compilation_results = speculation.results.result()
+        else:
+            plan.units = preparation.plans[PlanStrategy.TAB]
+            with measure(statistics, "compilation"):
+                unit_compilation_results = _bisect_compilation(
+                    bundle, plan, compilation_results
+                )
+    else:
+        if speculation is not None:
+            speculation.discard()
+        unit_compilation_results = [compilation_results] * len(plan.units)
 
     _logger.info("Starting execution")
 
-    def _process_one_unit(
-        index: int,
-    ) -> tuple[CompilationResult, ExecutionResult | None, Path]:
-        return _execute_one_unit(bundle, plan, compilation_results, index)
+    # The updates of each unit, see _execute_one_unit.
+    updates = [queue.SimpleQueue() for _ in plan.units]
 
     if bundle.config.options.parallel:
-        max_workers = None
+        scheduler = UnitScheduler(available_cpus(), available_memory())
+        asynchronous = bundle.config.options.engine == ExecutionEngine.ASYNCIO
+        _logger.debug(
+            f"Scheduling on {scheduler.cpus} CPUs and {scheduler.memory} bytes"
+        )
+        max_workers = scheduler.cpus
+        durations = get_duration_store(bundle)
     else:
+        scheduler = None
         max_workers = 1
+        durations = None
+        asynchronous = False
 
-    _logger.debug(f"Executing with {max_workers} workers")
+    # Start the units that took the longest in previous judgements first. The
+    # results are still processed in the order of the plan.
+    if durations is not None:
+        order = longest_first(plan.units, durations.get())
+    else:
+        order = range(len(plan.units))
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        remaining_time = plan.remaining_time()
-        results = executor.map(
-            _process_one_unit, range(len(plan.units)), timeout=remaining_time
-        )
+    def _process_one_unit(
+        index: int,
+    ) -> tuple[CompilationResult, ExecutionResult | None, Path]:
+        compilation = unit_compilation_results[index]
+        if scheduler is None:
+            return _execute_one_unit(
+                bundle, plan, compilation, index, updates[index], statistics
+            )
+        cpus = min(bundle.language.concurrency_weight(), scheduler.cpus)
+        with scheduler.admit(cpus, bundle.config.memory_limit):
+            unit_start = time.perf_counter()
+            result = _execute_one_unit(
+                bundle, plan, compilation, index, updates[index], statistics
+            )
+        if durations is not None:
+            durations.record(plan.units[index], time.perf_counter() - unit_start)
+        return result
+
+    async def _process_one_unit_async(
+        index: int,
+    ) -> tuple[CompilationResult, ExecutionResult | None, Path]:
+        assert scheduler is not None
+        compilation = unit_compilation_results[index]
+        cpus = min(bundle.language.concurrency_weight(), scheduler.cpus)
+        async with scheduler.admit_async(cpus, bundle.config.memory_limit):
+            unit_start = time.perf_counter()
+            result = await _execute_one_unit_async(
+                bundle, plan, compilation, index, updates[index], statistics
+            )
+        if durations is not None:
+            durations.record(plan.units[index], time.perf_counter() - unit_start)
+        return result
+
+    executor: UnitRunner | ThreadPoolExecutor
+    if asynchronous:
+        _logger.debug("Executing with the asyncio engine")
+        runner = executor = UnitRunner()
+
+        def _submit(index: int) -> Future:
+            return runner.submit(_process_one_unit_async, index)
+
+    else:
+        _logger.debug(f"Executing with {max_workers} workers")
+        pool = executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        def _submit(index: int) -> Future:
+            return pool.submit(_process_one_unit, index)
+
+    plan.forkserver = bundle.language.forkserver(plan.common_directory)
+    with plan.forkserver or nullcontext(), executor:
+        futures = []
+        for i in order:
+            future = _submit(i)
+            future.add_done_callback(updates[i].put)
+            futures.append(future)
         try:
+            if not add_linter_results(linting, collector, plan.remaining_time()):
+                raise TimeoutError()
             currently_open_tab = -1
-            for i, (
-                local_compilation_results,
-                execution_result,
-                execution_dir,
-            ) in enumerate(results):
-                planned_unit = plan.units[i]
+            for i, planned_unit in enumerate(plan.units):
                 _logger.debug(f"Processing results for execution unit {i}")
+                local_compilation_results, context_results, execution_dir = (
+                    _unit_results(plan, planned_unit, updates[i])
+                )
                 result_status, currently_open_tab = _process_results(
                     bundle=bundle,
                     unit=planned_unit,
-                    execution_result=execution_result,
+                    context_results=context_results,
                     execution_dir=execution_dir,
                     compilation_results=local_compilation_results,
                     collector=collector,
                     currently_open_tab=currently_open_tab,
+                    statistics=statistics,
                 )
 
                 if result_status in (
@@ -202,10 +406,13 @@ def judge(bundle: Bundle):
                     Status.MEMORY_LIMIT_EXCEEDED,
                     Status.OUTPUT_LIMIT_EXCEEDED,
                 ):
-                    del results
+                    for future in futures:
+                        future.cancel()
                     terminate(bundle, collector, result_status)
                     return
         except TimeoutError:
+            for future in futures:
+                future.cancel()
             terminate(bundle, collector, Status.TIME_LIMIT_EXCEEDED)
             return
 
@@ -213,81 +420,383 @@ def judge(bundle: Bundle):
     terminate(bundle, collector, Status.CORRECT)
 
 
+@define
+class _UnitStarted:
+    """
+    Sent by an execution unit before the results of its contexts are streamed.
+    """
+
+    compilation_results: CompilationResult
+    execution_dir: Path
+
+
+def _next_update(plan: ExecutionPlan, updates: queue.SimpleQueue):
+    try:
+        return updates.get(timeout=max(plan.remaining_time(), 0))
+    except queue.Empty:
+        raise TimeoutError()
+
+
+def _unit_results(
+    plan: ExecutionPlan, unit: PlannedExecutionUnit, updates: queue.SimpleQueue
+) -> tuple[CompilationResult, Iterable[ContextResult | None], Path]:
+    """
+    Wait for an execution unit to start or finish.
+
+    :return: The compilation results, the results of the contexts (which might
+             still be arriving) and the directory of the execution unit.
+    """
+    update = _next_update(plan, updates)
+    if isinstance(update, Future):
+        local_compilation_results, execution_result, execution_dir = update.result()
+        return (
+            local_compilation_results,
+            _context_results(unit, execution_result),
+            execution_dir,
+        )
+
+    assert isinstance(update, _UnitStarted)
+
+    def _streamed_results() -> Iterator[ContextResult | None]:
+        streamed = 0
+        while not isinstance(item := _next_update(plan, updates), Future):
+            streamed += 1
+            yield item
+        _, result, _ = item.result()
+        yield from _context_results(unit, result)[streamed:]
+
+    return update.compilation_results, _streamed_results(), update.execution_dir
+
+
+def _context_results(
+    unit: PlannedExecutionUnit, execution_result: ExecutionResult | None
+) -> list[ContextResult | None]:
+    if execution_result:
+        return list(execution_result.to_context_results())
+    else:
+        return [None] * len(unit.contexts)
+
+
+def _start_one_unit(
+    bundle: Bundle,
+    plan: ExecutionPlan,
+    compilation_results: CompilationResult,
+    index: int,
+    updates: queue.SimpleQueue | None,
+) -> tuple[Path, list[Path], Callable[[ContextResult], None] | None]:
+    """
+    Prepare the directory of a unit, and announce its start if it will be executed.
+
+    :return: The directory, the dependencies and the callback for the results of
+             the contexts.
+    """
+    execution_dir, dependencies = set_up_unit(bundle, plan, index)
+    if compilation_results.status != Status.CORRECT or updates is None:
+        return execution_dir, dependencies, None
+    updates.put(_UnitStarted(compilation_results, execution_dir))
+    return execution_dir, dependencies, updates.put
+
+
+def _unit_outcome(
+    compilation_results: CompilationResult,
+    execution_result_or_status: ExecutionResult | Status | None,
+    execution_dir: Path,
+) -> tuple[CompilationResult, ExecutionResult | None, Path]:
+    if isinstance(execution_result_or_status, Status):
+        # The results might be shared with other units.
+        compilation_results = evolve(
+            compilation_results, status=execution_result_or_status
+        )
+        return compilation_results, None, execution_dir
+    return compilation_results, execution_result_or_status, execution_dir
+
+
 def _execute_one_unit(
     bundle: Bundle,
     plan: ExecutionPlan,
-    compilation_results: CompilationResult | None,
+    compilation_results: CompilationResult,
     index: int,
+    updates: queue.SimpleQueue | None = None,
+    statistics: Statistics | None = None,
 ) -> tuple[CompilationResult, ExecutionResult | None, Path]:
+    """
+    Execute one unit of the plan, if it was compiled successfully.
+
+    If a queue for updates is given, the results of the contexts are put in it
+    while the unit is running (preceded by a :class:`_UnitStarted`). If statistics
+    are given, the execution of the unit is measured.
+    """
     planned_unit = plan.units[index]
-    # Prepare the unit.
-    execution_dir, dependencies = set_up_unit(bundle, plan, index)
+    execution_dir, dependencies, on_context = _start_one_unit(
+        bundle, plan, compilation_results, index, updates
+    )
+    if compilation_results.status != Status.CORRECT:
+        return compilation_results, None, execution_dir
 
-    # If compilation is necessary, do it.
-    if compilation_results is None:
-        local_compilation_results, dependencies = compile_unit(
-            bundle, plan, index, execution_dir, dependencies
+    with measure(statistics, "execution", planned_unit.name):
+        execution_result_or_status = execute_unit(
+            bundle,
+            planned_unit,
+            execution_dir,
+            dependencies,
+            plan.remaining_time(),
+            on_context=on_context,
+            forkserver=plan.forkserver,
         )
-    else:
-        local_compilation_results = compilation_results
+    return _unit_outcome(compilation_results, execution_result_or_status, execution_dir)
 
-    # Execute the unit.
-    if local_compilation_results.status == Status.CORRECT:
-        remaining_time = plan.remaining_time()
-        execution_result_or_status = execute_unit(
-            bundle, planned_unit, execution_dir, dependencies, remaining_time
+
+async def _execute_one_unit_async(
+    bundle: Bundle,
+    plan: ExecutionPlan,
+    compilation_results: CompilationResult,
+    index: int,
+    updates: queue.SimpleQueue | None = None,
+    statistics: Statistics | None = None,
+) -> tuple[CompilationResult, ExecutionResult | None, Path]:
+    """
+    Execute one unit of the plan, like :func:`_execute_one_unit`, with the asyncio
+    engine.
+    """
+    planned_unit = plan.units[index]
+    execution_dir, dependencies, on_context = _start_one_unit(
+        bundle, plan, compilation_results, index, updates
+    )
+    if compilation_results.status != Status.CORRECT:
+        return compilation_results, None, execution_dir
+
+    with measure(statistics, "execution", planned_unit.name):
+        execution_result_or_status = await execute_unit_async(
+            bundle,
+            planned_unit,
+            execution_dir,
+            dependencies,
+            plan.remaining_time(),
+            on_context=on_context,
+            forkserver=plan.forkserver,
         )
-        if isinstance(execution_result_or_status, Status):
-            local_compilation_results.status = execution_result_or_status
-            execution_result = None
+    return _unit_outcome(compilation_results, execution_result_or_status, execution_dir)
+
+
+@define
+class _SpeculativeCompilation:
+    """
+    The fallback compilation of the units of each tab, which runs at the same time
+    as the precompilation, see :mod:`tested.judge.speculation`.
+    """
+
+    # The plan with the units of each tab.
+    plan: ExecutionPlan
+    results: Future[list[CompilationResult]]
+    cancelled: threading.Event
+
+    def discard(self):
+        """
+        Stop the speculative compilation, since its results are not needed. The
+        running compiler is killed, so this only waits until it has stopped.
+        """
+        self.cancelled.set()
+        wait([self.results])
+
+
+def _start_speculative_compilation(
+    bundle: Bundle,
+    preparation: ExercisePreparation,
+    plan: ExecutionPlan,
+    history: CompilationHistory | None,
+    statistics: Statistics | None,
+) -> _SpeculativeCompilation | None:
+    """
+    Start compiling the units of each tab in the background, if the precompilation
+    of the exercise failed often enough in previous judgements.
+    """
+    threshold = bundle.config.options.speculative_compilation
+    units = preparation.plans[PlanStrategy.TAB]
+    if (
+        history is None
+        or threshold is None
+        or not bundle.config.options.allow_fallback
+        or len(units) < 2
+    ):
+        return None
+    failure_rate = history.failure_rate()
+    if failure_rate is None or failure_rate < threshold:
+        return None
+    _logger.info(
+        f"Precompilation failed in {failure_rate:.0%} of the judgements, "
+        "compiling the tabs speculatively."
+    )
+
+    speculative_plan = evolve(plan, units=units, unit_files=dict())
+    cancelled = threading.Event()
+
+    def _compile() -> list[CompilationResult]:
+        with measure(statistics, "compilation"), cancellable(cancelled):
+            # The results of the precompilation are not known yet, but they are
+            # not used: with multiple units, every unit is compiled.
+            return _bisect_compilation(
+                bundle,
+                speculative_plan,
+                CompilationResult(status=Status.COMPILATION_ERROR),
+                cancelled,
+            )
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(_compile)
+    executor.shutdown(wait=False)
+    return _SpeculativeCompilation(
+        plan=speculative_plan, results=future, cancelled=cancelled
+    )
+
+
+def _bisect_compilation(
+    bundle: Bundle,
+    plan: ExecutionPlan,
+    failed: CompilationResult,
+    cancelled: threading.Event | None = None,
+) -> list[CompilationResult]:
+    """
+    Compile the units of the plan in groups, after the precompilation failed.
+
+    The units are split in two halves, which are compiled separately. A half that
+    fails to compile is split again, until the units that fail are found. A single
+    broken unit thus costs a logarithmic number of compilations, instead of one
+    compilation for every unit. The units of a group that compiles are executed
+    with the results of that compilation.
+
+    :param failed: The results of the precompilation.
+    :param cancelled: If set, no more groups are compiled.
+    :return: The compilation results of each unit.
+    """
+    results = [failed] * len(plan.units)
+
+    def _compile(indices: list[int]):
+        if cancelled is not None and cancelled.is_set():
+            return
+        result = _compile_units(bundle, plan, indices)
+        if (
+            result.status == Status.CORRECT
+            or len(indices) == 1
+            or _is_fatal_compilation_error(result)
+        ):
+            for i in indices:
+                results[i] = result
         else:
-            execution_result = execution_result_or_status
-    else:
-        execution_result = None
+            _split(indices)
+
+    def _split(indices: list[int]):
+        middle = len(indices) // 2
+        _compile(indices[:middle])
+        _compile(indices[middle:])
+
+    # All units together were already compiled in the precompilation.
+    if len(plan.units) > 1:
+        _split(list(range(len(plan.units))))
+    return results
 
-    return local_compilation_results, execution_result, execution_dir
+
+def _compile_units(
+    bundle: Bundle, plan: ExecutionPlan, indices: list[int]
+) -> CompilationResult:
+    """
+    Generate and compile the code of some units of the plan in a new directory.
+    If the compilation succeeds, the units are executed with the results.
+    """
+    units = [plan.units[i] for i in indices]
+    name = f"{EXECUTION_PREFIX}-compilation-{indices[0]}-{indices[-1]}"
+    _logger.debug(f"Compiling units {indices[0]} to {indices[-1]} in {name}")
+    directory, dependencies, _ = _generate_files(
+        bundle,
+        units,
+        plan.remaining_time(),
+        directory=Path(bundle.config.workdir, name),
+    )
+    result, files = compile_directory(
+        bundle, directory, dependencies, plan.remaining_time()
+    )
+    if result.status == Status.CORRECT:
+        for i in indices:
+            plan.unit_files[i] = (directory, files)
+    return result
 
 
 def _generate_files(
-    bundle: Bundle, execution_plan: list[PlannedExecutionUnit]
+    bundle: Bundle,
+    execution_plan: list[PlannedExecutionUnit],
+    remaining: float,
+    harness: GeneratedHarness | None = None,
+    directory: Path | None = None,
 ) -> tuple[Path, list[str], str | None]:
     """
     Generate all necessary files, using the templates. This creates a common
     directory, copies all dependencies to that folder and runs the generation.
-    """
-    dependencies = bundle.language.initial_dependencies()
-    common_dir = Path(bundle.config.workdir, f"common")
-    common_dir.mkdir()
+    If a harness was already generated, it is copied instead.
 
-    _logger.debug(f"Generating files in common directory {common_dir}")
+    If possible, the dependencies of the language are compiled on their own, so
+    only the submission and the generated code need to be compiled.
 
-    # Copy dependencies
-    dependency_paths = bundle.language.path_to_dependencies()
-    copy_from_paths_to_path(dependency_paths, dependencies, common_dir)
+    :param directory: The directory to create, by default "common" in the workdir.
+    """
+    common_dir = directory or Path(bundle.config.workdir, f"common")
+    common_dir.mkdir()
 
-    # Copy the submission file.
+    if harness is None:
+        dependencies, selector = _generate_harness(bundle, execution_plan, common_dir)
+    else:
+        assert (
+            harness.testcase_separator_secret == bundle.testcase_separator_secret
+            and harness.context_separator_secret == bundle.context_separator_secret
+        ), "The harness was generated with other secrets."
+        _logger.debug(f"Copying generated files from {harness.directory}")
+        shutil.copytree(harness.directory, common_dir, dirs_exist_ok=True)
+        dependencies, selector = list(harness.files), harness.selector
+
+    language_dependencies = len(bundle.language.initial_dependencies())
+    if compiled := compile_dependencies(bundle, common_dir, remaining):
+        dependencies[:language_dependencies] = compiled
+        language_dependencies = len(compiled)
+
+    # Copy the submission file, after the dependencies of the language.
     submission = submission_file(bundle.language)
     solution_path = common_dir / submission
     shutil.copy2(bundle.config.source, solution_path)
-    dependencies.append(submission)
+    dependencies.insert(language_dependencies, submission)
 
     # Allow modifications of the submission file.
     bundle.language.modify_solution(solution_path)
 
+    return common_dir, dependencies, selector
+
+
+def _generate_harness(
+    bundle: Bundle, execution_plan: list[PlannedExecutionUnit], destination: Path
+) -> tuple[list[str], str | None]:
+    """
+    Generate the files that are needed besides the submission: the dependencies
+    of the language, the execution units, the oracles and the selector.
+    """
+    dependencies = bundle.language.initial_dependencies()
+
+    _logger.debug(f"Generating files in directory {destination}")
+
+    # Copy dependencies
+    dependency_paths = bundle.language.path_to_dependencies()
+    copy_from_paths_to_path(dependency_paths, dependencies, destination)
+
     # The names of the executions for the test suite.
     execution_names = []
     # Generate the files for each execution.
     for execution_unit in execution_plan:
         _logger.debug(f"Generating file for execution {execution_unit.name}")
         generated, evaluators = generate_execution(
-            bundle=bundle, destination=common_dir, execution_unit=execution_unit
+            bundle=bundle, destination=destination, execution_unit=execution_unit
         )
 
         # Copy functions to the directory.
         for evaluator in evaluators:
             source = Path(bundle.config.resources) / evaluator
-            _logger.debug(f"Copying oracle from {source} to {common_dir}")
-            shutil.copy2(source, common_dir)
+            _logger.debug(f"Copying oracle from {source} to {destination}")
+            shutil.copy2(source, destination)
 
         dependencies.extend(evaluators)
         dependencies.append(generated)
@@ -295,11 +804,20 @@ def _generate_files(
 
     if bundle.language.needs_selector():
         _logger.debug("Generating selector.")
-        generated = generate_selector(bundle, common_dir, execution_names)
+        generated = generate_selector(bundle, destination, execution_names)
         dependencies.append(generated)
     else:
         generated = None
-    return common_dir, dependencies, generated
+    return dependencies, generated
+
+
+def _report_statistics(bundle: Bundle, statistics: Statistics) -> list[Message]:
+    """
+    Write the statistics of the judgement to the workdir, and show them to the
+    staff.
+    """
+    statistics.write(bundle.config.workdir / STATISTICS_FILE)
+    return [statistics.to_message(bundle.config.options.parallel)]
 
 
 def _process_results(
@@ -307,15 +825,11 @@ def _process_results(
     collector: OutputManager,
     unit: PlannedExecutionUnit,
     compilation_results: CompilationResult,
-    execution_result: ExecutionResult | None,
+    context_results: Iterable[ContextResult | None],
     execution_dir: Path,
     currently_open_tab: int,
+    statistics: Statistics | None = None,
 ) -> tuple[Status | None, int]:
-    if execution_result:
-        context_results = execution_result.to_context_results()
-    else:
-        context_results = [None] * len(unit.contexts)
-
     for planned, context_result in zip(unit.contexts, context_results):
         planned: PlannedContext
         if currently_open_tab < planned.tab_index:
@@ -329,14 +843,15 @@ def _process_results(
         # Handle the contexts.
         collector.add(StartContext(description=planned.context.description))
 
-        continue_ = evaluate_context_results(
-            bundle,
-            context=planned.context,
-            exec_results=context_result,
-            context_dir=execution_dir,
-            collector=collector,
-            compilation_results=compilation_results,
-        )
+        with measure(statistics, "evaluation", unit.name):
+            continue_ = evaluate_context_results(
+                bundle,
+                context=planned.context,
+                exec_results=context_result,
+                context_dir=execution_dir,
+                collector=collector,
+                compilation_results=compilation_results,
+            )
 
         if bundle.language.supports_debug_information():
             # TODO: this is currently very Python-specific
@@ -378,7 +893,11 @@ def _process_results(
             )
         else:
             collector.add(CloseContext(), planned.context_index)
-        if continue_ in (Status.TIME_LIMIT_EXCEEDED, Status.MEMORY_LIMIT_EXCEEDED):
+        if continue_ in (
+            Status.TIME_LIMIT_EXCEEDED,
+            Status.MEMORY_LIMIT_EXCEEDED,
+            Status.OUTPUT_LIMIT_EXCEEDED,
+        ):
             return continue_, currently_open_tab
 
     return None, currently_open_tab
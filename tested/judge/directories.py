@@ -0,0 +1,83 @@
+"""
+Copying files into the directories of the compilation and the execution units.
+
+Every execution unit runs in its own directory, which gets the files of the workdir
+(e.g. the data files of the exercise) and the compiled files. With large data files
+and many units, copying the files takes a lot of time and disk I/O. Instead:
+
+- The compiled files are hard linked (see :func:`tested.judge.execution.set_up_unit`),
+  since they are not modified.
+- The files of the workdir are cloned (see :func:`clone_file`) if the file system
+  supports reflinks (e.g. Btrfs or XFS). A clone shares the data with the original
+  until one of them is modified, so it is as fast as a link and as safe as a copy.
+  Otherwise, they are copied.
+- If the ``link_workdir_files`` option is enabled, the read-only files of the
+  workdir are hard linked instead (see :func:`link_file`), which is fast on all
+  file systems. Since the submission cannot modify them, the links are safe.
+
+The strategies can be compared with ``python -m tested.benchmark directories``.
+"""
+
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import stat
+from collections.abc import Callable
+from pathlib import Path
+
+_logger = logging.getLogger(__name__)
+
+# From linux/fs.h: share the data of the source file with the destination file.
+_FICLONE = 0x40049409
+
+# The errors if the file system does not support reflinks.
+_NO_REFLINK_ERRORS = (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV)
+
+# The file systems (devices) that do not support reflinks, to not try again.
+_no_reflinks: set[int] = set()
+
+CopyFunction = Callable[[str | Path, str | Path], object]
+
+
+def clone_file(origin: str | Path, destination: str | Path):
+    """
+    Copy a file with its metadata, like :func:`shutil.copy2`, but share the data
+    with the original if the file system supports it.
+
+    :param origin: The file to copy.
+    :param destination: The path of the copy (not a directory).
+    """
+    device = os.stat(Path(destination).parent).st_dev
+    if device not in _no_reflinks:
+        try:
+            with open(origin, "rb") as source, open(destination, "wb") as target:
+                fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+            shutil.copystat(origin, destination)
+            return
+        except OSError as e:
+            if e.errno not in _NO_REFLINK_ERRORS:
+                raise
+            _logger.debug(f"No reflinks from {origin} to {destination}: {e}")
+            _no_reflinks.add(device)
+    shutil.copy2(origin, destination)
+
+
+def link_file(origin: str | Path, destination: str | Path):
+    """
+    Hard link a file if it is read-only, so the submission cannot modify it (the
+    changes would be visible in the other execution units and in the workdir).
+    Other files, and files that cannot be linked, are cloned instead.
+
+    :param origin: The file to link.
+    :param destination: The path of the link (not a directory).
+    """
+    if os.stat(origin).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH):
+        clone_file(origin, destination)
+        return
+    try:
+        os.link(origin, destination)
+    except OSError as e:
+        _logger.debug(f"Could not link {origin} to {destination}: {e}")
+        clone_file(origin, destination)
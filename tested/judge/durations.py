@@ -0,0 +1,215 @@
+"""
+Durations of the execution units of previous judgements.
+
+When executing in parallel, a slow unit at the end of the plan runs on its own
+while the other workers are idle. If we know how long the units took in previous
+judgements of the same exercise, we can start the longest units first instead.
+
+The durations are stored in a SQLite database in the cache directory of the
+options, so they are shared by all judgements (even in different processes)
+using that directory. An exercise is identified by its test suite and the
+programming language of the submissions. Only the most recently updated durations
+are kept, so the database does not keep growing.
+"""
+
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from tested.configs import Bundle
+from tested.judge.cache import hash_file
+
+# Prevent circular imports
+if TYPE_CHECKING:
+    from tested.judge.planning import PlannedContext, PlannedExecutionUnit
+
+_logger = logging.getLogger(__name__)
+
+_DATABASE = "durations.sqlite"
+
+# The maximal number of units in the database, for all exercises together.
+_MAX_DURATIONS = 50_000
+
+
+def _unit_key(unit: "PlannedExecutionUnit") -> str:
+    # The names of the units depend on the plan, so use the contexts instead.
+    first, last = unit.contexts[0], unit.contexts[-1]
+    return (
+        f"{first.tab_index}.{first.context_index}-{last.tab_index}.{last.context_index}"
+    )
+
+
+def _parse_unit_key(key: str) -> tuple[tuple[int, int], tuple[int, int]]:
+    first, last = key.split("-")
+    first_tab, first_context = first.split(".")
+    last_tab, last_context = last.split(".")
+    return (int(first_tab), int(first_context)), (int(last_tab), int(last_context))
+
+
+@contextmanager
+def connect(path: Path) -> Iterator[sqlite3.Connection]:
+    """
+    Connect to a database in the cache directory. The transaction is committed if
+    the with-block does not raise an exception.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Other judgements might be writing at the same time.
+    connection = sqlite3.connect(path, timeout=10)
+    try:
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def exercise_key(bundle: Bundle) -> str:
+    """
+    :return: A key for the exercise of the bundle: the test suite and the
+             programming language of the submission.
+    """
+    h = hashlib.sha256()
+    h.update(hash_file(bundle.config.resources / bundle.config.test_suite).encode())
+    h.update(bundle.config.programming_language.encode())
+    return h.hexdigest()
+
+
+class DurationStore:
+    """
+    The recorded durations of the units of one exercise.
+
+    This class is thread-safe.
+    """
+
+    __slots__ = ["path", "exercise", "_lock"]
+
+    path: Path
+    exercise: str
+
+    def __init__(self, path: Path, exercise: str, limit: int = _MAX_DURATIONS):
+        """
+        :param path: The database.
+        :param exercise: The key of the exercise, see :func:`exercise_key`.
+        :param limit: The maximal number of units in the database. When the store
+                      is opened, the least recently updated units are removed.
+        """
+        self.path = path
+        self.exercise = exercise
+        self._lock = threading.Lock()
+        with connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS durations ("
+                "exercise TEXT NOT NULL, unit TEXT NOT NULL, duration REAL NOT NULL,"
+                "updated REAL NOT NULL DEFAULT 0, PRIMARY KEY (exercise, unit))"
+            )
+            columns = connection.execute("PRAGMA table_info(durations)").fetchall()
+            if "updated" not in (column[1] for column in columns):
+                # A database from before the durations were limited.
+                connection.execute(
+                    "ALTER TABLE durations ADD COLUMN updated REAL NOT NULL DEFAULT 0"
+                )
+            connection.execute(
+                "DELETE FROM durations WHERE rowid IN (SELECT rowid FROM durations "
+                "ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+                (limit,),
+            )
+
+    def get(self) -> dict[str, float]:
+        """
+        :return: The recorded duration in seconds of the units, by key.
+        """
+        with self._lock, connect(self.path) as connection:
+            rows = connection.execute(
+                "SELECT unit, duration FROM durations WHERE exercise = ?",
+                (self.exercise,),
+            )
+            return dict(rows.fetchall())
+
+    def record(self, unit: "PlannedExecutionUnit", duration: float):
+        """
+        Record the duration of a unit. If a duration was recorded before, the
+        average of both is kept, so a single slow run does not dominate.
+        """
+        try:
+            with self._lock, connect(self.path) as connection:
+                connection.execute(
+                    "INSERT INTO durations VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (exercise, unit) "
+                    "DO UPDATE SET duration = (duration + excluded.duration) / 2, "
+                    "updated = excluded.updated",
+                    (self.exercise, _unit_key(unit), duration, time.time()),
+                )
+        except sqlite3.Error as e:
+            # The durations are only a hint, so this is not fatal.
+            _logger.warning(f"Could not record the duration of {unit.name}: {e}")
+
+
+def get_duration_store(bundle: Bundle) -> DurationStore | None:
+    """
+    Get the recorded durations for the exercise of the bundle.
+
+    :return: The store, or None if there is no cache directory.
+    """
+    cache_directory = bundle.config.options.cache_directory
+    if cache_directory is None:
+        return None
+    try:
+        return DurationStore(Path(cache_directory, _DATABASE), exercise_key(bundle))
+    except sqlite3.Error as e:
+        _logger.warning(f"Could not open the durations: {e}")
+        return None
+
+
+def context_durations(
+    durations: dict[str, float], contexts: list["PlannedContext"], startup: float
+) -> list[float | None]:
+    """
+    Estimate the duration of contexts from the recorded durations of the units.
+
+    The startup time is subtracted from the duration of a unit, and the rest is
+    divided evenly over its contexts. If a context was part of multiple recorded
+    units (from different plans), the average is used.
+
+    :param durations: The recorded durations, see :meth:`DurationStore.get`.
+    :param contexts: All contexts of the test suite, in order.
+    :param startup: The time needed to start a unit.
+    :return: The estimated duration of each context, if known.
+    """
+    positions = {(c.tab_index, c.context_index): i for i, c in enumerate(contexts)}
+    totals = [0.0] * len(contexts)
+    counts = [0] * len(contexts)
+    for key, duration in durations.items():
+        try:
+            first, last = _parse_unit_key(key)
+        except ValueError:
+            continue
+        start, end = positions.get(first), positions.get(last)
+        if start is None or end is None or end < start:
+            continue
+        per_context = max(duration - startup, 0) / (end - start + 1)
+        for i in range(start, end + 1):
+            totals[i] += per_context
+            counts[i] += 1
+    return [t / c if c else None for t, c in zip(totals, counts)]
+
+
+def longest_first(
+    units: list["PlannedExecutionUnit"], durations: dict[str, float]
+) -> list[int]:
+    """
+    Order the units by their recorded duration, longest first. Units without a
+    recorded duration come first (in their original order), since they might be
+    long as well.
+
+    :param units: The units of the plan.
+    :param durations: The recorded durations, see :meth:`DurationStore.get`.
+    :return: The indices of the units in the order they should be started.
+    """
+    keys = [_unit_key(unit) for unit in units]
+    return sorted(range(len(units)), key=lambda i: -durations.get(keys[i], math.inf))
@@ -0,0 +1,305 @@
+"""
+An asyncio engine to execute the units in parallel.
+
+By default, every execution unit that runs in parallel has its own thread, which
+blocks while the command of the unit runs. With the ``asyncio`` engine (see the
+``engine`` option), the units are tasks of a single event loop, which runs in one
+thread (see :class:`UnitRunner`):
+
+- The commands are started like in :func:`tested.judge.utils.run_command`. The
+  output on stdout and stderr, the input and the result files (through the output
+  callback) are handled concurrently by the event loop.
+- The exit of a command is awaited with a pidfd. The process is then waited for
+  by us, and not by asyncio, so its resource usage is still known.
+- Each command has a deadline. If it passes, or if the task is cancelled (e.g.
+  because the time of the judgement ran out), the process group of the command
+  is killed at once.
+
+Since all units share one thread, the CPU time that TESTed itself spends in the
+execution phase of a unit (see :mod:`tested.judge.statistics`) includes the work
+for the other units.
+"""
+
+import asyncio
+import logging
+import os
+import resource
+import select
+import threading
+import time
+from collections.abc import Callable, Coroutine
+from concurrent.futures import Future
+from pathlib import Path
+
+from tested.judge.forkserver import ForkedProcess, Forkserver
+from tested.judge.utils import (
+    POLL_INTERVAL,
+    BaseExecutionResult,
+    OutputCallback,
+    Process,
+    finish_command,
+    high_water_mark,
+    kill_group,
+    output_decoder,
+    start_command,
+    wait_for,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+async def _ready(fd: int, writing: bool = False):
+    """
+    Wait until a file descriptor can be read from (or written to).
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def _wake_up():
+        if not future.done():
+            future.set_result(None)
+
+    if writing:
+        loop.add_writer(fd, _wake_up)
+    else:
+        loop.add_reader(fd, _wake_up)
+    try:
+        await future
+    finally:
+        if writing:
+            loop.remove_writer(fd)
+        else:
+            loop.remove_reader(fd)
+
+
+async def _wait(process: Process) -> tuple[int, resource.struct_rusage]:
+    """
+    Wait for a process to exit.
+
+    :return: The wait status and the resource usage of the process.
+    """
+    if isinstance(process, ForkedProcess):
+        # The forkserver reports when the process has finished.
+        while (result := process.wait4(0)) is None:
+            await _ready(process.fileno())
+        return result
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except OSError:
+        # Without pidfds, a thread has to wait.
+        _, status, usage = await asyncio.to_thread(os.wait4, process.pid, 0)
+        return status, usage
+    try:
+        await _ready(pidfd)
+    finally:
+        os.close(pidfd)
+    _, status, usage = os.wait4(process.pid, 0)
+    return status, usage
+
+
+async def run_command_async(
+    directory: Path,
+    timeout: float | None,
+    command: list[str] | None = None,
+    stdin: str | None = None,
+    on_output: OutputCallback | None = None,
+    output_limit: int | None = None,
+    memory_limit: int | None = None,
+    limit_address_space: bool = False,
+    forkserver: Forkserver | None = None,
+) -> BaseExecutionResult | None:
+    """
+    Run a command, like :func:`tested.judge.utils.run_command`, as a task.
+
+    If the task is cancelled, the command and all processes it started are killed.
+
+    :return: The result of the execution if the command was not None.
+    """
+    if not command:
+        return None
+
+    process, memory = start_command(
+        directory,
+        command,
+        stdin is not None,
+        memory_limit,
+        limit_address_space,
+        forkserver,
+    )
+    start = time.monotonic()
+    assert process.stdout and process.stderr
+    output = {process.stdout: [], process.stderr: []}
+    # The output since the last call of the output callback.
+    new = {process.stdout: [], process.stderr: []}
+    decoders = {pipe: output_decoder() for pipe in output}
+    captured = 0
+    # Also measure commands that finish before the first output.
+    peak = high_water_mark(process.pid)
+    exceeded = asyncio.Event()
+
+    def _report():
+        nonlocal peak
+        if on_output is not None:
+            stdout, stderr = ("".join(new[pipe]) for pipe in output)
+            on_output(stdout, stderr)
+        for pieces in new.values():
+            pieces.clear()
+        peak = max(peak, high_water_mark(process.pid))
+
+    async def _drain(pipe):
+        nonlocal captured
+        while True:
+            await _ready(pipe.fileno())
+            data = os.read(pipe.fileno(), 32768)
+            if output_limit is not None and captured + len(data) > output_limit:
+                # Stop reading: we don't want to keep more than the limit.
+                data = data[: output_limit - captured]
+                exceeded.set()
+            captured += len(data)
+            text = decoders[pipe].decode(data, final=not data)
+            output[pipe].append(text)
+            new[pipe].append(text)
+            _report()
+            if not data or exceeded.is_set():
+                return
+
+    async def _feed(data: memoryview):
+        assert process.stdin
+        fd = process.stdin.fileno()
+        try:
+            while data:
+                await _ready(fd, writing=True)
+                try:
+                    written = os.write(fd, data[: select.PIPE_BUF])
+                except BrokenPipeError:
+                    return
+                data = data[written:]
+        finally:
+            process.stdin.close()
+
+    async def _watch():
+        # Call the output callback without new output as well.
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            _report()
+
+    tasks = [asyncio.create_task(_drain(pipe)) for pipe in output]
+    if stdin is not None:
+        tasks.append(asyncio.create_task(_feed(memoryview(stdin.encode()))))
+    watcher = asyncio.create_task(_watch())
+    limit = asyncio.create_task(exceeded.wait())
+
+    def _error() -> BaseException | None:
+        errors = [t.exception() for t in tasks if t.done() and not t.cancelled()]
+        return next((e for e in errors if e is not None), None)
+
+    timed_out = False
+    waited = None
+    try:
+        async with asyncio.timeout(timeout):
+            pending = set(tasks)
+            while pending and not limit.done():
+                _, pending = await asyncio.wait(
+                    pending | {limit}, return_when=asyncio.FIRST_COMPLETED
+                )
+                pending.discard(limit)
+            if not exceeded.is_set() and _error() is None:
+                # The output is closed, but the command might still be running.
+                waited = await _wait(process)
+    except TimeoutError:
+        timed_out = True
+    except asyncio.CancelledError:
+        _logger.debug(f"Execution of {command} was cancelled")
+        kill_group(process)
+        # The process was killed, so this does not block for long.
+        status, usage = wait_for(process)
+        elapsed = time.monotonic() - start
+        finish_command(
+            process,
+            memory,
+            status,
+            usage,
+            elapsed,
+            timeout,
+            peak,
+            "",
+            "",
+            captured,
+            True,
+            False,
+        )
+        raise
+    finally:
+        for task in (*tasks, watcher, limit):
+            task.cancel()
+
+    # If reading or writing failed, the error is raised after cleaning up.
+    error = _error()
+    if waited is None:
+        kill_group(process)
+        waited = await _wait(process)
+    status, usage = waited
+    result = finish_command(
+        process,
+        memory,
+        status,
+        usage,
+        time.monotonic() - start,
+        timeout,
+        peak,
+        "".join(output[process.stdout]),
+        "".join(output[process.stderr]),
+        captured,
+        timed_out,
+        exceeded.is_set(),
+    )
+    if error is not None:
+        raise error
+    return result
+
+
+class UnitRunner:
+    """
+    Runs the execution units as tasks of an event loop in a background thread.
+
+    This can be used like a :class:`concurrent.futures.ThreadPoolExecutor`, but
+    cancelling a future cancels its task, even if it is running. When leaving the
+    with-block, all tasks are waited for.
+    """
+
+    __slots__ = ["_loop", "_thread"]
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="tested-units", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, function: Callable[..., Coroutine], *args) -> Future:
+        """
+        Start a task with the coroutine of the function.
+        """
+        return asyncio.run_coroutine_threadsafe(function(*args), self._loop)
+
+    def shutdown(self):
+        """
+        Wait for all tasks (including cancelled ones that are still cleaning up)
+        and stop the event loop.
+        """
+
+        async def _remaining():
+            current = asyncio.current_task()
+            tasks = [t for t in asyncio.all_tasks() if t is not current]
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(_remaining(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "UnitRunner":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
@@ -82,6 +82,7 @@ def _evaluate_channel(
     unexpected_status: Status = Status.WRONG,
     timeout: bool = False,
     memory: bool = False,
+    output_limit: bool = False,
 ) -> bool:
     """
     Evaluate the output on a given channel. This function will output the
@@ -138,7 +139,11 @@ def _evaluate_channel(
         out.add(AppendMessage(message=status.human))
     elif should_report_case and memory and not is_correct:
         status.human = get_i18n_string("judge.evaluation.memory-limit")
-        status.enum = Status.TIME_LIMIT_EXCEEDED
+        status.enum = Status.MEMORY_LIMIT_EXCEEDED
+        out.add(AppendMessage(message=status.human))
+    elif should_report_case and output_limit and not is_correct:
+        status.human = get_i18n_string("judge.evaluation.output-limit")
+        status.enum = Status.OUTPUT_LIMIT_EXCEEDED
         out.add(AppendMessage(message=status.human))
 
     # Close the test.
@@ -281,6 +286,7 @@ def evaluate_context_results(
             actual_stderr,
             timeout=exec_results.timeout and len(stderr_) == i + 1,
             memory=exec_results.memory and len(stderr_) == i + 1,
+            output_limit=exec_results.output_limit and len(stderr_) == i + 1,
         )
         missing_exception = _evaluate_channel(
             bundle,
@@ -292,6 +298,7 @@ def evaluate_context_results(
             unexpected_status=Status.RUNTIME_ERROR,
             timeout=exec_results.timeout and len(exceptions) == i + 1,
             memory=exec_results.memory and len(exceptions) == i + 1,
+            output_limit=exec_results.output_limit and len(exceptions) == i + 1,
         )
         missing_stdout = _evaluate_channel(
             bundle,
@@ -302,6 +309,7 @@ def evaluate_context_results(
             actual_stdout,
             timeout=exec_results.timeout and len(stdout_) == i + 1,
             memory=exec_results.memory and len(stdout_) == i + 1,
+            output_limit=exec_results.output_limit and len(stdout_) == i + 1,
         )
         missing_return = _evaluate_channel(
             bundle,
@@ -313,6 +321,7 @@ def evaluate_context_results(
             testcase=testcase,
             timeout=exec_results.timeout and len(values) == i + 1,
             memory=exec_results.memory and len(values) == i + 1,
+            output_limit=exec_results.output_limit and len(values) == i + 1,
         )
 
         # If this is the last testcase, do the exit channel.
@@ -326,6 +335,7 @@ def evaluate_context_results(
                 str(exec_results.exit),
                 timeout=exec_results.timeout,
                 memory=exec_results.memory,
+                output_limit=exec_results.output_limit,
             )
         else:
             missing_exit = False
@@ -359,6 +369,8 @@ def evaluate_context_results(
         return Status.TIME_LIMIT_EXCEEDED
     if exec_results.memory:
         return Status.MEMORY_LIMIT_EXCEEDED
+    if exec_results.output_limit:
+        return Status.OUTPUT_LIMIT_EXCEEDED
     return None
 
 
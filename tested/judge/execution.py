@@ -1,21 +1,29 @@
+import codecs
+import io
 import itertools
 import logging
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any, BinaryIO
 
 from attrs import define
 
 from tested.configs import Bundle
 from tested.dodona import Status
-from tested.judge.compilation import process_compile_results, run_compilation
-from tested.judge.planning import CompilationResult, ExecutionPlan, PlannedExecutionUnit
+from tested.judge.engine import run_command_async
+from tested.judge.forkserver import Forkserver
+from tested.judge.planning import ExecutionPlan, PlannedExecutionUnit
 from tested.judge.utils import (
     BaseExecutionResult,
+    OutputCallback,
     copy_workdir_files,
     filter_files,
+    output_decoder,
     run_command,
 )
 from tested.languages.conventionalize import selector_name
 from tested.languages.preparation import exception_file, value_file
+from tested.testsuite import Context, IgnoredChannel
 from tested.utils import safe_del
 
 _logger = logging.getLogger(__name__)
@@ -77,6 +85,7 @@ class ExecutionResult(BaseExecutionResult):
                     stderr="",
                     timeout=self.timeout,
                     memory=self.memory,
+                    output_limit=self.output_limit,
                     separator=self.testcase_separator,
                     results="",
                 )
@@ -96,12 +105,213 @@ class ExecutionResult(BaseExecutionResult):
                     stderr=err or "",
                     timeout=self.timeout and index == size - 1,
                     memory=self.memory and index == size - 1,
+                    output_limit=self.output_limit and index == size - 1,
                 )
             )
 
         return context_execution_results
 
 
+def _can_stream(context: Context) -> bool:
+    # The exit code is only known at the end, and files might still be changed by
+    # the next contexts.
+    return not context.has_exit_testcase() and all(
+        t.output.file == IgnoredChannel.IGNORED for t in context.testcases
+    )
+
+
+class _Channel:
+    """
+    An output channel of an execution unit, split into the output of the contexts
+    as the output arrives.
+    """
+
+    __slots__ = [
+        "separator",
+        "pieces",
+        "_current",
+        "_tail",
+        "_file",
+        "_unread",
+        "_decoder",
+    ]
+
+    def __init__(self, separator: str, file: Path | None = None, limit: int = 0):
+        self.separator = separator
+        # The output between the context separators that were found so far.
+        self.pieces: list[str] = []
+        # The output after the last separator, and the end of it (which might be
+        # the start of a separator).
+        self._current: list[str] = []
+        self._tail = ""
+        self._file = file
+        # How much of the file may still be read.
+        self._unread = limit
+        self._decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")("backslashreplace"), translate=True
+        )
+
+    def _keep_tail(self, text: str) -> str:
+        return text[max(0, len(text) - len(self.separator) + 1) :]
+
+    def append(self, text: str):
+        if not text:
+            return
+        # The buffer starts with the tail, which is already in the current output.
+        buffer = self._tail + text
+        start = 0
+        while (position := buffer.find(self.separator, start)) != -1:
+            piece = buffer[start:position]
+            if start == 0:
+                current = "".join(self._current)
+                piece = current[: len(current) - len(self._tail)] + piece
+            self.pieces.append(piece)
+            start = position + len(self.separator)
+        if start == 0:
+            self._current.append(text)
+            self._tail = self._keep_tail(buffer)
+        else:
+            self._current = [buffer[start:]]
+            self._tail = self._keep_tail(buffer[start:])
+
+    def read(self, handle: BinaryIO | None) -> BinaryIO | None:
+        """
+        Read the new output from the file of this channel.
+
+        :return: The handle to use for the next read.
+        """
+        if handle is None:
+            try:
+                assert self._file is not None
+                handle = open(self._file, "rb")
+            except FileNotFoundError:
+                return None
+        data = handle.read(self._unread)
+        self._unread -= len(data)
+        self.append(self._decoder.decode(data))
+        return handle
+
+    def _offset(self) -> int:
+        # The first separator is printed before the first context, so the first
+        # piece is removed if it is empty (as in ExecutionResult.to_context_results).
+        return 1 if self.pieces and self.pieces[0] == "" else 0
+
+    def finished(self) -> int:
+        """
+        :return: The number of contexts that are finished on this channel.
+        """
+        return len(self.pieces) - self._offset()
+
+    def context(self, index: int) -> str:
+        return self.pieces[index + self._offset()]
+
+
+class ContextStream:
+    """
+    Splits the output of an execution unit into the results of the contexts, while
+    the unit is still running.
+
+    A context is finished once the next context has started on all channels.
+    Only contexts that do not depend on the end of the execution are passed to the
+    callback: see :func:`_can_stream`. All later contexts are only available in the
+    final result of the execution.
+    """
+
+    def __init__(
+        self,
+        bundle: Bundle,
+        unit: PlannedExecutionUnit,
+        directory: Path,
+        on_context: Callable[[ContextResult], None],
+    ):
+        self.context_separator = f"--{bundle.context_separator_secret}-- SEP"
+        self.testcase_separator = f"--{bundle.testcase_separator_secret}-- SEP"
+        self.stdout = _Channel(self.context_separator)
+        self.stderr = _Channel(self.context_separator)
+        limit = bundle.config.output_limit
+        self.values = _Channel(
+            self.context_separator, value_file(bundle, directory), limit
+        )
+        self.exceptions = _Channel(
+            self.context_separator, exception_file(bundle, directory), limit
+        )
+        self.streamed = 0
+        self._handles: list[BinaryIO | None] = [None, None]
+        self._streamable = len(unit.contexts)
+        for index, planned in enumerate(unit.contexts):
+            if not _can_stream(planned.context):
+                self._streamable = index
+                break
+        self._on_context = on_context
+
+    def on_output(self, stdout: str, stderr: str):
+        if self.streamed >= self._streamable:
+            return
+        self.stdout.append(stdout)
+        self.stderr.append(stderr)
+        self._handles[0] = self.values.read(self._handles[0])
+        self._handles[1] = self.exceptions.read(self._handles[1])
+
+        channels = (self.stdout, self.stderr, self.values, self.exceptions)
+        finished = min(channel.finished() for channel in channels)
+        while self.streamed < min(finished, self._streamable):
+            index = self.streamed
+            self._on_context(
+                ContextResult(
+                    separator=self.testcase_separator,
+                    # The exit code is not known yet, but is not checked either.
+                    exit=0,
+                    results=self.values.context(index),
+                    exceptions=self.exceptions.context(index),
+                    stdout=self.stdout.context(index),
+                    stderr=self.stderr.context(index),
+                    timeout=False,
+                    memory=False,
+                )
+            )
+            self.streamed += 1
+
+    def close(self):
+        for handle in self._handles:
+            if handle is not None:
+                handle.close()
+
+
+def _execution_arguments(
+    bundle: Bundle,
+    executable_name: str,
+    working_directory: Path,
+    remaining: float | None,
+    stdin: str | None,
+    argument: str | None,
+    on_output: OutputCallback | None,
+    forkserver: Forkserver | None,
+) -> dict[str, Any]:
+    """
+    :return: The arguments of :func:`run_command` to execute a file.
+    """
+    _logger.info(f"Starting execution on file {executable_name}")
+
+    command = bundle.language.execution(
+        cwd=working_directory,
+        file=executable_name,
+        arguments=[argument] if argument else [],
+    )
+    _logger.debug(f"Executing {command} in directory {working_directory}")
+
+    return dict(
+        directory=working_directory,
+        timeout=remaining,
+        command=command,
+        stdin=stdin,
+        on_output=on_output,
+        output_limit=bundle.config.output_limit,
+        memory_limit=bundle.config.memory_limit,
+        limit_address_space=bundle.language.supports_address_space_limit(),
+        forkserver=forkserver,
+    )
+
+
 def execute_file(
     bundle: Bundle,
     executable_name: str,
@@ -109,6 +319,8 @@ def execute_file(
     remaining: float | None,
     stdin: str | None = None,
     argument: str | None = None,
+    on_output: OutputCallback | None = None,
+    forkserver: Forkserver | None = None,
 ) -> BaseExecutionResult:
     """
     Execute a file.
@@ -123,31 +335,72 @@ def execute_file(
     :param executable_name: The executable that should be executed. This file
                             will not be present in the dependency list.
     :param remaining: The max amount of time.
+    :param on_output: Optional, called with the output during the execution.
+    :param forkserver: Optional, the forkserver that starts the execution.
 
     :return: The result of the execution.
     """
-    _logger.info(f"Starting execution on file {executable_name}")
-
-    command = bundle.language.execution(
-        cwd=working_directory,
-        file=executable_name,
-        arguments=[argument] if argument else [],
+    result = run_command(
+        **_execution_arguments(
+            bundle,
+            executable_name,
+            working_directory,
+            remaining,
+            stdin,
+            argument,
+            on_output,
+            forkserver,
+        )
     )
-    _logger.debug(f"Executing {command} in directory {working_directory}")
+    assert result is not None
+    return result
 
-    result = run_command(working_directory, remaining, command, stdin)
 
+async def execute_file_async(
+    bundle: Bundle,
+    executable_name: str,
+    working_directory: Path,
+    remaining: float | None,
+    stdin: str | None = None,
+    argument: str | None = None,
+    on_output: OutputCallback | None = None,
+    forkserver: Forkserver | None = None,
+) -> BaseExecutionResult:
+    """
+    Execute a file, like :func:`execute_file`, with the asyncio engine (see
+    :mod:`tested.judge.engine`).
+    """
+    result = await run_command_async(
+        **_execution_arguments(
+            bundle,
+            executable_name,
+            working_directory,
+            remaining,
+            stdin,
+            argument,
+            on_output,
+            forkserver,
+        )
+    )
     assert result is not None
     return result
 
 
-def _get_contents_or_empty(file_path: Path) -> str:
+def _get_contents_or_empty(file_path: Path, limit: int) -> tuple[str, int, bool]:
+    """
+    Read at most limit bytes from a file.
+
+    :return: The contents, the number of bytes that were read, and whether the file
+             was longer than the limit.
+    """
     try:
-        with open(file_path, "r") as f:
-            return f.read()
+        with open(file_path, "rb") as f:
+            data = f.read(limit)
+            exceeded = f.read(1) != b""
     except FileNotFoundError:
         _logger.warning(f"File not found, looked in {file_path}")
-        return ""
+        return "", 0, False
+    return output_decoder().decode(data, final=True), len(data), exceeded
 
 
 def set_up_unit(
@@ -161,14 +414,17 @@ def set_up_unit(
     _logger.info(f"Preparing {unit.name} in {execution_dir}")
 
     # Filter dependencies of the global compilation results.
-    dependencies = filter_files(plan.files, plan.common_directory)
+    common_directory, files = plan.files_of(which_unit)
+    dependencies = filter_files(files, common_directory)
     dependencies = bundle.language.filter_dependencies(dependencies, unit.name)
     _logger.debug(f"Dependencies are {dependencies}")
-    copy_workdir_files(bundle, execution_dir, True)
+    copy_workdir_files(
+        bundle, execution_dir, True, bundle.config.options.link_workdir_files
+    )
 
     # Copy files from the common directory to the context directory.
     for file in dependencies:
-        origin = plan.common_directory / file
+        origin = common_directory / file
         destination = execution_dir / file
         # Ensure we preserve subdirectories.
         destination.parent.mkdir(parents=True, exist_ok=True)
@@ -183,46 +439,25 @@ def set_up_unit(
     return execution_dir, dependencies
 
 
-def compile_unit(
-    bundle: Bundle,
-    plan: ExecutionPlan,
-    which_unit: int,
-    execution_dir: Path,
-    dependencies: list[Path],
-) -> tuple[CompilationResult, list[Path]]:
-    unit = plan.units[which_unit]
-    _logger.info(f"Compiling unit {unit.name}")
-    remaining = plan.remaining_time()
-    deps = [str(x) for x in dependencies]
-    result, files = run_compilation(bundle, execution_dir, deps, remaining)
-
-    # A new compilation means a new file filtering
-    files = filter_files(files, execution_dir)
+@define
+class _PreparedUnit:
+    """
+    The execution of a unit, see :func:`_prepare_unit`.
+    """
 
-    # Process compilation results.
-    processed_results = process_compile_results(bundle.language, result)
-    return processed_results, files
+    executable: str
+    argument: str | None
+    stdin: str | None
+    stream: ContextStream | None
 
 
-def execute_unit(
+def _prepare_unit(
     bundle: Bundle,
     unit: PlannedExecutionUnit,
     execution_dir: Path,
     dependencies: list[Path],
-    remaining_time: float,
-) -> ExecutionResult | Status:
-    """
-    Execute a unit.
-
-    This function assumes the files have been prepared (set_up_unit) and
-    compilation has happened if needed.
-
-    :param bundle: The bundle.
-    :param unit: The unit to execute.
-    :param execution_dir: The directory in which we execute.
-    :param dependencies: The dependencies.
-    :param remaining_time: The remaining time for this execution.
-    """
+    on_context: Callable[[ContextResult], None] | None,
+) -> _PreparedUnit | Status:
     _logger.info(f"Executing unit {unit.name}")
 
     files = list(dependencies)  # A copy of the files.
@@ -240,24 +475,36 @@ def execute_unit(
         return executable_or_status
 
     executable = executable_or_status
-    files.remove(executable)
     stdin = unit.get_stdin(bundle.config.resources)
 
-    # Do the execution.
-    base_result = execute_file(
-        bundle,
-        executable_name=executable.name,
-        working_directory=execution_dir,
-        stdin=stdin,
-        argument=argument,
-        remaining=remaining_time,
+    if on_context is not None:
+        stream = ContextStream(bundle, unit, execution_dir, on_context)
+    else:
+        stream = None
+    return _PreparedUnit(
+        executable=executable.name, argument=argument, stdin=stdin, stream=stream
     )
 
+
+def _unit_result(
+    bundle: Bundle,
+    unit: PlannedExecutionUnit,
+    execution_dir: Path,
+    base_result: BaseExecutionResult,
+) -> ExecutionResult:
+    _logger.debug(f"Peak memory of {unit.name}: {base_result.peak_memory} bytes")
+
     testcase_identifier = f"--{bundle.testcase_separator_secret}-- SEP"
     context_identifier = f"--{bundle.context_separator_secret}-- SEP"
 
-    values = _get_contents_or_empty(value_file(bundle, execution_dir))
-    exceptions = _get_contents_or_empty(exception_file(bundle, execution_dir))
+    # The values and the exceptions share the output limit.
+    limit = bundle.config.output_limit
+    values, size, values_exceeded = _get_contents_or_empty(
+        value_file(bundle, execution_dir), limit
+    )
+    exceptions, _, exceptions_exceeded = _get_contents_or_empty(
+        exception_file(bundle, execution_dir), limit - size
+    )
 
     return ExecutionResult(
         stdout=base_result.stdout,
@@ -269,4 +516,91 @@ def execute_unit(
         exceptions=exceptions,
         timeout=base_result.timeout,
         memory=base_result.memory,
+        output_limit=(
+            base_result.output_limit or values_exceeded or exceptions_exceeded
+        ),
+        peak_memory=base_result.peak_memory,
     )
+
+
+def execute_unit(
+    bundle: Bundle,
+    unit: PlannedExecutionUnit,
+    execution_dir: Path,
+    dependencies: list[Path],
+    remaining_time: float,
+    on_context: Callable[[ContextResult], None] | None = None,
+    forkserver: Forkserver | None = None,
+) -> ExecutionResult | Status:
+    """
+    Execute a unit.
+
+    This function assumes the files have been prepared (set_up_unit) and
+    compilation has happened if needed.
+
+    :param bundle: The bundle.
+    :param unit: The unit to execute.
+    :param execution_dir: The directory in which we execute.
+    :param dependencies: The dependencies.
+    :param remaining_time: The remaining time for this execution.
+    :param on_context: Optional, called with the results of the contexts that are
+                       finished while the unit is still running (in order). The
+                       results of the other contexts are in the returned result.
+    :param forkserver: Optional, the forkserver that starts the execution.
+    """
+    prepared = _prepare_unit(bundle, unit, execution_dir, dependencies, on_context)
+    if isinstance(prepared, Status):
+        return prepared
+
+    # Do the execution.
+    try:
+        base_result = execute_file(
+            bundle,
+            executable_name=prepared.executable,
+            working_directory=execution_dir,
+            remaining=remaining_time,
+            stdin=prepared.stdin,
+            argument=prepared.argument,
+            on_output=prepared.stream.on_output if prepared.stream else None,
+            forkserver=forkserver,
+        )
+    finally:
+        if prepared.stream is not None:
+            prepared.stream.close()
+
+    return _unit_result(bundle, unit, execution_dir, base_result)
+
+
+async def execute_unit_async(
+    bundle: Bundle,
+    unit: PlannedExecutionUnit,
+    execution_dir: Path,
+    dependencies: list[Path],
+    remaining_time: float,
+    on_context: Callable[[ContextResult], None] | None = None,
+    forkserver: Forkserver | None = None,
+) -> ExecutionResult | Status:
+    """
+    Execute a unit, like :func:`execute_unit`, with the asyncio engine (see
+    :mod:`tested.judge.engine`).
+    """
+    prepared = _prepare_unit(bundle, unit, execution_dir, dependencies, on_context)
+    if isinstance(prepared, Status):
+        return prepared
+
+    try:
+        base_result = await execute_file_async(
+            bundle,
+            executable_name=prepared.executable,
+            working_directory=execution_dir,
+            remaining=remaining_time,
+            stdin=prepared.stdin,
+            argument=prepared.argument,
+            on_output=prepared.stream.on_output if prepared.stream else None,
+            forkserver=forkserver,
+        )
+    finally:
+        if prepared.stream is not None:
+            prepared.stream.close()
+
+    return _unit_result(bundle, unit, execution_dir, base_result)
@@ -0,0 +1,247 @@
+"""
+Executing the units through a forkserver.
+
+For some languages (see :meth:`tested.languages.language.Language.forkserver`),
+starting the interpreter and importing the harness takes a large part of the
+execution of a unit. A forkserver is a warm process of the language that has
+imported the harness once. For each execution unit, it forks a child that runs the
+unit, instead of starting a new process.
+
+The children behave like the processes started by :func:`tested.judge.utils.run_command`:
+
+- TESTed creates the pipes for stdin, stdout and stderr, and sends them to the
+  forkserver with the request (over a Unix socket).
+- The child runs in its own session, so its process group can be killed.
+- The forkserver waits for the child, and sends the wait status and the resource
+  usage back to TESTed, since TESTed cannot wait for a process that is not its
+  own child.
+
+The protocol is line-based JSON. A request has the ``directory``, the ``command``
+(as it would be started without the forkserver), the ``address_space`` limit and
+the ``cgroup`` to join (see :mod:`tested.judge.limits`), and is sent with the three
+pipes. The forkserver answers with the ``pid`` of the
+child (once it runs in its own session), and later with its ``status`` and
+``rusage``.
+"""
+
+import json
+import logging
+import os
+import resource
+import select
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+_logger = logging.getLogger(__name__)
+
+# How long to wait for a new forkserver to accept connections.
+_STARTUP_TIMEOUT = 10.0
+
+
+class ForkedProcess:
+    """
+    A process started by a forkserver. It has the attributes of
+    :class:`subprocess.Popen` that are used by :func:`tested.judge.utils.run_command`.
+    """
+
+    __slots__ = [
+        "pid",
+        "stdin",
+        "stdout",
+        "stderr",
+        "returncode",
+        "_connection",
+        "_received",
+    ]
+
+    pid: int
+    stdin: BinaryIO | None
+    stdout: BinaryIO
+    stderr: BinaryIO
+    returncode: int | None
+
+    def __init__(
+        self,
+        server: Path,
+        directory: Path,
+        command: list[str],
+        with_stdin: bool,
+        address_space: int | None,
+        cgroup: Path | None,
+    ):
+        stdout, child_stdout = os.pipe()
+        stderr, child_stderr = os.pipe()
+        if with_stdin:
+            child_stdin, stdin = os.pipe()
+        else:
+            child_stdin, stdin = os.open(os.devnull, os.O_RDONLY), None
+        child_fds = [child_stdin, child_stdout, child_stderr]
+
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(str(server))
+            request = {
+                "directory": str(directory),
+                "command": command,
+                "address_space": address_space,
+                "cgroup": str(cgroup) if cgroup is not None else None,
+            }
+            socket.send_fds(connection, [json.dumps(request).encode()], child_fds)
+        except OSError:
+            connection.close()
+            for fd in (stdout, stderr, stdin):
+                if fd is not None:
+                    os.close(fd)
+            raise
+        finally:
+            for fd in child_fds:
+                os.close(fd)
+
+        self._connection = connection
+        self._received = b""
+        self.stdin = open(stdin, "wb") if stdin is not None else None
+        self.stdout = open(stdout, "rb")
+        self.stderr = open(stderr, "rb")
+        self.returncode = None
+        if not (line := self._read_line()):
+            self._connection.close()
+            raise OSError("The forkserver did not start the process")
+        self.pid = json.loads(line)["pid"]
+
+    def _read_line(self, timeout: float | None = None) -> bytes | None:
+        """
+        Read a line from the forkserver.
+
+        :return: The line, an empty line if the forkserver closed the connection, or
+                 None if the timeout passed first.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while b"\n" not in self._received:
+            if deadline is not None:
+                left = max(deadline - time.monotonic(), 0)
+                ready, _, _ = select.select([self._connection], [], [], left)
+                if not ready:
+                    return None
+            if not (chunk := self._connection.recv(4096)):
+                return b""
+            self._received += chunk
+        line, self._received = self._received.split(b"\n", 1)
+        return line
+
+    def fileno(self) -> int:
+        """
+        :return: A file descriptor that is readable once the process has finished,
+                 unless the result was already received (see :meth:`wait4`).
+        """
+        return self._connection.fileno()
+
+    def wait4(
+        self, timeout: float | None = None
+    ) -> tuple[int, resource.struct_rusage] | None:
+        """
+        Wait until the process has finished.
+
+        :param timeout: Optional, the max amount of time to wait.
+        :return: The wait status and the resource usage of the process, or None if
+                 it is still running when the timeout passes.
+        """
+        if (line := self._read_line(timeout)) is None:
+            return None
+        self._connection.close()
+        if not line:
+            # The forkserver is gone, and took the process with it.
+            _logger.warning(f"The forkserver did not report process {self.pid}")
+            return 9, resource.struct_rusage((0,) * 16)
+        result = json.loads(line)
+        return result["status"], resource.struct_rusage(result["rusage"])
+
+
+class Forkserver:
+    """
+    A running forkserver. Use :meth:`start` to start one, and :meth:`stop` (or a
+    with-block) to stop it.
+    """
+
+    __slots__ = ["process", "directory", "socket"]
+
+    process: subprocess.Popen
+    directory: Path
+    socket: Path
+
+    def __init__(self, process: subprocess.Popen, directory: Path):
+        self.process = process
+        self.directory = directory
+        self.socket = directory / "socket"
+
+    @staticmethod
+    def start(command: list[str]) -> "Forkserver | None":
+        """
+        Start a forkserver. The path of the socket it must listen on is appended to
+        the command. The forkserver must create the socket once it accepts
+        connections, and stop when its stdin is closed.
+
+        :return: The forkserver, or None if it did not start.
+        """
+        # Unix socket paths are short, so this cannot be in the workdir.
+        directory = Path(tempfile.mkdtemp(prefix="tested-forkserver-"))
+        server = Forkserver(
+            subprocess.Popen(
+                [*command, str(directory / "socket")],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                start_new_session=True,
+            ),
+            directory,
+        )
+        deadline = time.monotonic() + _STARTUP_TIMEOUT
+        while not server.socket.exists():
+            if server.process.poll() is not None or time.monotonic() > deadline:
+                server.stop()
+                return None
+            time.sleep(0.01)
+        _logger.debug(f"Started forkserver {command}")
+        return server
+
+    def spawn(
+        self,
+        directory: Path,
+        command: list[str],
+        with_stdin: bool,
+        address_space: int | None,
+        cgroup: Path | None,
+    ) -> ForkedProcess:
+        """
+        Start a process, like :func:`tested.judge.utils.start_command`.
+
+        :param directory: The working directory of the process.
+        :param command: The command to start without the forkserver.
+        :param with_stdin: If the process gets a pipe for stdin, or /dev/null.
+        :param address_space: Optional, the limit on the address space of the process.
+        :param cgroup: Optional, the cgroup the process joins before it runs.
+        """
+        return ForkedProcess(
+            self.socket, directory, command, with_stdin, address_space, cgroup
+        )
+
+    def stop(self):
+        # This closes the stdin of the forkserver, which stops it.
+        try:
+            _, errors = self.process.communicate(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            _, errors = self.process.communicate()
+        if errors:
+            _logger.warning(f"The forkserver failed: {errors.decode(errors='replace')}")
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> "Forkserver":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,233 @@
+"""
+Limits on the resources used by the submission.
+
+The memory of an execution is limited in two ways:
+
+- If this process runs in a cgroup (v2) that is delegated to it, each execution
+  gets its own child cgroup. The kernel then limits the resident memory of all
+  processes of the execution, and kills them if they use too much. This also
+  measures the peak memory of the execution.
+- Otherwise, the address space of the process is limited (if the language supports
+  it, since runtimes like the JVM reserve much more memory than they use). An
+  allocation that exceeds the limit fails, which the runtimes report in their own
+  way: the execution is out of memory if it failed with such a message.
+
+The limits are applied before the command starts, without running code between
+fork and exec in this multithreaded process: the command is started through a
+wrapper that applies the limit and then executes the command. The wrapper is
+``prlimit`` (from util-linux) for the address space, or the shell if it is not
+installed, and the shell to join the cgroup. A forkserver applies the limits itself
+(see :mod:`tested.judge.forkserver`).
+"""
+
+import logging
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+from tested.utils import get_identifier
+
+_logger = logging.getLogger(__name__)
+
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+# The cgroup this process moves into, so its own cgroup has no processes.
+_LEAF = "tested-judge"
+
+# The messages of the runtimes when an allocation fails.
+_OUT_OF_MEMORY = re.compile(
+    r"MemoryError|OutOfMemory|bad_alloc|out of memory|Cannot allocate memory",
+    re.IGNORECASE,
+)
+
+_cgroup_parent: Path | None = None
+_cgroup_parent_checked = False
+_cgroup_lock = threading.Lock()
+
+
+def _enable_memory_controller(own: Path) -> bool:
+    """
+    Enable the memory controller for the children of the cgroup of this process.
+
+    Because of the no-internal-process rule of cgroup v2, this is only possible if
+    the cgroup has no processes: this process therefore moves itself into a leaf
+    child cgroup first. If other processes remain, this process moves back.
+    """
+    leaf = own / _LEAF
+    try:
+        leaf.mkdir(exist_ok=True)
+        (leaf / "cgroup.procs").write_text(str(os.getpid()))
+    except OSError as e:
+        _logger.debug(f"Could not move into cgroup {leaf}: {e}")
+        return False
+    try:
+        (own / "cgroup.subtree_control").write_text("+memory")
+        return True
+    except OSError as e:
+        _logger.debug(f"Could not enable the memory controller in {own}: {e}")
+    try:
+        (own / "cgroup.procs").write_text(str(os.getpid()))
+    except OSError:
+        pass
+    return False
+
+
+def _find_cgroup_parent() -> Path | None:
+    """
+    Find the cgroup in which we can create child cgroups with a memory limit: the
+    cgroup of this process, if the memory controller is (or can be) enabled for its
+    children.
+    """
+    global _cgroup_parent, _cgroup_parent_checked
+    with _cgroup_lock:
+        if _cgroup_parent_checked:
+            return _cgroup_parent
+        _cgroup_parent_checked = True
+        try:
+            with open("/proc/self/cgroup", "r") as f:
+                # For cgroup v2, the only line is "0::<path>".
+                lines = [x.strip() for x in f if x.startswith("0::")]
+            own = _CGROUP_ROOT / lines[0].removeprefix("0::").lstrip("/")
+            available = (own / "cgroup.controllers").read_text().split()
+            enabled = (own / "cgroup.subtree_control").read_text().split()
+        except (OSError, IndexError):
+            return None
+        if "memory" not in available or not os.access(own, os.W_OK):
+            return None
+        if "memory" in enabled or _enable_memory_controller(own):
+            _cgroup_parent = own
+        _logger.debug(f"Using cgroup {_cgroup_parent} for memory limits")
+        return _cgroup_parent
+
+
+class MemoryCgroup:
+    """
+    A cgroup (v2) that limits the memory of the processes in it.
+    """
+
+    __slots__ = ["path"]
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def peak(self) -> int | None:
+        """
+        :return: The peak memory usage in bytes, if the kernel supports it.
+        """
+        try:
+            return int((self.path / "memory.peak").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def oom_killed(self) -> bool:
+        try:
+            with open(self.path / "memory.events", "r") as f:
+                events = dict(line.split() for line in f)
+        except (OSError, ValueError):
+            return False
+        return int(events.get("oom_kill", 0)) > 0
+
+    def remove(self):
+        try:
+            # Kill remaining processes, if the kernel supports it.
+            (self.path / "cgroup.kill").write_text("1")
+        except OSError:
+            pass
+        try:
+            self.path.rmdir()
+        except OSError as e:
+            _logger.warning(f"Could not remove cgroup {self.path}: {e}")
+
+
+def _create_cgroup(limit: int) -> MemoryCgroup | None:
+    if (parent := _find_cgroup_parent()) is None:
+        return None
+    path = parent / f"tested-{get_identifier()}"
+    try:
+        path.mkdir()
+        (path / "memory.max").write_text(str(limit))
+        if (swap := path / "memory.swap.max").exists():
+            swap.write_text("0")
+    except OSError as e:
+        _logger.warning(f"Could not create cgroup {path}: {e}")
+        try:
+            path.rmdir()
+        except OSError:
+            pass
+        return None
+    return MemoryCgroup(path)
+
+
+class MemoryLimit:
+    """
+    The memory limit of a command, see :func:`prepare_memory_limit`.
+    """
+
+    __slots__ = ["limit", "cgroup", "address_space"]
+
+    limit: int
+    cgroup: MemoryCgroup | None
+    address_space: bool
+
+    def __init__(self, limit: int, cgroup: MemoryCgroup | None, address_space: bool):
+        """
+        :param limit: The maximal memory usage in bytes.
+        :param cgroup: The cgroup the command runs in, if any.
+        :param address_space: If the address space of the command is limited.
+        """
+        self.limit = limit
+        self.cgroup = cgroup
+        self.address_space = address_space
+
+    def wrap(self, command: list[str]) -> list[str]:
+        """
+        :return: The command that applies the limit and then executes the command.
+        """
+        if self.cgroup is not None:
+            procs = str(self.cgroup.path / "cgroup.procs")
+            return ["sh", "-c", 'echo $$ > "$0" && exec "$@"', procs, *command]
+        if self.address_space:
+            if prlimit := shutil.which("prlimit"):
+                return [prlimit, f"--as={self.limit}", "--", *command]
+            kilobytes = str(self.limit // 1024)
+            return ["sh", "-c", 'ulimit -v "$0" && exec "$@"', kilobytes, *command]
+        return command
+
+    def peak(self) -> int | None:
+        """
+        :return: The peak memory usage in bytes, if it is measured by the limit.
+        """
+        return self.cgroup.peak() if self.cgroup is not None else None
+
+    def exceeded(self, returncode: int, stderr: str) -> bool:
+        """
+        :return: If the command failed because it exceeded the limit.
+        """
+        if self.cgroup is not None and self.cgroup.oom_killed():
+            return True
+        if self.address_space and returncode != 0:
+            return _OUT_OF_MEMORY.search(stderr) is not None
+        return False
+
+    def remove(self):
+        """
+        Remove the cgroup, once the command has finished.
+        """
+        if self.cgroup is not None:
+            self.cgroup.remove()
+
+
+def prepare_memory_limit(limit: int, address_space: bool) -> MemoryLimit:
+    """
+    Prepare to limit the memory of a command that will be started. The command must
+    be started with :meth:`MemoryLimit.wrap`, or by a forkserver that applies the
+    limit itself.
+
+    :param limit: The maximal memory usage in bytes.
+    :param address_space: If the address space of the process may be limited if no
+                          cgroup is available.
+    """
+    cgroup = _create_cgroup(limit)
+    return MemoryLimit(limit, cgroup, address_space and cgroup is None)
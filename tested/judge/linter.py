@@ -1,13 +1,57 @@
+"""
+Running the linter of the language on the submission.
+
+If a cache directory is configured, the results of the linter are cached for
+languages that can identify their linter (see
+:meth:`tested.languages.language.Language.linter_fingerprint`), so resubmissions
+of the same code are not linted again.
+"""
+
+import hashlib
+import json
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from tested.configs import Bundle
-from tested.dodona import AppendMessage
+from tested.dodona import AnnotateCode, AppendMessage, Message
+from tested.judge.cache import get_cache, hash_file
 from tested.judge.collector import OutputManager
+from tested.judge.statistics import Statistics, measure
+from tested.parsing import get_converter
 
 _logger = logging.getLogger(__name__)
 
+LinterResults = tuple[list[Message], list[AnnotateCode]]
+
 
-def run_linter(bundle: Bundle, collector: OutputManager, remaining: float):
+def _cache_key(bundle: Bundle) -> str | None:
+    """
+    Compute the key for the results of the linter: the submission, the linter and
+    its configuration, the options of the language and the natural language (the
+    messages are translated).
+
+    :return: The key, or None if the results cannot be cached.
+    """
+    config = bundle.config
+    try:
+        if (fingerprint := bundle.language.linter_fingerprint()) is None:
+            return None
+        submission = hash_file(config.source)
+    except OSError as e:
+        _logger.debug(f"Not caching the linter: {e}")
+        return None
+    key = [
+        config.programming_language,
+        config.natural_language,
+        config.source_offset,
+        config.config_for(),
+        fingerprint,
+        submission,
+    ]
+    return hashlib.sha256(json.dumps(key, default=str).encode()).hexdigest()
+
+
+def run_linter(bundle: Bundle, remaining: float) -> LinterResults:
     """
     Run the linter on the submission. For the linter to run, two preconditions
     must be satisfied:
@@ -16,19 +60,74 @@ def run_linter(bundle: Bundle, collector: OutputManager, remaining: float):
     2. The linter is allowed to run based on the configuration.
 
     :param bundle: The configuration bundle.
-    :param collector: The output collector.
     :param remaining: The remaining time for the execution.
+
+    :return: The messages and annotations of the linter, from the cache if
+             possible.
     """
 
-    if not bundle.config.linter():
+    config = bundle.config
+    if not config.linter():
         _logger.debug("Linter is disabled.")
-        return
+        return [], []
+
+    cache = get_cache(bundle, "linter")
+    key = _cache_key(bundle) if cache else None
+    if cache and key and (cached := cache.get(key)):
+        _logger.debug("Restored linter results from cache")
+        _, metadata = cached
+        annotations = metadata["annotations"]
+        return [], get_converter().structure(annotations, list[AnnotateCode])
 
     _logger.debug("Running linter...")
 
     messages, annotations = bundle.language.linter(remaining)
+    # The linters only return messages if they failed (e.g. by a timeout).
+    if cache and key and not messages:
+        metadata = {"annotations": get_converter().unstructure(annotations)}
+        cache.put(key, config.source.parent, [], metadata)
+    return messages, annotations
+
+
+def start_linter(
+    bundle: Bundle, remaining: float, statistics: Statistics | None
+) -> Future[LinterResults]:
+    """
+    Run the linter in the background, so it overlaps with the generation, the
+    compilation and the execution. The results are added to the output with
+    :func:`add_linter_results`.
+
+    The commands of the linter are killed when the remaining time runs out, like
+    all other commands.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tested-linter")
+
+    def _lint() -> LinterResults:
+        with measure(statistics, "linter"):
+            return run_linter(bundle, remaining)
+
+    future = executor.submit(_lint)
+    executor.shutdown(wait=False)
+    return future
+
+
+def add_linter_results(
+    linting: Future[LinterResults], collector: OutputManager, remaining: float
+) -> bool:
+    """
+    Wait for the linter and add its messages and annotations to the output. This
+    must be done before the first tab is opened.
+
+    :return: False if the time ran out before the linter finished.
+    """
+    try:
+        messages, annotations = linting.result(timeout=max(remaining, 0))
+    except TimeoutError:
+        _logger.warning("The linter did not finish in time.")
+        return False
 
     for message in messages:
         collector.add(AppendMessage(message=message))
     for annotation in annotations:
         collector.add(annotation)
+    return True
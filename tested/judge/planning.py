@@ -2,6 +2,8 @@
 This module decides what and when things are executed.
 """
 
+import heapq
+import logging
 import time
 from enum import Enum, auto
 from pathlib import Path
@@ -11,10 +13,14 @@ from attrs import define, field
 
 from tested.configs import Bundle
 from tested.dodona import AnnotateCode, Message, Status
+from tested.judge.durations import context_durations, get_duration_store
+from tested.judge.forkserver import Forkserver
+from tested.judge.scheduling import available_cpus
 from tested.languages.conventionalize import execution_name
-from tested.languages.language import FileFilter
 from tested.testsuite import Context, EmptyChannel, MainInput
 
+_logger = logging.getLogger(__name__)
+
 
 @define
 class CompilationResult:
@@ -68,16 +74,33 @@ class ExecutionPlan:
     start_time: float
 
     # Stuff that is set after the plan has been made.
-    files: list[str] | FileFilter  # The files we need for execution.
+    # The files we need for execution. After the compilation, this is the list of
+    # compiled files, so the directory is not scanned for every unit.
+    files: list[str]
+
+    # Units that were compiled in another directory than the common directory,
+    # with the files they need for execution (see the fallback in the judge).
+    unit_files: dict[int, tuple[Path, list[str]]] = field(factory=dict)
+
+    # The forkserver that starts the units, if the language has one.
+    forkserver: Forkserver | None = None
 
     def remaining_time(self) -> float:
         return self.max_time - (time.perf_counter() - self.start_time)
 
+    def files_of(self, index: int) -> tuple[Path, list[str]]:
+        """
+        :return: The directory with the files of a unit and the files it needs.
+        """
+        return self.unit_files.get(index, (self.common_directory, self.files))
+
 
 class PlanStrategy(Enum):
     OPTIMAL = auto()
     TAB = auto()
     CONTEXT = auto()
+    # Split the units further, to execute them in parallel, see _balance_units.
+    BALANCED = auto()
 
 
 def _flattened_contexts_to_units(
@@ -109,6 +132,129 @@ def _flattened_contexts_to_units(
     return contexts_per_unit
 
 
+# The estimated duration of a context if nothing was recorded, in seconds.
+_DEFAULT_CONTEXT_TIME = 0.01
+
+
+def _split_evenly(costs: list[float], parts: int) -> list[int]:
+    """
+    Split a list in contiguous parts with about the same total cost.
+
+    :return: The start index of each part.
+    """
+    total = sum(costs)
+    starts = [0]
+    cumulative = 0.0
+    for i, cost in enumerate(costs[:-1], start=1):
+        cumulative += cost
+        remaining_parts = parts - len(starts)
+        # Start a new part once we passed the next target, but leave at least one
+        # element for each of the remaining parts.
+        if remaining_parts > 0 and (
+            cumulative >= total * len(starts) / parts
+            or len(costs) - i == remaining_parts
+        ):
+            starts.append(i)
+    return starts
+
+
+def _parts(costs: list[float], starts: list[int]) -> list[float]:
+    ends = starts[1:] + [len(costs)]
+    return [sum(costs[start:end]) for start, end in zip(starts, ends)]
+
+
+def _makespan(units: list[float], workers: int) -> float:
+    """
+    Estimate the time needed to execute the units, if the longest units are
+    started first (see :func:`tested.judge.durations.longest_first`).
+    """
+    loads = [0.0] * workers
+    for unit in sorted(units, reverse=True):
+        heapq.heappush(loads, heapq.heappop(loads) + unit)
+    return max(loads)
+
+
+def _balance_units(
+    segments: list[list[float]], workers: int, startup: float
+) -> list[list[int]]:
+    """
+    Split the segments into units, such that the units can be executed in as little
+    time as possible by the workers. Each unit has a startup cost, so more units
+    are only used if they decrease the total time.
+
+    The segment with the most expensive unit is split further, until there are
+    enough units to keep all workers busy (or every context is in its own unit).
+
+    :param segments: The costs of the contexts in each segment. A unit never
+                     contains contexts of more than one segment.
+    :param workers: The number of units that can be executed at the same time.
+    :param startup: The cost to start a unit.
+    :return: For each segment, the start index of each unit in the segment.
+    """
+    pieces = [1] * len(segments)
+    max_pieces = min(sum(map(len, segments)), max(len(segments), 4 * workers))
+
+    def _estimate(splits: list[list[int]]) -> float:
+        units = [
+            part + startup
+            for segment, starts in zip(segments, splits)
+            for part in _parts(segment, starts)
+        ]
+        return _makespan(units, workers)
+
+    splits = [_split_evenly(s, 1) for s in segments]
+    best, best_splits = _estimate(splits), splits
+    while sum(pieces) < max_pieces:
+        candidates = [i for i, s in enumerate(segments) if pieces[i] < len(s)]
+        if not candidates:
+            break
+        largest = max(candidates, key=lambda i: max(_parts(segments[i], splits[i])))
+        pieces[largest] += 1
+        splits = list(splits)
+        splits[largest] = _split_evenly(segments[largest], pieces[largest])
+        if (estimate := _estimate(splits)) < best:
+            best, best_splits = estimate, splits
+    return best_splits
+
+
+def _balanced_contexts_to_units(
+    bundle: Bundle, flattened_contexts: list[PlannedContext]
+) -> list[list[PlannedContext]]:
+    """
+    Split the contexts into units that can be executed in parallel, based on a
+    cost model: the startup time of the language, the recorded duration of the
+    contexts in previous judgements and the number of units that can be executed
+    at the same time (see :mod:`tested.judge.scheduling`).
+    """
+    segments = _flattened_contexts_to_units(flattened_contexts)
+    workers = max(available_cpus() // bundle.language.concurrency_weight(), 1)
+    if workers == 1:
+        return segments
+
+    startup = bundle.language.startup_time()
+    if durations := get_duration_store(bundle):
+        estimates = context_durations(durations.get(), flattened_contexts, startup)
+    else:
+        estimates = [None] * len(flattened_contexts)
+    known = [x for x in estimates if x is not None]
+    default = sum(known) / len(known) if known else _DEFAULT_CONTEXT_TIME
+    costs = [default if x is None else x for x in estimates]
+
+    segment_costs = []
+    for segment in segments:
+        segment_costs.append(costs[: len(segment)])
+        costs = costs[len(segment) :]
+
+    units = []
+    for segment, starts in zip(
+        segments, _balance_units(segment_costs, workers, startup)
+    ):
+        ends = starts[1:] + [len(segment)]
+        units.extend(segment[start:end] for start, end in zip(starts, ends))
+    _logger.debug(f"Planned {len(units)} balanced units for {workers} workers")
+    return units
+
+
 def plan_test_suite(
     bundle: Bundle, strategy: PlanStrategy
 ) -> list[PlannedExecutionUnit]:
@@ -121,7 +267,7 @@ def plan_test_suite(
     """
 
     # First, flatten all contexts into a single list.
-    if strategy == PlanStrategy.OPTIMAL:
+    if strategy in (PlanStrategy.OPTIMAL, PlanStrategy.BALANCED):
         flattened_contexts = []
         for t, tab in enumerate(bundle.suite.tabs):
             for c, context in enumerate(tab.contexts):
@@ -150,7 +296,11 @@ def plan_test_suite(
 
     flattened_units = []
     for flattened_contexts in flattened_contexts_list:
-        for contexts in _flattened_contexts_to_units(flattened_contexts):
+        if strategy == PlanStrategy.BALANCED:
+            units = _balanced_contexts_to_units(bundle, flattened_contexts)
+        else:
+            units = _flattened_contexts_to_units(flattened_contexts)
+        for contexts in units:
             flattened_units.append(
                 PlannedExecutionUnit(
                     contexts=contexts,
@@ -0,0 +1,236 @@
+"""
+Scheduling of execution units when they are executed in parallel.
+
+The number of units that run at the same time is limited by the resources that
+are available to the judge, instead of by the number of CPUs of the host:
+
+- The CPUs: the CPUs this process may run on, limited by the CPU quota of its
+  cgroup (if any). Each unit needs a number of CPUs, depending on its language
+  (see :meth:`tested.languages.language.Language.concurrency_weight`).
+- The memory: the memory limit of the cgroup of this process (if any), or the
+  available memory of the system. Each unit reserves the memory limit of the
+  judgement.
+
+Units are admitted in the order they ask, so the first units of the plan (which
+are the ones that are reported first) do not wait for later units.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+
+_logger = logging.getLogger(__name__)
+
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _own_cgroups() -> dict[str, str]:
+    """
+    :return: The cgroup of this process for each controller. The cgroup in the
+             cgroup v2 hierarchy has the empty string as controller.
+    """
+    cgroups = dict()
+    try:
+        with open("/proc/self/cgroup", "r") as f:
+            for line in f:
+                _, controllers, path = line.rstrip("\n").split(":", 2)
+                for controller in controllers.split(","):
+                    cgroups[controller] = path.lstrip("/")
+    except (OSError, ValueError):
+        pass
+    return cgroups
+
+
+def _read_cgroup_file(controller: str, name: str) -> str | None:
+    """
+    Read a file of the cgroup of this process.
+
+    :param controller: The controller for cgroup v1, or the empty string for v2.
+    :param name: The name of the file.
+    """
+    cgroups = _own_cgroups()
+    if controller not in cgroups:
+        return None
+    hierarchy = _CGROUP_ROOT / controller if controller else _CGROUP_ROOT
+    # In a container, the cgroup of the process is often mounted as the root.
+    for directory in (hierarchy / cgroups[controller], hierarchy):
+        try:
+            return (directory / name).read_text().strip()
+        except OSError:
+            continue
+    return None
+
+
+def _cgroup_memory_left() -> list[int]:
+    """
+    :return: The memory left in the cgroup (v2) of this process, and in each of its
+             ancestors with a limit. The judge can move itself into a child cgroup
+             (see :mod:`tested.judge.limits`), so the limit is often on an ancestor.
+    """
+    cgroups = _own_cgroups()
+    if "" not in cgroups:
+        return []
+    directory = _CGROUP_ROOT / cgroups[""]
+    if not directory.is_dir():
+        # In a container, the cgroup of the process is often mounted as the root.
+        directory = _CGROUP_ROOT
+    left = []
+    while True:
+        try:
+            limit = (directory / "memory.max").read_text().strip()
+            if limit.isdigit():
+                usage = (directory / "memory.current").read_text().strip()
+                left.append(int(limit) - int(usage or 0))
+        except (OSError, ValueError):
+            pass
+        if directory == _CGROUP_ROOT or directory == directory.parent:
+            return left
+        directory = directory.parent
+
+
+def _cpu_quota() -> float | None:
+    """
+    :return: The number of CPUs the cgroup of this process may use, if limited.
+    """
+    if cpu_max := _read_cgroup_file("", "cpu.max"):
+        quota, period = cpu_max.split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    quota = _read_cgroup_file("cpu", "cpu.cfs_quota_us")
+    period = _read_cgroup_file("cpu", "cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def available_cpus() -> int:
+    """
+    :return: The number of CPUs that are available to this process.
+    """
+    cpus = len(os.sched_getaffinity(0))
+    if (quota := _cpu_quota()) is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+def available_memory() -> int | None:
+    """
+    :return: The memory in bytes that is available to this process, if known.
+    """
+    limits = []
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    limits.append(int(line.split()[1]) * 1024)
+    except (OSError, ValueError):
+        pass
+    limits.extend(_cgroup_memory_left())
+    limit = _read_cgroup_file("memory", "memory.limit_in_bytes")
+    if limit is not None and limit.isdigit():
+        usage = _read_cgroup_file("memory", "memory.usage_in_bytes")
+        limits.append(int(limit) - int(usage or 0))
+    return max(min(limits), 0) if limits else None
+
+
+class UnitScheduler:
+    """
+    Admits execution units while they fit in the available CPUs and memory.
+    A unit is always admitted if nothing else is running, even if it does not fit.
+    """
+
+    __slots__ = [
+        "cpus",
+        "memory",
+        "_used_cpus",
+        "_used_memory",
+        "_waiting",
+        "_lock",
+        "_async_lock",
+    ]
+
+    cpus: int
+    memory: int | None
+
+    def __init__(self, cpus: int, memory: int | None):
+        """
+        :param cpus: The available CPUs.
+        :param memory: The available memory in bytes, if known.
+        """
+        self.cpus = cpus
+        self.memory = memory
+        self._used_cpus = 0
+        self._used_memory = 0
+        self._waiting = deque()
+        self._lock = threading.Condition()
+        self._async_lock = asyncio.Condition()
+
+    def _fits(self, cpus: int, memory: int) -> bool:
+        if self._used_cpus == 0:
+            return True
+        if self._used_cpus + cpus > self.cpus:
+            return False
+        return self.memory is None or self._used_memory + memory <= self.memory
+
+    @contextmanager
+    def admit(self, cpus: int, memory: int) -> Iterator[None]:
+        """
+        Wait until a unit that needs the given resources can run, and reserve the
+        resources while the with-block runs.
+        """
+        ticket = object()
+        with self._lock:
+            self._waiting.append(ticket)
+            self._lock.wait_for(
+                lambda: self._waiting[0] is ticket and self._fits(cpus, memory)
+            )
+            self._waiting.popleft()
+            self._used_cpus += cpus
+            self._used_memory += memory
+            # The next unit might fit as well.
+            self._lock.notify_all()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._used_cpus -= cpus
+                self._used_memory -= memory
+                self._lock.notify_all()
+
+    @asynccontextmanager
+    async def admit_async(self, cpus: int, memory: int) -> AsyncIterator[None]:
+        """
+        Like :meth:`admit`, for units that are tasks of one event loop (see
+        :mod:`tested.judge.engine`). A scheduler is used either with threads or
+        with tasks, not both.
+        """
+        ticket = object()
+        async with self._async_lock:
+            self._waiting.append(ticket)
+            try:
+                await self._async_lock.wait_for(
+                    lambda: self._waiting[0] is ticket and self._fits(cpus, memory)
+                )
+            except asyncio.CancelledError:
+                # Do not block the units after this one.
+                self._waiting.remove(ticket)
+                self._async_lock.notify_all()
+                raise
+            self._waiting.popleft()
+            self._used_cpus += cpus
+            self._used_memory += memory
+            self._async_lock.notify_all()
+        try:
+            yield
+        finally:
+            async with self._async_lock:
+                self._used_cpus -= cpus
+                self._used_memory -= memory
+                self._async_lock.notify_all()
@@ -0,0 +1,222 @@
+"""
+Persistent servers for the linters that run on the JVM or on Node.js.
+
+Starting a JVM (for checkstyle, ktlint and CodeNarc) or Node.js (for ESLint) often
+takes longer than linting the submission itself. If the ``linter_server`` option is
+enabled, these linters are run through a server that stays alive between
+judgements (e.g. when TESTed runs as a daemon, see :mod:`tested.daemon`):
+
+- ESLint is run with `eslint_d`, which starts an ESLint server in the background
+  on first use, and sends the files to it over a local socket.
+- The JVM linters are run in a Nailgun server. The first judgement starts the
+  server (one for each linter and classpath) on a Unix socket, and the ``ng``
+  client sends the arguments and the working directory to it.
+
+If a server cannot be used (the client is not installed, the server cannot be
+started or the connection fails), the linter is run with its normal command.
+"""
+
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from tested.configs import DodonaConfig
+from tested.judge.utils import BaseExecutionResult, run_command
+
+_logger = logging.getLogger(__name__)
+
+# The usual locations of the Nailgun server, if installed from a package.
+_NAILGUN_JARS = [
+    "/usr/share/java/nailgun-server.jar",
+    "/usr/local/share/java/nailgun-server.jar",
+    "/usr/share/java/nailgun.jar",
+]
+
+# The exit codes of the Nailgun client if it could not talk to the server.
+_NAILGUN_ERRORS = range(226, 238)
+
+# How long to wait for a new server to accept connections.
+_STARTUP_TIMEOUT = 10.0
+
+# The servers started by this process, so they are not garbage collected.
+_servers: dict[Path, subprocess.Popen] = dict()
+
+
+def _server_directory() -> Path:
+    # Unix socket paths are short, so this cannot be in the cache directory.
+    directory = Path(tempfile.gettempdir(), f"tested-linters-{os.getuid()}")
+    directory.mkdir(mode=0o700, exist_ok=True)
+    return directory
+
+
+def find_jar(executable: str) -> str | None:
+    """
+    Find the jar of a JVM tool on the PATH. The executable is either the jar
+    itself (possibly with a shell script in front of it, like ktlint), or a wrapper
+    script that runs the jar (like most installations of checkstyle).
+
+    :return: The path to the jar, or None if it was not found.
+    """
+    if not (found := shutil.which(executable)):
+        return None
+    resolved = Path(found).resolve()
+    if resolved.suffix == ".jar":
+        return str(resolved)
+    try:
+        content = resolved.read_bytes()
+    except OSError:
+        return None
+    # A jar is a zip file, which may have anything in front of it.
+    if b"PK\x03\x04" in content:
+        return str(resolved)
+    if match := re.search(rb"(/\S+\.jar)", content):
+        return match.group(1).decode(errors="replace")
+    return None
+
+
+def _nailgun_jar() -> str | None:
+    return next((x for x in _NAILGUN_JARS if Path(x).is_file()), None)
+
+
+def _nailgun_client() -> str | None:
+    return shutil.which("ng") or shutil.which("ng-nailgun")
+
+
+def nailgun_installed() -> bool:
+    """
+    :return: If the Nailgun client and server are installed, with Java.
+    """
+    return bool(_nailgun_client() and _nailgun_jar() and shutil.which("java"))
+
+
+def _nailgun_server(
+    name: str, classpath: list[str], jvm_options: list[str], remaining: float
+) -> Path | None:
+    """
+    Get the socket of the Nailgun server for a linter, and start the server if it
+    is not running.
+
+    :return: The socket, or None if there is no server.
+    """
+    server_jar = _nailgun_jar()
+    if server_jar is None or not shutil.which("java"):
+        _logger.debug("Nailgun server is not installed")
+        return None
+
+    h = hashlib.sha256()
+    for part in (*classpath, *jvm_options):
+        h.update(part.encode())
+        if os.path.isfile(part):
+            h.update(str(os.stat(part).st_mtime_ns).encode())
+    directory = _server_directory()
+    socket = directory / f"{name}-{h.hexdigest()[:16]}.sock"
+
+    # Only one judgement starts the server.
+    with open(socket.with_suffix(".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if socket.exists():
+            return socket
+        _logger.info(f"Starting the {name} server on {socket}")
+        _servers[socket] = subprocess.Popen(
+            [
+                "java",
+                *jvm_options,
+                "-classpath",
+                os.pathsep.join([server_jar, *classpath]),
+                "com.facebook.nailgun.NGServer",
+                f"local:{socket}",
+            ],
+            cwd=directory,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + min(_STARTUP_TIMEOUT, remaining / 2)
+        while not socket.exists():
+            if _servers[socket].poll() is not None or time.monotonic() > deadline:
+                _logger.warning(f"The {name} server did not start")
+                _servers.pop(socket).kill()
+                return None
+            time.sleep(0.05)
+        return socket
+
+
+def run_jvm_linter(
+    config: DodonaConfig,
+    directory: Path,
+    remaining: float,
+    command: list[str],
+    classpath: list[str] | None,
+    main_class: str,
+    arguments: list[str],
+    jvm_options: list[str] | None = None,
+) -> BaseExecutionResult | None:
+    """
+    Run a JVM linter, in a Nailgun server if the ``linter_server`` option is
+    enabled.
+
+    :param command: The normal command to run the linter.
+    :param classpath: The classpath of the linter, or None if it is unknown (the
+                      server cannot be used then).
+    :param main_class: The main class of the linter.
+    :param arguments: The arguments for the main class.
+    :param jvm_options: Options for the JVM, e.g. system properties.
+    """
+    client = _nailgun_client()
+    if config.options.linter_server and client and classpath:
+        start = time.monotonic()
+        name = Path(command[0]).name
+        socket = _nailgun_server(name, classpath, jvm_options or [], remaining)
+        if socket is not None:
+            server_command = [
+                client,
+                "--nailgun-server",
+                f"local:{socket}",
+                main_class,
+                *arguments,
+            ]
+            left = remaining - (time.monotonic() - start)
+            result = run_command(directory, left, server_command)
+            assert result is not None
+            if result.exit not in _NAILGUN_ERRORS:
+                return result
+            # The server is gone, so the next judgement should start a new one.
+            _logger.warning(f"Could not use the {name} server: {result.stderr}")
+            socket.unlink(missing_ok=True)
+        remaining -= time.monotonic() - start
+    return run_command(directory, remaining, command)
+
+
+def run_node_linter(
+    config: DodonaConfig,
+    directory: Path,
+    remaining: float,
+    command: list[str],
+    server: str,
+) -> BaseExecutionResult | None:
+    """
+    Run a Node.js linter, with its server variant (e.g. eslint_d for eslint) if the
+    ``linter_server`` option is enabled. The server variant must accept the same
+    arguments and have the same output.
+
+    :param command: The normal command to run the linter.
+    :param server: The executable of the server variant.
+    """
+    if config.options.linter_server and (executable := shutil.which(server)):
+        start = time.monotonic()
+        result = run_command(directory, remaining, [executable, *command[1:]])
+        assert result is not None
+        # The linters exit with 0 or 1, depending on the problems they found.
+        if result.timeout or result.memory or result.exit in (0, 1):
+            return result
+        _logger.warning(f"Could not use {server}: {result.stderr}")
+        remaining -= time.monotonic() - start
+    return run_command(directory, remaining, command)
@@ -0,0 +1,104 @@
+"""
+History of the precompilation, for speculative compilation.
+
+If the precompilation fails, the units of each tab are compiled on their own (see
+the fallback in :func:`tested.judge.core.judge`). This only starts once the
+precompilation has failed, so a failing submission is compiled twice, one after
+the other. For exercises where the precompilation often fails (e.g. because
+students leave functions unimplemented), the tab-level compilation can be started
+at the same time as the precompilation instead. If the precompilation succeeds,
+that work is discarded.
+
+To know which exercises are likely to fail, the outcome of the precompilation of
+previous judgements is stored in a SQLite database in the cache directory of the
+options. An exercise is identified like in :mod:`tested.judge.durations`.
+"""
+
+import logging
+import sqlite3
+from pathlib import Path
+
+from tested.configs import Bundle
+from tested.judge.durations import connect, exercise_key
+
+_logger = logging.getLogger(__name__)
+
+_DATABASE = "compilations.sqlite"
+
+# With fewer judgements, the failure rate says little about the exercise.
+_MIN_JUDGEMENTS = 3
+
+
+class CompilationHistory:
+    """
+    The outcome of the precompilation in previous judgements of one exercise.
+    """
+
+    __slots__ = ["path", "exercise"]
+
+    path: Path
+    exercise: str
+
+    def __init__(self, path: Path, exercise: str):
+        self.path = path
+        self.exercise = exercise
+        with connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS compilations ("
+                "exercise TEXT NOT NULL PRIMARY KEY, judgements INTEGER NOT NULL,"
+                "failures INTEGER NOT NULL)"
+            )
+
+    def failure_rate(self) -> float | None:
+        """
+        :return: The fraction of the judgements where the precompilation failed,
+                 or None if there are not enough judgements.
+        """
+        try:
+            with connect(self.path) as connection:
+                row = connection.execute(
+                    "SELECT judgements, failures FROM compilations WHERE exercise = ?",
+                    (self.exercise,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            _logger.warning(f"Could not read the compilation history: {e}")
+            return None
+        if row is None or row[0] < _MIN_JUDGEMENTS:
+            return None
+        judgements, failures = row
+        return failures / judgements
+
+    def record(self, failed: bool):
+        """
+        Record the outcome of the precompilation of a judgement.
+        """
+        try:
+            with connect(self.path) as connection:
+                connection.execute(
+                    "INSERT INTO compilations VALUES (?, 1, ?) "
+                    "ON CONFLICT (exercise) DO UPDATE SET "
+                    "judgements = judgements + 1, failures = failures + excluded.failures",
+                    (self.exercise, int(failed)),
+                )
+        except sqlite3.Error as e:
+            # The history is only a hint, so this is not fatal.
+            _logger.warning(f"Could not record the compilation: {e}")
+
+
+def get_compilation_history(bundle: Bundle) -> CompilationHistory | None:
+    """
+    Get the compilation history of the exercise of the bundle.
+
+    :return: The history, or None if speculative compilation is disabled or there
+             is no cache directory.
+    """
+    options = bundle.config.options
+    if options.speculative_compilation is None or options.cache_directory is None:
+        return None
+    try:
+        return CompilationHistory(
+            Path(options.cache_directory, _DATABASE), exercise_key(bundle)
+        )
+    except sqlite3.Error as e:
+        _logger.warning(f"Could not open the compilation history: {e}")
+        return None
@@ -0,0 +1,244 @@
+"""
+Resource accounting for judgements, if ``timing_statistics`` is enabled.
+
+The judgement is split in phases (the linter, generating the code, compiling and
+executing each unit, evaluating the results...). For each phase, we measure:
+
+- the wall time of the phase;
+- the CPU time (user and system), both of the commands that were run and of the
+  work done by TESTed itself in the thread of the phase;
+- the peak memory of the commands that were run;
+- the number of bytes the commands wrote on stdout and stderr;
+- the largest fraction of its time limit that a command used, e.g. how close the
+  execution of a unit came to a timeout.
+
+The commands are measured by :func:`tested.judge.utils.run_command`, which reports
+their resource usage to the phase that is active in the current thread (see
+:func:`record_command`). Phases with the same name are accumulated, e.g. the
+evaluation of all contexts of an execution unit.
+"""
+
+import json
+import logging
+import resource
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import ContextManager
+
+from attrs import asdict, define
+
+from tested.dodona import ExtendedMessage, Permission
+from tested.internationalization import get_i18n_string
+
+_logger = logging.getLogger(__name__)
+
+# The description of the phases in the translations.
+_PHASE_DESCRIPTIONS = {
+    "linter": "timings.linter",
+    "generation": "timings.generation",
+    "precompilation": "timings.compilation.pre",
+    "compilation": "timings.compilation.individual",
+    "execution": "timings.run.testcode",
+    "evaluation": "timings.evaluate.results",
+}
+
+
+@define
+class PhaseStatistics:
+    """
+    The resources used by one phase of the judgement.
+    """
+
+    phase: str
+    # The execution unit, for phases that are done for each unit.
+    unit: str | None
+    wall_time: float = 0.0
+    user_time: float = 0.0
+    system_time: float = 0.0
+    # The peak resident memory in bytes of the commands, if any command was run.
+    peak_memory: int | None = None
+    output_bytes: int = 0
+    commands: int = 0
+    # The largest fraction of its time limit that a command used, if any had one.
+    budget_used: float | None = None
+
+
+_current_phase: ContextVar[PhaseStatistics | None] = ContextVar(
+    "current_phase", default=None
+)
+
+
+def is_measuring() -> bool:
+    """
+    :return: If a phase is being measured in the current thread.
+    """
+    return _current_phase.get() is not None
+
+
+def _max_memory(a: int | None, b: int | None) -> int | None:
+    if a is None or b is None:
+        return a if b is None else b
+    return max(a, b)
+
+
+def _max_budget(a: float | None, b: float | None) -> float | None:
+    if a is None or b is None:
+        return a if b is None else b
+    return max(a, b)
+
+
+def record_command(
+    user_time: float,
+    system_time: float,
+    peak_memory: int | None,
+    output_bytes: int,
+    budget_used: float | None = None,
+):
+    """
+    Add the resource usage of a finished command to the current phase, if any.
+    """
+    if (phase := _current_phase.get()) is None:
+        return
+    phase.user_time += user_time
+    phase.system_time += system_time
+    phase.peak_memory = _max_memory(phase.peak_memory, peak_memory)
+    phase.budget_used = _max_budget(phase.budget_used, budget_used)
+    phase.output_bytes += output_bytes
+    phase.commands += 1
+
+
+class Statistics:
+    """
+    Collects the statistics of the phases of a judgement. The phases may be
+    measured concurrently, as long as they run in different threads.
+    """
+
+    __slots__ = ["phases", "start", "_lock"]
+
+    phases: dict[tuple[str, str | None], PhaseStatistics]
+    start: float
+
+    def __init__(self):
+        self.phases = dict()
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def total_time(self) -> float:
+        return time.perf_counter() - self.start
+
+    @contextmanager
+    def measure(self, phase: str, unit: str | None = None) -> Iterator[None]:
+        """
+        Measure the resources used by the code in the with-block. Phases may not
+        be nested in the same thread.
+        """
+        assert not is_measuring(), "Nested phases are counted twice."
+        statistics = PhaseStatistics(phase=phase, unit=unit)
+        token = _current_phase.set(statistics)
+        start = time.perf_counter()
+        start_usage = resource.getrusage(resource.RUSAGE_THREAD)
+        try:
+            yield
+        finally:
+            end_usage = resource.getrusage(resource.RUSAGE_THREAD)
+            statistics.wall_time += time.perf_counter() - start
+            statistics.user_time += end_usage.ru_utime - start_usage.ru_utime
+            statistics.system_time += end_usage.ru_stime - start_usage.ru_stime
+            _current_phase.reset(token)
+            self._add(statistics)
+
+    def _add(self, statistics: PhaseStatistics):
+        with self._lock:
+            key = (statistics.phase, statistics.unit)
+            if (existing := self.phases.get(key)) is None:
+                self.phases[key] = statistics
+                return
+            existing.wall_time += statistics.wall_time
+            existing.user_time += statistics.user_time
+            existing.system_time += statistics.system_time
+            existing.peak_memory = _max_memory(
+                existing.peak_memory, statistics.peak_memory
+            )
+            existing.budget_used = _max_budget(
+                existing.budget_used, statistics.budget_used
+            )
+            existing.output_bytes += statistics.output_bytes
+            existing.commands += statistics.commands
+
+    def to_message(self, parallel: bool) -> ExtendedMessage:
+        """
+        :param parallel: If the execution units were executed in parallel.
+        :return: A table with the statistics, for the staff only.
+        """
+        header = [
+            "",
+            "unit",
+            "wall (s)",
+            "user (s)",
+            "sys (s)",
+            "peak",
+            "output",
+            "budget",
+        ]
+        rows = [header]
+        with self._lock:
+            phases = list(self.phases.values())
+        for phase in phases:
+            if phase.peak_memory is None:
+                peak = "-"
+            else:
+                peak = f"{phase.peak_memory / 1024 / 1024:.1f} MiB"
+            rows.append(
+                [
+                    get_i18n_string(_PHASE_DESCRIPTIONS.get(phase.phase, phase.phase)),
+                    phase.unit or "-",
+                    f"{phase.wall_time:.3f}",
+                    f"{phase.user_time:.3f}",
+                    f"{phase.system_time:.3f}",
+                    peak,
+                    f"{phase.output_bytes} B",
+                    "-" if phase.budget_used is None else f"{phase.budget_used:.0%}",
+                ]
+            )
+        rows.append([get_i18n_string("timings.total"), "", f"{self.total_time():.3f}"])
+        widths = [
+            max(len(row[i]) for row in rows if i < len(row)) for i in range(len(header))
+        ]
+        table = "\n".join(
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+            for row in rows
+        )
+        lines = [get_i18n_string("timings.title"), "", table]
+        if parallel:
+            lines += ["", get_i18n_string("timings.parallel")]
+        return ExtendedMessage(
+            description="\n".join(lines),
+            format="code",
+            permission=Permission.STAFF,
+        )
+
+    def write(self, path: Path):
+        """
+        Write the statistics as JSON to the given file.
+        """
+        with self._lock:
+            phases = [asdict(x) for x in self.phases.values()]
+        data = {"total_time": self.total_time(), "phases": phases}
+        _logger.debug(f"Writing timing statistics to {path}")
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+
+def measure(
+    statistics: Statistics | None, phase: str, unit: str | None = None
+) -> ContextManager:
+    """
+    Measure a phase if statistics are collected, see :meth:`Statistics.measure`.
+    """
+    if statistics is None:
+        return nullcontext()
+    return statistics.measure(phase, unit)
@@ -2,14 +2,30 @@
 Common utilities for the judge.
 """
 
+import codecs
+import contextvars
+import io
 import logging
+import os
+import resource
+import select
+import selectors
 import shutil
+import signal
 import subprocess
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
-from attrs import define
+from attrs import define, field
 
 from tested.configs import Bundle
+from tested.judge.directories import clone_file, link_file
+from tested.judge.forkserver import ForkedProcess, Forkserver
+from tested.judge.limits import MemoryLimit, prepare_memory_limit
+from tested.judge.statistics import record_command
 from tested.languages.conventionalize import EXECUTION_PREFIX
 from tested.languages.language import FileFilter
 
@@ -27,6 +43,40 @@ class BaseExecutionResult:
     exit: int
     timeout: bool
     memory: bool
+    # If the output was truncated because it exceeded the output limit.
+    output_limit: bool = field(default=False, kw_only=True)
+    # The peak resident memory in bytes, if it was measured.
+    peak_memory: int | None = field(default=None, kw_only=True)
+
+
+# Called with the new output on stdout and stderr while a command is running.
+OutputCallback = Callable[[str, str], None]
+
+# How often the output callback is called if there is no new output.
+POLL_INTERVAL = 0.1
+
+# A process started by start_command.
+Process = subprocess.Popen | ForkedProcess
+
+
+# If set, the commands that are run in this context are killed, see cancellable.
+_cancelled: contextvars.ContextVar[threading.Event | None] = contextvars.ContextVar(
+    "cancelled", default=None
+)
+
+
+@contextmanager
+def cancellable(cancelled: threading.Event) -> Iterator[None]:
+    """
+    Run commands that can be cancelled: the commands that :func:`run_command`
+    runs within the block (in this thread) are killed once the event is set, as if
+    their time ran out.
+    """
+    token = _cancelled.set(cancelled)
+    try:
+        yield
+    finally:
+        _cancelled.reset(token)
 
 
 def run_command(
@@ -35,6 +85,12 @@ def run_command(
     command: list[str] | None = None,
     stdin: str | None = None,
     check: bool = False,
+    on_output: OutputCallback | None = None,
+    output_limit: int | None = None,
+    memory_limit: int | None = None,
+    limit_address_space: bool = False,
+    forkserver: Forkserver | None = None,
+    environment: dict[str, str] | None = None,
 ) -> BaseExecutionResult | None:
     """
     Run a command and get the result of said command.
@@ -42,41 +98,375 @@ def run_command(
     :param directory: The directory to execute in.
     :param command: Optional, the command to execute.
     :param stdin: Optional stdin for the process.
-    :param timeout: The max time for this command.
+    :param timeout: The max time for this command, in seconds. When it runs out,
+                    the command and all processes it started are killed.
     :param check: Raise if the command fails.
+    :param on_output: Optional, called with the new output while the command is
+                      running. It is also called periodically without new output,
+                      so it can be used to watch other files.
+    :param output_limit: Optional, the maximal number of bytes on stdout and stderr
+                         together. If the command outputs more, it is killed.
+    :param memory_limit: Optional, the maximal memory usage of the command in bytes.
+                         See :mod:`tested.judge.limits`. If given, the peak memory
+                         usage is measured as well.
+    :param limit_address_space: If the memory limit may be enforced by limiting the
+                                address space.
+    :param forkserver: Optional, the forkserver that starts the command, see
+                       :mod:`tested.judge.forkserver`.
+    :param environment: Optional, environment variables to add for the command.
+
+    If a phase of the judgement is being measured (see :mod:`tested.judge.statistics`),
+    the resource usage of the command is added to it.
 
     :return: The result of the execution if the command was not None.
     """
     if not command:
         return None
 
-    try:
-        timeout = int(timeout) if timeout is not None else None
-        process = subprocess.run(
-            command,
-            cwd=directory,
-            text=True,
-            errors="backslashreplace",
-            capture_output=True,
-            input=stdin,
-            timeout=timeout,
-            check=check,
+    result = _supervise(
+        directory,
+        timeout,
+        command,
+        stdin,
+        on_output,
+        output_limit,
+        memory_limit,
+        limit_address_space,
+        forkserver,
+        environment,
+    )
+    if check and result.exit != 0:
+        raise subprocess.CalledProcessError(
+            result.exit, command, result.stdout, result.stderr
         )
-    except subprocess.TimeoutExpired as e:
+    return result
+
+
+def high_water_mark(pid: int) -> int:
+    """
+    :return: The peak resident memory of a running process in bytes, or 0 if the
+             process is gone.
+    """
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def kill_group(process: Process):
+    """
+    Kill a process started by :func:`start_command` and all processes it started.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def wait_for(process: Process) -> tuple[int, resource.struct_rusage]:
+    """
+    Wait for a process started by :func:`start_command` ourselves, to get its
+    resource usage.
+
+    :return: The wait status and the resource usage of the process.
+    """
+    if isinstance(process, ForkedProcess):
+        result = process.wait4()
+        assert result is not None
+        return result
+    _, status, usage = os.wait4(process.pid, 0)
+    return status, usage
+
+
+def poll_for(
+    process: Process, timeout: float
+) -> tuple[int, resource.struct_rusage] | None:
+    """
+    Wait for a process started by :func:`start_command`, like :func:`wait_for`, but
+    at most for the timeout.
+
+    :return: The wait status and the resource usage of the process, or None if it
+             is still running.
+    """
+    if isinstance(process, ForkedProcess):
+        return process.wait4(timeout)
+    pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+    if pid:
+        return status, usage
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except OSError:
+        # Without pidfds, check again after the timeout.
+        time.sleep(timeout)
+    else:
+        try:
+            select.select([pidfd], [], [], timeout)
+        finally:
+            os.close(pidfd)
+    pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+    return (status, usage) if pid else None
+
+
+def output_decoder() -> io.IncrementalNewlineDecoder:
+    """
+    :return: A decoder for the output of a command, like the text mode of
+             subprocess, but chunk by chunk.
+    """
+    return io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder("utf-8")("backslashreplace"), translate=True
+    )
+
+
+def start_command(
+    directory: Path,
+    command: list[str],
+    with_stdin: bool,
+    memory_limit: int | None,
+    limit_address_space: bool,
+    forkserver: Forkserver | None = None,
+    environment: dict[str, str] | None = None,
+) -> tuple[Process, MemoryLimit | None]:
+    """
+    Start a command in its own session, with pipes for the output (and the input
+    if needed), and limit its memory (see :mod:`tested.judge.limits`).
+
+    If a forkserver is given, it starts the command, and applies the memory limit
+    itself. Since the environment of the forkserver cannot be changed, it does not
+    start commands with additional environment variables. If the forkserver fails
+    to start the command, it is started without the forkserver.
+
+    :return: The process, and its memory limit, if any. The result must be
+             collected with :func:`finish_command`.
+    """
+    if environment:
+        forkserver = None
+    if memory_limit is not None:
+        limit = prepare_memory_limit(memory_limit, limit_address_space)
+    else:
+        limit = None
+    if forkserver is not None:
+        address_space = limit.limit if limit and limit.address_space else None
+        cgroup = limit.cgroup.path if limit and limit.cgroup else None
+        try:
+            return (
+                forkserver.spawn(directory, command, with_stdin, address_space, cgroup),
+                limit,
+            )
+        except OSError as e:
+            _logger.warning(f"The forkserver could not start the command: {e}")
+    process = subprocess.Popen(
+        limit.wrap(command) if limit else command,
+        cwd=directory,
+        stdin=subprocess.PIPE if with_stdin else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+        env={**os.environ, **environment} if environment else None,
+    )
+    return process, limit
+
+
+def finish_command(
+    process: Process,
+    limit: MemoryLimit | None,
+    status: int,
+    usage: resource.struct_rusage,
+    elapsed: float,
+    timeout: float | None,
+    peak_seen: int,
+    stdout: str,
+    stderr: str,
+    captured: int,
+    timed_out: bool,
+    exceeded: bool,
+) -> BaseExecutionResult:
+    """
+    Collect the result of a command started by :func:`start_command`, once it
+    was waited for.
+
+    :param limit: The memory limit from :func:`start_command`.
+    :param status: The wait status of the process.
+    :param usage: The resource usage of the process.
+    :param elapsed: The wall time of the command, in seconds.
+    :param timeout: The time limit of the command, if any.
+    :param peak_seen: The peak memory seen while the process was running.
+    :param captured: The number of bytes of output that were read.
+    :param timed_out: If the command was killed because the time ran out.
+    :param exceeded: If the command was killed because of the output limit.
+    """
+    process.returncode = os.waitstatus_to_exitcode(status)
+    for pipe in (process.stdin, process.stdout, process.stderr):
+        if pipe and not pipe.closed:
+            pipe.close()
+
+    # The maximum resident set size of a child includes the memory of this process
+    # at the time it was started, so it is only useful if it is larger. Otherwise,
+    # use the peak memory we saw while the process was running. On Linux, the
+    # maximum resident set size is in kilobytes.
+    if usage.ru_maxrss > resource.getrusage(resource.RUSAGE_SELF).ru_maxrss:
+        peak_memory = usage.ru_maxrss * 1024
+    else:
+        peak_memory = peak_seen or None
+    out_of_memory = process.returncode == -9
+    if limit is not None:
+        peak_memory = limit.peak() or peak_memory
+        out_of_memory = out_of_memory or limit.exceeded(process.returncode, stderr)
+        limit.remove()
+    budget_used = elapsed / timeout if timeout else None
+    if budget_used is not None:
+        _logger.debug(f"Command used {elapsed:.3f}s of its {timeout:.3f}s")
+    record_command(usage.ru_utime, usage.ru_stime, peak_memory, captured, budget_used)
+
+    if timed_out or exceeded:
         return BaseExecutionResult(
-            stdout=e.stdout.decode("utf-8", "backslashreplace") if e.stdout else "",
-            stderr=e.stderr.decode("utf-8", "backslashreplace") if e.stderr else "",
+            stdout=stdout,
+            stderr=stderr,
             exit=0,
-            timeout=True,
+            timeout=timed_out,
             memory=False,
+            output_limit=exceeded,
+            peak_memory=peak_memory,
         )
-
     return BaseExecutionResult(
-        stdout=process.stdout,
-        stderr=process.stderr,
+        stdout=stdout,
+        stderr=stderr,
         exit=process.returncode,
         timeout=False,
-        memory=True if process.returncode == -9 else False,
+        memory=out_of_memory,
+        peak_memory=peak_memory,
+    )
+
+
+def _supervise(
+    directory: Path,
+    timeout: float | None,
+    command: list[str],
+    stdin: str | None,
+    on_output: OutputCallback | None,
+    output_limit: int | None,
+    memory_limit: int | None,
+    limit_address_space: bool,
+    forkserver: Forkserver | None,
+    environment: dict[str, str] | None,
+) -> BaseExecutionResult:
+    """
+    Run a command for :func:`run_command`, reading the output while the command is
+    running.
+
+    The command runs in its own session. The time limit is a deadline on the
+    monotonic clock, which is checked at least every poll interval, also while
+    waiting for the command to exit after its output was closed. If it passes, if
+    the command is cancelled (see :func:`cancellable`), or if the output limit is
+    exceeded, the whole process group is killed, and the command itself is reaped
+    (the other processes are reaped by their new parent).
+    """
+    cancelled = _cancelled.get()
+    process, limit = start_command(
+        directory,
+        command,
+        stdin is not None,
+        memory_limit,
+        limit_address_space,
+        forkserver,
+        environment,
+    )
+    start = time.monotonic()
+    deadline = start + timeout if timeout is not None else None
+    assert process.stdout and process.stderr
+    output = {process.stdout: [], process.stderr: []}
+    decoders = {pipe: output_decoder() for pipe in output}
+    stdin_data = memoryview(stdin.encode()) if stdin is not None else None
+
+    timed_out = False
+    exceeded = False
+    captured = 0
+    # Also measure commands that finish before the first output.
+    peak = high_water_mark(process.pid)
+    with selectors.DefaultSelector() as selector:
+        for pipe in output:
+            selector.register(pipe, selectors.EVENT_READ, pipe)
+        if process.stdin:
+            selector.register(process.stdin, selectors.EVENT_WRITE, process.stdin)
+
+        while selector.get_map() and not exceeded:
+            wait = POLL_INTERVAL
+            if cancelled is not None and cancelled.is_set():
+                timed_out = True
+                break
+            if deadline is not None:
+                if (left := deadline - time.monotonic()) <= 0:
+                    timed_out = True
+                    break
+                wait = min(wait, left)
+
+            new = {pipe: "" for pipe in output}
+            for key, _ in selector.select(wait):
+                pipe = key.data
+                if pipe is process.stdin:
+                    assert stdin_data is not None
+                    try:
+                        written = os.write(key.fd, stdin_data[: select.PIPE_BUF])
+                    except BrokenPipeError:
+                        written = len(stdin_data)
+                    stdin_data = stdin_data[written:]
+                    if not stdin_data:
+                        selector.unregister(pipe)
+                        pipe.close()
+                    continue
+                data = os.read(key.fd, 32768)
+                if finished := not data:
+                    selector.unregister(pipe)
+                    pipe.close()
+                if output_limit is not None and captured + len(data) > output_limit:
+                    # Stop reading: we don't want to keep more than the limit.
+                    data = data[: output_limit - captured]
+                    exceeded = True
+                captured += len(data)
+                new[pipe] += decoders[pipe].decode(data, final=finished)
+                output[pipe].append(new[pipe])
+                if exceeded:
+                    break
+            if on_output is not None:
+                on_output(new[process.stdout], new[process.stderr])
+            peak = max(peak, high_water_mark(process.pid))
+
+    # The output is closed, but the command might still be running.
+    waited = None
+    while not timed_out and not exceeded and waited is None:
+        wait = POLL_INTERVAL
+        if cancelled is not None and cancelled.is_set():
+            timed_out = True
+            break
+        if deadline is not None:
+            if (left := deadline - time.monotonic()) <= 0:
+                timed_out = True
+                break
+            wait = min(wait, left)
+        peak = max(peak, high_water_mark(process.pid))
+        if (waited := poll_for(process, wait)) is None and on_output is not None:
+            on_output("", "")
+
+    if waited is None:
+        kill_group(process)
+        waited = wait_for(process)
+    status, usage = waited
+    return finish_command(
+        process,
+        limit,
+        status,
+        usage,
+        time.monotonic() - start,
+        timeout,
+        peak,
+        "".join(output[process.stdout]),
+        "".join(output[process.stderr]),
+        captured,
+        timed_out,
+        exceeded,
     )
 
 
@@ -106,15 +496,20 @@ def copy_from_paths_to_path(origins: list[Path], files: list[str], destination:
         shutil.copy2(file, destination)
 
 
-def copy_workdir_files(bundle: Bundle, destination: Path, all_files: bool) -> list[str]:
+def copy_workdir_files(
+    bundle: Bundle, destination: Path, all_files: bool, link: bool = False
+) -> list[str]:
     """
-    Copy files from the workdir to a destination.
+    Copy files from the workdir to a destination. The files are cloned if the file
+    system supports it, see :mod:`tested.judge.directories`.
 
     :param bundle: Bundle information of the test suite
     :param destination: Where to copy to.
     :param all_files: If all files or only source files should be copied.
+    :param link: If the read-only files should be hard linked instead.
     """
     source_files = []
+    copy_function = link_file if link else clone_file
 
     def recursive_copy(src: Path, dst: Path):
         for origin in src.iterdir():
@@ -124,14 +519,14 @@ def copy_workdir_files(bundle: Bundle, destination: Path, all_files: bool) -> li
             ):
                 source_files.append(str(dst / origin.name))
                 _logger.debug(f"Copying {origin} to {dst}")
-                shutil.copy2(origin, dst)
+                copy_function(origin, dst / origin.name)
             elif (
                 origin.is_dir()
                 and not file.startswith(EXECUTION_PREFIX)
                 and file != "common"
             ):
                 _logger.debug(f"Iterate subdir {dst / file}")
-                shutil.copytree(origin, dst / file)
+                shutil.copytree(origin, dst / file, copy_function=copy_function)
 
     recursive_copy(bundle.config.workdir, destination)
 
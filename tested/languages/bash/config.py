@@ -44,6 +44,12 @@ class Bash(Language):
     def needs_selector(self):
         return False
 
+    def supports_address_space_limit(self) -> bool:
+        return True
+
+    def startup_time(self) -> float:
+        return 0.005
+
     def supported_constructs(self) -> set[Construct]:
         return {
             Construct.FUNCTION_CALLS,
@@ -91,6 +97,12 @@ class Bash(Language):
         assert self.config
         return linter.run_shellcheck(self.config.dodona, remaining)
 
+    def linter_fingerprint(self) -> list[str]:
+        from tested.languages.bash import linter
+
+        assert self.config
+        return linter.fingerprint(self.config.dodona)
+
     def generate_statement(self, statement: Statement) -> str:
         from tested.languages.bash import generators
 
@@ -6,6 +6,7 @@ from pathlib import Path
 from tested.configs import DodonaConfig
 from tested.dodona import AnnotateCode, ExtendedMessage, Message, Permission, Severity
 from tested.internationalization import get_i18n_string
+from tested.judge.cache import hash_file, toolchain_version
 from tested.judge.utils import run_command
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,17 @@ message_categories = {
 }
 
 
+def fingerprint(config: DodonaConfig) -> list[str]:
+    """
+    Identify shellcheck and its configuration, see
+    :meth:`tested.languages.language.Language.linter_fingerprint`.
+    """
+    result = [toolchain_version("shellcheck")]
+    if path := config.config_for().get("shellcheck_config", None):
+        result.append(hash_file(config.resources / path))
+    return result
+
+
 def run_shellcheck(
     config: DodonaConfig, remaining: float, language: str = "bash"
 ) -> tuple[list[Message], list[AnnotateCode]]:
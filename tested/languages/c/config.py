@@ -35,6 +35,12 @@ class C(Language):
     def needs_selector(self):
         return True
 
+    def supports_address_space_limit(self) -> bool:
+        return True
+
+    def startup_time(self) -> float:
+        return 0.005
+
     def file_extension(self) -> str:
         return "c"
 
@@ -72,19 +78,25 @@ class C(Language):
             "double_extended": "supported",
         }
 
+    def _optimisation_flag(self) -> str:
+        assert self.config
+        return "-O3" if self.config.options.compiler_optimizations else "-O0"
+
     def compilation(self, files: list[str]) -> CallbackResult:
         main_file = files[-1]
         exec_file = Path(main_file).stem
         result = executable_name(exec_file)
-        assert self.config
+        # Use the object files if the dependencies were compiled separately.
+        objects = ["evaluation_result.o", "values.o"]
+        if not all(x in files for x in objects):
+            objects = ["evaluation_result.c", "values.c"]
         return (
             [
                 "gcc",
                 "-std=c11",
                 "-Wall",
-                "-O3" if self.config.options.compiler_optimizations else "-O0",
-                "evaluation_result.c",
-                "values.c",
+                self._optimisation_flag(),
+                *objects,
                 main_file,
                 "-o",
                 result,
@@ -92,6 +104,13 @@ class C(Language):
             [result],
         )
 
+    def dependencies_compilation(self, files: list[str]) -> CallbackResult:
+        sources = [x for x in files if x.endswith(".c")]
+        headers = [x for x in files if x.endswith(".h")]
+        objects = [str(Path(x).with_suffix(".o")) for x in sources]
+        command = ["gcc", "-std=c11", "-Wall", self._optimisation_flag(), "-c"]
+        return [*command, *sources], headers + objects
+
     def execution(self, cwd: Path, file: str, arguments: list[str]) -> Command:
         local_file = cwd / executable_name(Path(file).stem)
         return [str(local_file.absolute()), *arguments]
@@ -122,6 +141,11 @@ class C(Language):
         assert self.config
         return linter.run_cppcheck(self.config.dodona, remaining)
 
+    def linter_fingerprint(self) -> list[str]:
+        from tested.languages.c import linter
+
+        return linter.fingerprint()
+
     def cleanup_stacktrace(self, stacktrace: str) -> str:
         included_regex = rf"from ({EXECUTION_PREFIX}|selector)"
         result = ""
@@ -4,6 +4,7 @@ from xml.etree import ElementTree
 from tested.configs import DodonaConfig
 from tested.dodona import AnnotateCode, ExtendedMessage, Message, Permission, Severity
 from tested.internationalization import get_i18n_string
+from tested.judge.cache import toolchain_version
 from tested.judge.utils import run_command
 
 logger = logging.getLogger(__name__)
@@ -18,6 +19,14 @@ message_categories = {
 }
 
 
+def fingerprint() -> list[str]:
+    """
+    Identify cppcheck, see
+    :meth:`tested.languages.language.Language.linter_fingerprint`.
+    """
+    return [toolchain_version("cppcheck")]
+
+
 def run_cppcheck(
     config: DodonaConfig, remaining: float, language: str = "c"
 ) -> tuple[list[Message], list[AnnotateCode]]:
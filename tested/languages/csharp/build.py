@@ -0,0 +1,130 @@
+"""
+Incremental builds for C#.
+
+A normal build runs ``dotnet build --no-incremental --force``, which restores the
+project (resolving the SDK and the targeting packs), starts MSBuild and compiles
+everything from scratch, for every compilation. If the ``incremental_build`` option
+of the language is enabled, the builds are done differently:
+
+- The project is restored once, on its own, and the result (the ``obj`` directory)
+  is kept in the ``dotnet`` cache of the cache directory, named after a hash of the
+  project and the SDKs. Before a build, this skeleton is copied into the directory,
+  and the build runs with ``--no-restore``. The project has no package references,
+  so the restore does not need the network, and the builds never restore.
+- The builds use the MSBuild server, and MSBuild reuses its worker nodes and the
+  compiler server (VBCSCompiler) as usual. These processes stay alive between the
+  builds (and the judgements), so MSBuild and the compiler are loaded and warmed up
+  only once.
+- The builds are incremental: MSBuild skips the targets whose outputs are up to
+  date. Since each compilation has its own directory, this mostly avoids work in the
+  targets that do not depend on the sources; the assembly itself is still compiled
+  as a whole, as the C# compiler does not compile single files.
+
+Without cache directory, the project is restored in the directory before the build.
+"""
+
+import hashlib
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from tested.configs import DodonaConfig
+from tested.judge.cache import get_cache, toolchain_version
+from tested.judge.utils import BaseExecutionResult, run_command
+from tested.languages.conventionalize import EXECUTION_PREFIX
+from tested.languages.language import Command
+
+_logger = logging.getLogger(__name__)
+
+PROJECT = "dotnet.csproj"
+
+# Use the MSBuild server, and do not print the welcome message on first use.
+ENVIRONMENT = {
+    "DOTNET_CLI_USE_MSBUILD_SERVER": "1",
+    "DOTNET_CLI_TELEMETRY_OPTOUT": "1",
+    "DOTNET_NOLOGO": "1",
+}
+
+
+def _sdks() -> str:
+    """
+    Identify the installed SDKs, since the restore depends on the SDK that is used.
+    """
+    version = toolchain_version("dotnet")
+    if found := shutil.which("dotnet"):
+        sdk = Path(found).resolve().parent / "sdk"
+        if sdk.is_dir():
+            version += ":" + ",".join(sorted(x.name for x in sdk.iterdir()))
+    return version
+
+
+def _restore(directory: Path, remaining: float) -> BaseExecutionResult | None:
+    """
+    Restore the project in a directory.
+
+    :return: The result of the restore if it failed, or None.
+    """
+    command = ["dotnet", "restore", "--nologo", PROJECT]
+    result = run_command(directory, remaining, command, environment=ENVIRONMENT)
+    assert result is not None
+    if result.timeout or result.exit != 0:
+        _logger.warning(f"Restoring the project failed: {result.exit}")
+        return result
+    return None
+
+
+def restore(
+    config: DodonaConfig, directory: Path, remaining: float
+) -> BaseExecutionResult | None:
+    """
+    Restore the project in a directory, from the cache if possible.
+
+    :param config: The configuration.
+    :param directory: The directory with the project.
+    :param remaining: The max amount of time.
+
+    :return: The result of the restore if it failed, or None.
+    """
+    if not (cache := get_cache(config, "dotnet")):
+        return _restore(directory, remaining)
+
+    h = hashlib.sha256()
+    h.update(_sdks().encode())
+    h.update((directory / PROJECT).read_bytes())
+    key = h.hexdigest()
+
+    if cache.restore(key, directory) is None:
+        # Restore the project without the sources, so the skeleton is the same for
+        # all compilations.
+        start = time.monotonic()
+        with tempfile.TemporaryDirectory(
+            prefix=f"{EXECUTION_PREFIX}-restore-", dir=config.workdir
+        ) as temporary:
+            skeleton = Path(temporary)
+            shutil.copy2(directory / PROJECT, skeleton)
+            if failed := _restore(skeleton, remaining):
+                return failed
+            files = [
+                x.relative_to(skeleton)
+                for x in (skeleton / "obj").rglob("*")
+                if x.is_file()
+            ]
+            cache.put(key, skeleton, files)
+            shutil.copytree(skeleton / "obj", directory / "obj", dirs_exist_ok=True)
+        _logger.debug(f"Restored the project in {time.monotonic() - start:.2f}s")
+    return None
+
+
+def build(
+    config: DodonaConfig, directory: Path, remaining: float, command: Command
+) -> BaseExecutionResult | None:
+    """
+    Build the project in a directory, with the command of the incremental build.
+    """
+    start = time.monotonic()
+    if failed := restore(config, directory, remaining):
+        return failed
+    remaining -= time.monotonic() - start
+    return run_command(directory, remaining, command, environment=ENVIRONMENT)
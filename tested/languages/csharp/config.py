@@ -25,6 +25,7 @@ from tested.serialisation import Statement, Value
 logger = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
+    from tested.judge.utils import BaseExecutionResult
     from tested.languages.generation import PreparedExecutionUnit
 
 # Where the results of the compilation are stored.
@@ -38,6 +39,12 @@ class CSharp(Language):
     def needs_selector(self):
         return True
 
+    def concurrency_weight(self) -> int:
+        return 2
+
+    def startup_time(self) -> float:
+        return 0.1
+
     def file_extension(self) -> str:
         return "cs"
 
@@ -105,13 +112,17 @@ class CSharp(Language):
 
         executable_file = files[-1]
         name = Path(executable_file).stem
+        if self._incremental_build():
+            # The project is restored before the build, see the build module.
+            mode = ["--no-restore"]
+        else:
+            mode = ["--no-incremental", "--force"]
         args = [
             "dotnet",
             "build",
-            "--no-incremental",
+            *mode,
             "--output",
             OUTPUT_DIRECTORY,
-            "--force",
             "--nologo",
             f"-p:AssemblyName={name}",
             f"-p:StartupObject=Tested.{name}",
@@ -120,6 +131,20 @@ class CSharp(Language):
 
         return args, file_filter
 
+    def compile(
+        self, directory: Path, remaining: float, command: Command
+    ) -> "BaseExecutionResult | None":
+        if not self._incremental_build():
+            return super().compile(directory, remaining, command)
+        from tested.languages.csharp import build
+
+        assert self.config
+        return build.build(self.config.dodona, directory, remaining, command)
+
+    def _incremental_build(self) -> bool:
+        assert self.config
+        return bool(self.config.dodona.config_for().get("incremental_build", False))
+
     def execution(self, cwd: Path, file: str, arguments: list[str]) -> Command:
         file = OUTPUT_DIRECTORY + "/" + file
         return ["dotnet", file, *arguments]
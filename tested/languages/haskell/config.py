@@ -34,6 +34,12 @@ class Haskell(Language):
     def needs_selector(self):
         return True
 
+    def concurrency_weight(self) -> int:
+        return 2
+
+    def startup_time(self) -> float:
+        return 0.005
+
     def file_extension(self) -> str:
         return "hs"
 
@@ -81,19 +87,27 @@ class Haskell(Language):
             Construct.GLOBAL_VARIABLES,
         }
 
-    def compilation(self, files: list[str]) -> CallbackResult:
-        main_ = files[-1]
-        exec_ = main_.rstrip(".hs")
+    def _compiler(self) -> Command:
         assert self.config
         return [
             "ghc",
             "-fno-cse",
             "-fno-full-laziness",
             "-O3" if self.config.options.compiler_optimizations else "-O0",
-            main_,
-            "-main-is",
-            exec_,
-        ], [executable_name(exec_)]
+        ]
+
+    def compilation(self, files: list[str]) -> CallbackResult:
+        main_ = files[-1]
+        exec_ = main_.rstrip(".hs")
+        return [*self._compiler(), main_, "-main-is", exec_], [executable_name(exec_)]
+
+    def dependencies_compilation(self, files: list[str]) -> CallbackResult:
+        # GHC skips modules whose interface and object files are up-to-date, so
+        # the sources are kept next to them.
+        def file_filter(file: Path) -> bool:
+            return file.suffix in (".hs", ".hi", ".o")
+
+        return [*self._compiler(), "-no-link", *files], file_filter
 
     def execution(self, cwd: Path, file: str, arguments: list[str]) -> Command:
         local_file = cwd / file
@@ -109,6 +123,12 @@ class Haskell(Language):
         assert self.config
         return linter.run_hlint(self.config.dodona, remaining)
 
+    def linter_fingerprint(self) -> list[str]:
+        from tested.languages.haskell import linter
+
+        assert self.config
+        return linter.fingerprint(self.config.dodona)
+
     def cleanup_description(self, statement: str) -> str:
         return cleanup_description(self, statement)
 
@@ -5,6 +5,7 @@ from pathlib import Path
 from tested.configs import DodonaConfig
 from tested.dodona import AnnotateCode, ExtendedMessage, Message, Permission, Severity
 from tested.internationalization import get_i18n_string
+from tested.judge.cache import hash_file, toolchain_version
 from tested.judge.utils import run_command
 
 logger = logging.getLogger(__name__)
@@ -16,6 +17,24 @@ message_categories = {
 }
 
 
+def _config_path(config: DodonaConfig) -> Path:
+    language_options = config.config_for()
+    if path := language_options.get("hlint_config", None):
+        assert isinstance(path, str)
+        return config.resources / path
+    else:
+        # Use the default file.
+        return config.judge / "tested/languages/haskell/hlint.yml"
+
+
+def fingerprint(config: DodonaConfig) -> list[str]:
+    """
+    Identify hlint and its configuration, see
+    :meth:`tested.languages.language.Language.linter_fingerprint`.
+    """
+    return [toolchain_version("hlint"), hash_file(_config_path(config))]
+
+
 def run_hlint(
     config: DodonaConfig, remaining: float
 ) -> tuple[list[Message], list[AnnotateCode]]:
@@ -24,14 +43,7 @@ def run_hlint(
     annotations to tab.
     """
     submission = config.source
-    language_options = config.config_for()
-    if path := language_options.get("hlint_config", None):
-        assert isinstance(path, str)
-        config_path = config.resources / path
-    else:
-        # Use the default file.
-        config_path = config.judge / "tested/languages/haskell/hlint.yml"
-    config_path = str(config_path.absolute())
+    config_path = str(_config_path(config).absolute())
 
     execution_results = run_command(
         directory=submission.parent,
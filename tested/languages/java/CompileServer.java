@@ -0,0 +1,99 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import javax.tools.JavaCompiler;
+import javax.tools.ToolProvider;
+
+/**
+ * A compile server for TESTed, see tested/judge/compilers.py.
+ *
+ * A request on stdin is a line with the compiler, a line with the number of
+ * arguments, and a line for each argument. The paths in the arguments must be
+ * absolute. The response on stdout is a line with the exit code of the compiler
+ * and the length of its output in bytes, followed by the output.
+ *
+ * The requests are handled one at a time. Everything that is written to System.out
+ * or System.err during a request is part of the output, so it cannot break the
+ * responses. If the server runs out of memory, it stops after the response.
+ */
+public class CompileServer {
+
+    public static void main(String[] args) throws Exception {
+        PrintStream responses = new PrintStream(new FileOutputStream(FileDescriptor.out), false, "UTF-8");
+        BufferedReader requests = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        String compiler;
+        while ((compiler = requests.readLine()) != null) {
+            int count = Integer.parseInt(requests.readLine());
+            String[] arguments = new String[count];
+            for (int i = 0; i < count; i++) {
+                arguments[i] = requests.readLine();
+            }
+
+            ByteArrayOutputStream buffer = new ByteArrayOutputStream();
+            PrintStream output = new PrintStream(buffer, true, "UTF-8");
+            System.setOut(output);
+            System.setErr(output);
+            int exit;
+            boolean broken = false;
+            try {
+                exit = compile(compiler, output, arguments);
+            } catch (VirtualMachineError e) {
+                e.printStackTrace(output);
+                exit = 2;
+                broken = true;
+            } catch (Throwable e) {
+                e.printStackTrace(output);
+                exit = 2;
+            }
+
+            output.flush();
+            byte[] bytes = buffer.toByteArray();
+            responses.print(exit + " " + bytes.length + "\n");
+            responses.write(bytes);
+            responses.flush();
+            if (broken) {
+                System.exit(1);
+            }
+        }
+    }
+
+    private static int compile(String compiler, PrintStream output, String[] arguments) throws Throwable {
+        switch (compiler) {
+            case "javac":
+                return javac(output, arguments);
+            case "kotlinc":
+                return kotlinc(output, arguments);
+            default:
+                output.println("Unknown compiler: " + compiler);
+                return 2;
+        }
+    }
+
+    private static int javac(PrintStream output, String[] arguments) {
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        if (compiler == null) {
+            output.println("No Java compiler available");
+            return 2;
+        }
+        return compiler.run(null, output, output, arguments);
+    }
+
+    private static int kotlinc(PrintStream output, String[] arguments) throws Throwable {
+        // The compiler is loaded by name, so this file compiles without it.
+        Class<?> type = Class.forName("org.jetbrains.kotlin.cli.jvm.K2JVMCompiler");
+        Object compiler = type.getDeclaredConstructor().newInstance();
+        Method exec = type.getMethod("exec", PrintStream.class, String[].class);
+        try {
+            Object exitCode = exec.invoke(compiler, output, arguments);
+            return (Integer) exitCode.getClass().getMethod("getCode").invoke(exitCode);
+        } catch (InvocationTargetException e) {
+            throw e.getCause();
+        }
+    }
+}
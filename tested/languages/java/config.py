@@ -1,4 +1,5 @@
 import logging
+import os
 import re
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -26,6 +27,7 @@ from tested.languages.utils import jvm_cleanup_stacktrace, jvm_memory_limit
 from tested.serialisation import Statement, Value
 
 if TYPE_CHECKING:
+    from tested.judge.utils import BaseExecutionResult
     from tested.languages.generation import PreparedExecutionUnit
 
 
@@ -39,6 +41,12 @@ class Java(Language):
     def needs_selector(self):
         return True
 
+    def concurrency_weight(self) -> int:
+        return 2
+
+    def startup_time(self) -> float:
+        return 0.3
+
     def file_extension(self) -> str:
         return "java"
 
@@ -130,13 +138,53 @@ class Java(Language):
         def file_filter(file: Path) -> bool:
             return file.suffix == ".class"
 
-        others = [x for x in files if not x.endswith(".jar")]
+        # Precompiled dependencies are found on the class path.
+        others = [x for x in files if not x.endswith((".jar", ".class"))]
         return ["javac", "-cp", ".", *others], file_filter
 
+    def dependencies_compilation(self, files: list[str]) -> CallbackResult:
+        def file_filter(file: Path) -> bool:
+            return file.suffix == ".class"
+
+        return ["javac", "-cp", ".", *files], file_filter
+
+    def compile(
+        self, directory: Path, remaining: float, command: Command
+    ) -> "BaseExecutionResult | None":
+        from tested.judge.compilers import compile_in_server
+
+        assert self.config
+        directory = directory.absolute()
+        # The class files are put next to the sources, like with the command.
+        files = [str(directory / x) for x in command[3:]]
+        return compile_in_server(
+            self.config.dodona,
+            directory,
+            remaining,
+            command,
+            "javac",
+            ["-cp", str(directory), *files],
+            [],
+            ["-Xmx512M"],
+        )
+
     def execution(self, cwd: Path, file: str, arguments: list[str]) -> Command:
+        from tested.judge.cds import shared_archive
+
         assert self.config
         limit = jvm_memory_limit(self.config)
-        return ["java", f"-Xmx{limit}", "-cp", ".", Path(file).stem, *arguments]
+        options, classpath = shared_archive(
+            self.config.dodona, cwd, ["Values*.class", "EvaluationResult*.class"], []
+        )
+        return [
+            "java",
+            f"-Xmx{limit}",
+            *options,
+            "-cp",
+            os.pathsep.join(classpath),
+            Path(file).stem,
+            *arguments,
+        ]
 
     def linter(self, remaining: float) -> tuple[list[Message], list[AnnotateCode]]:
         # Import locally to prevent errors.
@@ -145,6 +193,12 @@ class Java(Language):
         assert self.config
         return linter.run_checkstyle(self.config.dodona, remaining)
 
+    def linter_fingerprint(self) -> list[str]:
+        from tested.languages.java import linter
+
+        assert self.config
+        return linter.fingerprint(self.config.dodona)
+
     def cleanup_stacktrace(self, stacktrace: str) -> str:
         return jvm_cleanup_stacktrace(stacktrace, submission_file(self))
 
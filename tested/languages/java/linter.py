@@ -5,7 +5,8 @@ from xml.etree import ElementTree
 from tested.configs import DodonaConfig
 from tested.dodona import AnnotateCode, ExtendedMessage, Message, Permission, Severity
 from tested.internationalization import get_i18n_string
-from tested.judge.utils import run_command
+from tested.judge.cache import hash_file, toolchain_version
+from tested.judge.servers import find_jar, run_jvm_linter
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,24 @@ message_categories = {
 }
 
 
+def _config_path(config: DodonaConfig) -> Path:
+    language_options = config.config_for()
+    if path := language_options.get("checkstyle_config", None):
+        assert isinstance(path, str)
+        return config.resources / path
+    else:
+        # Use the default file.
+        return config.judge / "tested/languages/java/sun_tested_checks.xml"
+
+
+def fingerprint(config: DodonaConfig) -> list[str]:
+    """
+    Identify checkstyle and its configuration, see
+    :meth:`tested.languages.language.Language.linter_fingerprint`.
+    """
+    return [toolchain_version("checkstyle"), hash_file(_config_path(config))]
+
+
 def run_checkstyle(
     config: DodonaConfig, remaining: float
 ) -> tuple[list[Message], list[AnnotateCode]]:
@@ -25,20 +44,18 @@ def run_checkstyle(
     annotations to tab.
     """
     submission = config.source
-    language_options = config.config_for()
-
-    if path := language_options.get("checkstyle_config", None):
-        assert isinstance(path, str)
-        config_path = config.resources / path
-    else:
-        # Use the default file.
-        config_path = config.judge / "tested/languages/java/sun_tested_checks.xml"
-    config_path = str(config_path.absolute())
+    config_path = str(_config_path(config).absolute())
 
-    execution_results = run_command(
+    # Nailgun resolves relative paths against the directory of the server.
+    arguments = ["-f", "xml", "-c", config_path, str(submission.absolute())]
+    execution_results = run_jvm_linter(
+        config,
         directory=submission.parent,
-        timeout=remaining,
-        command=["checkstyle", "-f", "xml", "-c", config_path, submission.name],
+        remaining=remaining,
+        command=["checkstyle", *arguments],
+        classpath=[jar] if (jar := find_jar("checkstyle")) else None,
+        main_class="com.puppycrawl.tools.checkstyle.Main",
+        arguments=arguments,
     )
 
     if execution_results is None:
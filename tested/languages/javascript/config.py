@@ -146,6 +146,12 @@ class JavaScript(Language):
         assert self.config
         return linter.run_eslint(self.config.dodona, remaining)
 
+    def linter_fingerprint(self) -> list[str]:
+        from tested.languages.javascript import linter
+
+        assert self.config
+        return linter.fingerprint(self.config.dodona)
+
     def cleanup_stacktrace(self, stacktrace: str) -> str:
         assert self.config
         # What this does:
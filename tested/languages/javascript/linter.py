@@ -5,12 +5,31 @@ from pathlib import Path
 from tested.configs import DodonaConfig
 from tested.dodona import AnnotateCode, ExtendedMessage, Message, Permission, Severity
 from tested.internationalization import get_i18n_string
-from tested.judge.utils import run_command
+from tested.judge.cache import hash_file, toolchain_version
+from tested.judge.servers import run_node_linter
 
 logger = logging.getLogger(__name__)
 severity = [Severity.INFO, Severity.WARNING, Severity.ERROR]
 
 
+def _config_path(config: DodonaConfig) -> Path:
+    language_options = config.config_for()
+    if path := language_options.get("eslint_config", None):
+        assert isinstance(path, str)
+        return config.resources / path
+    else:
+        # Use the default file.
+        return config.judge / "tested/languages/javascript/eslintrc.yml"
+
+
+def fingerprint(config: DodonaConfig) -> list[str]:
+    """
+    Identify eslint and its configuration, see
+    :meth:`tested.languages.language.Language.linter_fingerprint`.
+    """
+    return [toolchain_version("eslint"), hash_file(_config_path(config))]
+
+
 def run_eslint(
     config: DodonaConfig, remaining: float
 ) -> tuple[list[Message], list[AnnotateCode]]:
@@ -19,18 +38,12 @@ def run_eslint(
     annotations to tab.
     """
     submission = config.source
-    language_options = config.config_for()
-    if path := language_options.get("eslint_config", None):
-        assert isinstance(path, str)
-        config_path = config.resources / path
-    else:
-        # Use the default file.
-        config_path = config.judge / "tested/languages/javascript/eslintrc.yml"
-    config_path = str(config_path.absolute())
+    config_path = str(_config_path(config).absolute())
 
-    execution_results = run_command(
+    execution_results = run_node_linter(
+        config,
         directory=submission.parent,
-        timeout=remaining,
+        remaining=remaining,
         command=[
             "eslint",
             "-f",
@@ -40,6 +53,7 @@ def run_eslint(
             config_path,
             str(submission.absolute()),
         ],
+        server="eslint_d",
     )
 
     if execution_results is None:
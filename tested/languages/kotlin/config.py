@@ -1,6 +1,7 @@
 import logging
 import os
 import re
+import shutil
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -29,6 +30,7 @@ from tested.languages.utils import jvm_cleanup_stacktrace, jvm_memory_limit
 from tested.serialisation import Statement, Value
 
 if TYPE_CHECKING:
+    from tested.judge.utils import BaseExecutionResult
     from tested.languages.generation import PreparedExecutionUnit
 
 logger = logging.getLogger(__name__)
@@ -40,6 +42,28 @@ def get_executable(name):
     return name
 
 
+def _home() -> Path | None:
+    """
+    :return: The directory of the Kotlin compiler, or None if it is not found.
+    """
+    if not (found := shutil.which(get_executable("kotlinc"))):
+        return None
+    home = Path(found).resolve().parent.parent
+    return home if (home / "lib" / "kotlin-compiler.jar").is_file() else None
+
+
+def _libraries() -> list[str]:
+    """
+    :return: The jars of the standard library that the kotlin runner adds to the
+             class path, or nothing if they are not found.
+    """
+    if not (home := _home()):
+        return []
+    lib = home / "lib"
+    names = ["kotlin-stdlib.jar", "kotlin-reflect.jar"]
+    return [str(lib / x) for x in names if (lib / x).is_file()]
+
+
 class Kotlin(Language):
     def initial_dependencies(self) -> list[str]:
         return ["Values.kt", "EvaluationResult.kt"]
@@ -47,6 +71,12 @@ class Kotlin(Language):
     def needs_selector(self):
         return True
 
+    def concurrency_weight(self) -> int:
+        return 2
+
+    def startup_time(self) -> float:
+        return 0.4
+
     def file_extension(self) -> str:
         return "kt"
 
@@ -140,7 +170,50 @@ class Kotlin(Language):
         def file_filter(file: Path) -> bool:
             return file.suffix == ".class"
 
-        others = [x for x in files if not x.endswith(".jar")]
+        # Precompiled dependencies are found on the class path.
+        others = [x for x in files if not x.endswith((".jar", ".class"))]
+        return [*self._compiler(), *others], file_filter
+
+    def dependencies_compilation(self, files: list[str]) -> CallbackResult:
+        def file_filter(file: Path) -> bool:
+            return file.suffix == ".class"
+
+        return [*self._compiler(), *files], file_filter
+
+    def compile(
+        self, directory: Path, remaining: float, command: Command
+    ) -> "BaseExecutionResult | None":
+        from tested.judge.compilers import compile_in_server
+
+        assert self.config
+        if not (home := _home()):
+            return super().compile(directory, remaining, command)
+        directory = directory.absolute()
+        files = command[len(self._compiler()) :]
+        arguments = [
+            "-nowarn",
+            "-jvm-target",
+            "11",
+            "-kotlin-home",
+            str(home),
+            "-cp",
+            str(directory),
+            "-d",
+            str(directory),
+            *(str(directory / x) for x in files),
+        ]
+        return compile_in_server(
+            self.config.dodona,
+            directory,
+            remaining,
+            command,
+            "kotlinc",
+            arguments,
+            [str(home / "lib" / "kotlin-compiler.jar")],
+            ["-Xmx192M", "-Xss2m", "-Dkotlin.environment.keepalive=true"],
+        )
+
+    def _compiler(self) -> Command:
         return [
             get_executable("kotlinc"),
             f"-J-Xmx192M",
@@ -149,12 +222,31 @@ class Kotlin(Language):
             "11",
             "-cp",
             ".",
-            *others,
-        ], file_filter
+        ]
 
     def execution(self, cwd: Path, file: str, arguments: list[str]) -> Command:
+        from tested.judge.cds import shared_archive
+
         assert self.config
         limit = jvm_memory_limit(self.config)
+        if self.config.options.class_data_sharing and (libraries := _libraries()):
+            # The kotlin runner loads the classes with its own class loader, so the
+            # JVM is started directly to share the classes.
+            options, classpath = shared_archive(
+                self.config.dodona,
+                cwd,
+                ["ValuesKt*.class", "EvaluationResult*.class"],
+                libraries,
+            )
+            return [
+                "java",
+                f"-Xmx{limit}",
+                *options,
+                "-cp",
+                os.pathsep.join(classpath),
+                Path(file).stem,
+                *arguments,
+            ]
         return [
             get_executable("kotlin"),
             f"-J-Xmx{limit}",
@@ -192,6 +284,12 @@ class Kotlin(Language):
         assert self.config
         return linter.run_ktlint(self.config.dodona, remaining)
 
+    def linter_fingerprint(self) -> list[str]:
+        from tested.languages.kotlin import linter
+
+        assert self.config
+        return linter.fingerprint(self.config.dodona)
+
     def find_main_file(self, files: list[Path], name: str) -> Path | Status:
         logger.debug("Finding %s in %s", name, files)
         main_or_status = Language.find_main_file(self, files, name + "Kt")
@@ -5,11 +5,32 @@ from pathlib import Path
 from tested.configs import DodonaConfig
 from tested.dodona import AnnotateCode, ExtendedMessage, Message, Permission, Severity
 from tested.internationalization import get_i18n_string
-from tested.judge.utils import run_command
+from tested.judge.cache import hash_file, toolchain_version
+from tested.judge.servers import find_jar, run_jvm_linter
 
 logger = logging.getLogger(__name__)
 
 
+def _editorconfig(config: DodonaConfig) -> Path:
+    language_options = config.config_for()
+    if path := language_options.get("editorconfig", None):
+        assert isinstance(path, str)
+        return config.resources / path
+    else:
+        return config.judge / "tested/languages/kotlin/ktlint.editorconfig"
+
+
+def fingerprint(config: DodonaConfig) -> list[str]:
+    """
+    Identify ktlint and its configuration, see
+    :meth:`tested.languages.language.Language.linter_fingerprint`.
+    """
+    result = [toolchain_version("ktlint"), hash_file(_editorconfig(config))]
+    if path := config.config_for().get("ktlint_ruleset", None):
+        result.append(hash_file(config.resources / path))
+    return result
+
+
 def run_ktlint(
     config: DodonaConfig, remaining: float
 ) -> tuple[list[Message], list[AnnotateCode]]:
@@ -22,23 +43,24 @@ def run_ktlint(
 
     command = ["ktlint", "--reporter=json", "--log-level=error"]
 
-    if path := language_options.get("editorconfig", None):
-        assert isinstance(path, str)
-        editorconfig = config.resources / path
-    else:
-        editorconfig = config.judge / "tested/languages/kotlin/ktlint.editorconfig"
-    command.append(f"--editorconfig={editorconfig}")
+    command.append(f"--editorconfig={_editorconfig(config).absolute()}")
 
     if path := language_options.get("ktlint_ruleset", None):
         assert isinstance(path, str)
-        command.append(f"--ruleset={config.resources / path}")
+        command.append(f"--ruleset={(config.resources / path).absolute()}")
 
+    # Nailgun resolves relative paths against the directory of the server.
     submission = submission.absolute()
-
-    command.append(str(submission.relative_to(submission.parent)))
-
-    execution_results = run_command(
-        directory=submission.parent, timeout=remaining, command=command
+    command.append(str(submission))
+
+    execution_results = run_jvm_linter(
+        config,
+        directory=submission.parent,
+        remaining=remaining,
+        command=command,
+        classpath=[jar] if (jar := find_jar("ktlint")) else None,
+        main_class="com.pinterest.ktlint.Main",
+        arguments=command[1:],
     )
 
     if execution_results is None:
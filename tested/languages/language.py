@@ -27,6 +27,8 @@ from tested.testsuite import SupportedLanguage
 
 if TYPE_CHECKING:
     from tested.configs import GlobalConfig
+    from tested.judge.forkserver import Forkserver
+    from tested.judge.utils import BaseExecutionResult
     from tested.languages.generation import PreparedExecutionUnit
 
 Command = list[str]
@@ -144,6 +146,49 @@ class Language(ABC):
         """
         return [], files
 
+    def dependencies_compilation(self, files: list[str]) -> CallbackResult:
+        """
+        Callback for generating the command to compile the initial dependencies
+        on their own, without the submission or the generated code.
+
+        The initial dependencies do not depend on the submission, so if a cache
+        directory is configured, TESTed compiles them once and re-uses the results
+        for all judgements. The resulting files replace the initial dependencies
+        in the files passed to :meth:`compilation`, which must then use the
+        compiled dependencies instead of compiling them again.
+
+        The compilation happens in a directory containing only the initial
+        dependencies. The default implementation does not compile the dependencies,
+        which means they are compiled together with the submission.
+
+        :param files: The initial dependencies.
+
+        :return: The compilation command and either the resulting files or a filter
+                 for the resulting files.
+        """
+        return [], files
+
+    def compile(
+        self, directory: Path, remaining: float, command: Command
+    ) -> "BaseExecutionResult | None":
+        """
+        Run a compilation command (see :meth:`compilation` and
+        :meth:`dependencies_compilation`) in a directory.
+
+        By default, the command is run as is. A language can compile in another way,
+        e.g. in a compile server (see :mod:`tested.judge.compilers`), as long as the
+        result is the same as the result of the command.
+
+        :param directory: The directory with the files to compile.
+        :param remaining: The max amount of time.
+        :param command: The compilation command.
+
+        :return: The result of the compilation.
+        """
+        from tested.judge.utils import run_command
+
+        return run_command(directory, remaining, command)
+
     @abstractmethod
     def execution(self, cwd: Path, file: str, arguments: list[str]) -> Command:
         """
@@ -242,6 +287,38 @@ class Language(ABC):
         """
         return False
 
+    def supports_address_space_limit(self) -> bool:
+        """
+        If the memory of an execution can be limited by limiting the address space
+        of the process. This is not the case for runtimes that reserve much more
+        memory than they use, such as the JVM.
+
+        :return: True if yes, false otherwise.
+        """
+        return False
+
+    def concurrency_weight(self) -> int:
+        """
+        The number of CPUs an execution unit needs when units are executed in
+        parallel (see :mod:`tested.judge.scheduling`). Runtimes such as the JVM use
+        several threads for just-in-time compilation and garbage collection, so
+        fewer of those units should run at the same time.
+
+        :return: The number of CPUs, by default 1.
+        """
+        return 1
+
+    def startup_time(self) -> float:
+        """
+        An estimate of the time needed to start an execution unit, for example, to
+        start the runtime. This is used to decide how many units to use when they
+        are executed in parallel: more units are only useful if the time they save
+        is larger than the time needed to start them.
+
+        :return: The time in seconds, by default 0.05.
+        """
+        return 0.05
+
     def supported_constructs(self) -> set[Construct]:
         """
         Callback to get the supported constructs for a language. By default, no
@@ -326,6 +403,37 @@ class Language(ABC):
         """
         return [], []
 
+    def linter_fingerprint(self) -> list[str] | None:
+        """
+        Identify the linter and its configuration, so the results of the linter can
+        be cached (see :mod:`tested.judge.linter`). This must change if the results
+        for the same submission could change, e.g. the version of the linter or the
+        contents of its configuration files.
+
+        The submission, the options of the language and the natural language are
+        already part of the key of the cache.
+
+        By default, this is None, meaning the results are not cached.
+
+        :return: Strings identifying the linter and its configuration.
+        """
+        return None
+
+    def forkserver(self, directory: Path) -> Optional["Forkserver"]:
+        """
+        Start a forkserver for the execution units (see :mod:`tested.judge.forkserver`).
+        A forkserver is a warm process that has loaded the harness of the language
+        once, and forks a child for each execution unit instead of starting a new
+        process.
+
+        By default, there is no forkserver.
+
+        :param directory: The directory with the (compiled) dependencies.
+
+        :return: The forkserver, or None if the execution units are started normally.
+        """
+        return None
+
     def filter_dependencies(self, files: list[Path], context_name: str) -> list[Path]:
         """
         Callback to filter dependencies for one context.
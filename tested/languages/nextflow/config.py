@@ -39,6 +39,9 @@ class Nextflow(Language):
     def needs_selector(self):
         return False
 
+    def startup_time(self) -> float:
+        return 2.0
+
     def supported_constructs(self) -> set[Construct]:
         return {
             Construct.ASSIGNMENTS,
@@ -80,6 +83,12 @@ class Nextflow(Language):
         assert self.config
         return linter.run_codenarc(self.config.dodona, remaining)
 
+    def linter_fingerprint(self) -> list[str] | None:
+        from tested.languages.nextflow import linter
+
+        assert self.config
+        return linter.fingerprint(self.config.dodona)
+
     def generate_statement(self, statement: Statement) -> str:
         from tested.languages.nextflow import generators
 
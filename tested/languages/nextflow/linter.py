@@ -4,7 +4,8 @@ import logging
 from tested.configs import DodonaConfig
 from tested.dodona import AnnotateCode, ExtendedMessage, Message, Permission, Severity
 from tested.internationalization import get_i18n_string
-from tested.judge.utils import run_command
+from tested.judge.cache import hash_file, toolchain_version
+from tested.judge.servers import run_jvm_linter
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,18 @@ message_categories = {
     "p3": Severity.INFO,
 }
 
+
+def fingerprint(config: DodonaConfig) -> list[str] | None:
+    """
+    Identify CodeNarc and its rules, see
+    :meth:`tested.languages.language.Language.linter_fingerprint`.
+    """
+    if not (path := config.config_for().get("codenarc_path", None)):
+        return None
+    jars = sorted((config.resources / path).glob("*.jar"))
+    return [toolchain_version("java"), *(hash_file(jar) for jar in jars)]
+
+
 def run_codenarc(
     config: DodonaConfig, remaining: float
 ) -> tuple[list[Message], list[AnnotateCode]]:
@@ -33,19 +46,38 @@ def run_codenarc(
     codenarc_path = str(codenarc_path.absolute())
     report_file = str((config.workdir / "report.json").absolute())
 
-    execution_results = run_command(
+    classpath = [
+        f"{codenarc_path}/linter-rules-0.1.jar",
+        f"{codenarc_path}/CodeNarc-3.5.0-all.jar",
+        f"{codenarc_path}/slf4j-api-1.7.36.jar",
+        f"{codenarc_path}/slf4j-simple-1.7.36.jar",
+    ]
+    jvm_options = ["-Dorg.slf4j.simpleLogger.defaultLogLevel=error"]
+    # Nailgun resolves relative paths against the directory of the server.
+    arguments = [
+        f"-basedir={submission.parent.absolute()}",
+        f"-report=json:{report_file}",
+        "-rulesetfiles=rulesets/general.xml",
+        "-includes=**/*.nf",
+        f"-includes={submission.name}",
+    ]
+
+    execution_results = run_jvm_linter(
+        config,
         directory=submission.parent,
-        timeout=remaining,
+        remaining=remaining,
         command=[
             "java",
-            "-Dorg.slf4j.simpleLogger.defaultLogLevel=error",
+            *jvm_options,
             "-classpath",
-            f"{codenarc_path}/linter-rules-0.1.jar:{codenarc_path}/CodeNarc-3.5.0-all.jar:{codenarc_path}/slf4j-api-1.7.36.jar:{codenarc_path}/slf4j-simple-1.7.36.jar",
+            ":".join(classpath),
             "org.codenarc.CodeNarc",
-            f"-report=json:{report_file}",
-            "-rulesetfiles=rulesets/general.xml",
-            "-includes=**/*.nf",
-            f"-includes={submission.name}"]
+            *arguments,
+        ],
+        classpath=classpath,
+        main_class="org.codenarc.CodeNarc",
+        arguments=arguments,
+        jvm_options=jvm_options,
     )
 
     if execution_results is None:
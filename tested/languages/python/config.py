@@ -2,7 +2,7 @@ import logging
 import os
 import re
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from tested.datatypes import (
     AllTypes,
@@ -26,6 +26,7 @@ from tested.languages.language import (
 from tested.serialisation import Statement, Value
 
 if TYPE_CHECKING:
+    from tested.judge.forkserver import Forkserver
     from tested.languages.generation import PreparedExecutionUnit
 
 logger = logging.getLogger(__name__)
@@ -45,6 +46,9 @@ class Python(Language):
     def needs_selector(self):
         return False
 
+    def supports_address_space_limit(self) -> bool:
+        return True
+
     def supports_debug_information(self) -> bool:
         return True
 
@@ -135,6 +139,21 @@ class Python(Language):
     def execution(self, cwd: Path, file: str, arguments: list[str]) -> Command:
         return [_executable(), "-u", file, *arguments]
 
+    def forkserver(self, directory: Path) -> Optional["Forkserver"]:
+        assert self.config
+        if not self.config.dodona.config_for().get("forkserver", False):
+            return None
+        from tested.judge.forkserver import Forkserver
+
+        script = Path(__file__).parent / "forkserver.py"
+        modules = [Path(x).stem for x in self.initial_dependencies()]
+        server = Forkserver.start(
+            [_executable(), str(script), str(directory), *modules]
+        )
+        if server is None:
+            logger.warning("Could not start the forkserver, starting units normally")
+        return server
+
     def compiler_output(
         self, stdout: str, stderr: str
     ) -> tuple[list[Message], list[AnnotateCode], str, str]:
@@ -162,6 +181,12 @@ class Python(Language):
         assert self.config
         return linter.run_pylint(self.config.dodona, remaining)
 
+    def linter_fingerprint(self) -> list[str]:
+        from tested.languages.python import linter
+
+        assert self.config
+        return linter.fingerprint(self.config.dodona)
+
     # Idea and original code: dodona/judge-pythia
     def cleanup_stacktrace(self, stacktrace: str) -> str:
         context_file_regex = re.compile(r"context_[0-9]+_[0-9]+\.py")
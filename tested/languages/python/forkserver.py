@@ -0,0 +1,185 @@
+"""
+The forkserver for Python (see tested.judge.forkserver).
+
+Usage: python3 forkserver.py <directory> <module>... <socket>
+
+The modules of the harness are imported from the directory once. For each request
+on the socket, a child is forked that runs the file of the execution unit, like
+``python3 -u <file> <arguments>`` would, but without starting the interpreter and
+importing the harness again. The modules of the submission are not imported here,
+so every execution unit imports them itself.
+
+This script runs without TESTed, so it can only use the standard library.
+"""
+
+import atexit
+import io
+import json
+import os
+import resource
+import runpy
+import selectors
+import signal
+import socket
+import sys
+import threading
+import traceback
+
+
+def _standard_stream(fd: int, mode: str, errors: str) -> io.TextIOWrapper:
+    # Like the standard streams with "python -u".
+    buffer = open(fd, mode + "b", buffering=0 if mode == "w" else -1, closefd=False)
+    return io.TextIOWrapper(
+        buffer,  # type: ignore
+        encoding="utf-8",
+        errors=errors,
+        line_buffering=False,
+        write_through=True,
+    )
+
+
+def _exit_code(code) -> int:
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _run(directory: str, command: list[str]) -> int:
+    """
+    Run the file of the command in the child.
+
+    :return: The exit code.
+    """
+    # Skip the interpreter and its options (which have no values, like -u).
+    arguments = command[1:]
+    while arguments and arguments[0].startswith("-"):
+        arguments = arguments[1:]
+    os.chdir(directory)
+    sys.argv = arguments
+    sys.path[0] = directory
+    try:
+        try:
+            runpy.run_path(arguments[0], run_name="__main__")
+        finally:
+            for thread in threading.enumerate():
+                if not thread.daemon and thread is not threading.current_thread():
+                    thread.join()
+            atexit._run_exitfuncs()
+    except SystemExit as e:
+        return _exit_code(e.code)
+    except BaseException as e:
+        # Hide the frames of this script and runpy, like a normal traceback.
+        tb = e.__traceback__
+        while tb is not None and (
+            tb.tb_frame.f_globals is globals()
+            or tb.tb_frame.f_globals.get("__name__") == "runpy"
+        ):
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        return 1
+    return 0
+
+
+def _child(request: dict, fds: list[int], started: int):
+    if (cgroup := request["cgroup"]) is not None:
+        # Join the cgroup with the memory limit before anything else.
+        try:
+            with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+                f.write(str(os.getpid()))
+        except OSError as e:
+            os.write(fds[2], f"Could not join cgroup {cgroup}: {e}\n".encode())
+            os._exit(1)
+    os.setsid()
+    os.close(started)
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+    # Close everything of the server, such as the sockets and the selector.
+    os.closerange(3, resource.getrlimit(resource.RLIMIT_NOFILE)[0])
+    if (limit := request["address_space"]) is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    sys.stdin = sys.__stdin__ = _standard_stream(0, "r", "strict")
+    sys.stdout = sys.__stdout__ = _standard_stream(1, "w", "strict")
+    sys.stderr = sys.__stderr__ = _standard_stream(2, "w", "backslashreplace")
+    code = 1
+    try:
+        code = _run(request["directory"], request["command"])
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(code)
+
+
+def main():
+    directory, *modules, path = sys.argv[1:]
+    # Only import the harness from the directory, not this script's siblings.
+    sys.path[0] = directory
+    for module in modules:
+        __import__(module)
+
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    # Accept connections before the socket appears.
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path + ".new")
+    server.listen()
+    os.rename(path + ".new", path)
+
+    children: dict[int, socket.socket] = dict()
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    selector.register(wakeup_read, selectors.EVENT_READ)
+    selector.register(sys.stdin, selectors.EVENT_READ)
+    while True:
+        for key, _ in selector.select():
+            if key.fileobj is sys.stdin:
+                # TESTed closed our stdin, so it is done.
+                if not os.read(sys.stdin.fileno(), 1024):
+                    os.unlink(path)
+                    return
+            elif key.fileobj is server:
+                connection, _ = server.accept()
+                message, fds, _, _ = socket.recv_fds(connection, 1 << 20, 3)
+                request = json.loads(message)
+                started, child_started = os.pipe()
+                if (pid := os.fork()) == 0:
+                    os.close(started)
+                    _child(request, fds, child_started)
+                os.close(child_started)
+                for fd in fds:
+                    os.close(fd)
+                # The child closes its end once it has its own session.
+                os.read(started, 1)
+                os.close(started)
+                children[pid] = connection
+                try:
+                    connection.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+                except OSError:
+                    pass
+            else:
+                os.read(wakeup_read, 1024)
+                while children:
+                    pid, status, usage = os.wait4(-1, os.WNOHANG)
+                    if pid == 0:
+                        break
+                    connection = children.pop(pid)
+                    result = {"status": status, "rusage": list(usage)}
+                    try:
+                        connection.sendall(json.dumps(result).encode() + b"\n")
+                    except OSError:
+                        pass
+                    connection.close()
+
+
+if __name__ == "__main__":
+    main()
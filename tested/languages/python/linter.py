@@ -4,7 +4,9 @@ Most of this code is taken from the code from Pythia.
 """
 
 import logging
+from importlib.metadata import version
 from io import StringIO
+from pathlib import Path
 
 from pylint import lint
 from pylint.reporters import JSONReporter
@@ -12,6 +14,7 @@ from pylint.reporters import JSONReporter
 from tested.configs import DodonaConfig
 from tested.dodona import *
 from tested.internationalization import get_i18n_string
+from tested.judge.cache import hash_file
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +27,24 @@ message_categories = {
 }
 
 
+def _config_path(config: DodonaConfig) -> Path:
+    language_options = config.config_for()
+    if path := language_options.get("pylint_config", None):
+        assert isinstance(path, str)
+        return config.resources / path
+    else:
+        # Use the default file.
+        return config.judge / "tested/languages/python/pylint_config.rc"
+
+
+def fingerprint(config: DodonaConfig) -> list[str]:
+    """
+    Identify pylint and its configuration, see
+    :meth:`tested.languages.language.Language.linter_fingerprint`.
+    """
+    return [f"pylint {version('pylint')}", hash_file(_config_path(config))]
+
+
 def run_pylint(
     config: DodonaConfig, remaining: float
 ) -> tuple[list[Message], list[AnnotateCode]]:
@@ -32,13 +53,7 @@ def run_pylint(
     annotations to tab.
     """
     submission = config.source
-    language_options = config.config_for()
-    if path := language_options.get("pylint_config", None):
-        assert isinstance(path, str)
-        config_path = config.resources / path
-    else:
-        # Use the default file.
-        config_path = config.judge / "tested/languages/python/pylint_config.rc"
+    config_path = _config_path(config)
 
     pylint_out = StringIO()
     try:
@@ -14,9 +14,16 @@ class RunHaskell(Haskell):
         else:
             return [], files
 
+    def dependencies_compilation(self, files: list[str]) -> CallbackResult:
+        return [], files
+
     def execution(self, cwd: Path, file: str, arguments: list[str]) -> Command:
         return ["runhaskell", file, *arguments]
 
+    def startup_time(self) -> float:
+        # The submission is interpreted, which is slow to start.
+        return 1.0
+
     def filter_dependencies(self, files: list[Path], context_name: str) -> list[Path]:
         return files
 
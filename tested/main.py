@@ -7,15 +7,14 @@ from typing import IO
 
 from tested.configs import DodonaConfig, create_bundle
 from tested.dsl import parse_dsl
-from tested.testsuite import parse_test_suite
+from tested.testsuite import Suite, parse_test_suite
 
 
-def run(config: DodonaConfig, judge_output: IO):
+def load_suite(config: DodonaConfig) -> Suite:
     """
-    Run the TESTed judge.
+    Read and parse the test suite from the configuration.
 
     :param config: The configuration, as received from Dodona.
-    :param judge_output: Where the judge output will be written to.
     """
     try:
         with open(f"{config.resources}/{config.test_suite}", "r") as t:
@@ -33,6 +32,17 @@ def run(config: DodonaConfig, judge_output: IO):
         suite = parse_dsl(textual_suite)
     else:
         suite = parse_test_suite(textual_suite)
+    return suite
+
+
+def run(config: DodonaConfig, judge_output: IO):
+    """
+    Run the TESTed judge.
+
+    :param config: The configuration, as received from Dodona.
+    :param judge_output: Where the judge output will be written to.
+    """
+    suite = load_suite(config)
     pack = create_bundle(config, judge_output, suite)
     from .judge import judge
 
@@ -0,0 +1,18 @@
+process echo {
+    input:
+    val x
+
+    output:
+    stdout
+
+    script:
+    def unused = 5   
+    """
+    echo -n '${x}'
+    """
+}
+
+workflow {
+    if (true) {
+    }
+}
@@ -0,0 +1,2 @@
+while True:
+    print("Echo! " * 100)
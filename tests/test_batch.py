@@ -0,0 +1,48 @@
+"""
+Tests for judging multiple submissions at once.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from tested.batch import find_submissions, judge_batch
+from tests.manual_utils import assert_valid_output, configuration
+
+
+@pytest.mark.parametrize("language", ["python", "c"])
+def test_batch_judges_all_submissions(
+    language: str, tmp_path: Path, pytestconfig: pytest.Config
+):
+    conf = configuration(
+        pytestconfig, "echo", language, tmp_path / "workdir", "one.tson", "correct"
+    )
+    ext = conf.source.suffix
+    submissions = tmp_path / "submissions"
+    submissions.mkdir()
+    for name in ("correct", "run-error"):
+        source = conf.source.parent / f"{name}{ext}"
+        (submissions / f"{name}{ext}").write_bytes(source.read_bytes())
+
+    output = tmp_path / "output"
+    results = judge_batch(conf, find_submissions(submissions), output, 2)
+
+    assert [r.name for r in results] == [
+        f"correct{ext}.jsonl",
+        f"run-error{ext}.jsonl",
+    ]
+    correct, error = [assert_valid_output(r.read_text(), pytestconfig) for r in results]
+    assert correct.find_status_enum() == ["correct"]
+    assert "correct" not in error.find_status_enum()
+    # C inspects the submission during generation, so it cannot share the harness.
+    assert (output / "workdirs" / "harness").is_dir() == (language == "python")
+
+
+def test_batch_reads_manifest(tmp_path: Path):
+    (tmp_path / "a.py").touch()
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.py").touch()
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("a.py\n\nsub/b.py\n")
+
+    assert find_submissions(manifest) == [tmp_path / "a.py", tmp_path / "sub" / "b.py"]
@@ -0,0 +1,214 @@
+"""
+Tests for the persistent caches.
+"""
+
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from tested.configs import DodonaConfig, Options
+from tested.judge.cache import (
+    FileCache,
+    SecretMask,
+    cache_statistics,
+    toolchain_version,
+)
+from tested.judge.cds import jdk_version, shared_archive
+from tested.testsuite import SupportedLanguage
+from tests.manual_utils import assert_valid_output, configuration, execute_config
+
+
+def test_cache_stores_and_restores_files(tmp_path: Path):
+    source = tmp_path / "source"
+    (source / "sub").mkdir(parents=True)
+    (source / "a.txt").write_text("a")
+    (source / "sub" / "b.txt").write_text("b")
+    cache = FileCache(tmp_path / "cache", 1024)
+
+    assert cache.get("key") is None
+    cache.put("key", source, [Path("a.txt"), Path("sub/b.txt")], {"extra": 5})
+    cached = cache.get("key")
+
+    assert cached is not None
+    files, metadata = cached
+    assert (files / "sub" / "b.txt").read_text() == "b"
+    assert metadata["extra"] == 5
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "file").write_bytes(b"x" * 100)
+    cache = FileCache(tmp_path / "cache", 250)
+
+    cache.put("first", source, [Path("file")])
+    cache.put("second", source, [Path("file")])
+    # Make the first entry the oldest.
+    os.utime(cache.directory / "first", (0, 0))
+    cache.put("third", source, [Path("file")])
+
+    assert cache.get("first") is None
+    assert cache.get("second") is not None
+    assert cache.get("third") is not None
+
+
+def test_evicted_entry_is_not_restored(tmp_path: Path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "a.txt").write_text("a")
+    (source / "b.txt").write_text("b")
+    cache = FileCache(tmp_path / "cache", 1024)
+    cache.put("key", source, [Path("a.txt"), Path("b.txt")])
+    # Another judgement evicts the entry while it is restored.
+    (cache.directory / "key" / "files" / "b.txt").unlink()
+
+    destination = tmp_path / "destination"
+    assert cache.restore("key", destination) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_secrets_are_masked_in_cached_files(tmp_path: Path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "a.txt").write_bytes(
+        b"--abcdefghi-- SEP" + "abcdefghi".encode("utf-16-le")
+    )
+    cache = FileCache(tmp_path / "cache", 1024)
+    cache.put(
+        "key", source, [Path("a.txt")], transform=SecretMask("abcdefghi", "").mask
+    )
+    assert (
+        b"abcdefghi" not in (cache.directory / "key" / "files" / "a.txt").read_bytes()
+    )
+
+    destination = tmp_path / "destination"
+    assert cache.restore("key", destination, SecretMask("jklmnopqr", "").unmask)
+    assert (destination / "a.txt").read_bytes() == (
+        b"--jklmnopqr-- SEP" + "jklmnopqr".encode("utf-16-le")
+    )
+
+
+@pytest.mark.parametrize("language", ["python", "c", "bash", "csharp"])
+def test_compilation_is_cached(
+    language: str, tmp_path: Path, pytestconfig: pytest.Config
+):
+    cache_directory = tmp_path / "cache"
+    options = {"options": {"cache_directory": str(cache_directory)}}
+
+    # Each judgement has other secrets, and the second one another directory.
+    for name in ("first", "second"):
+        workdir = tmp_path / name
+        workdir.mkdir()
+        conf = configuration(
+            pytestconfig, "echo", language, workdir, "one.tson", "correct", options
+        )
+        result = execute_config(conf)
+        updates = assert_valid_output(result, pytestconfig)
+        assert updates.find_status_enum() == ["correct"]
+
+    statistics = cache_statistics()[cache_directory / "compilation"]
+    assert statistics == (1, 1)
+
+
+def test_dependencies_are_compiled_once(tmp_path: Path, pytestconfig: pytest.Config):
+    cache_directory = tmp_path / "cache"
+    options = {"options": {"cache_directory": str(cache_directory)}}
+
+    for submission in ("correct", "wrong"):
+        workdir = tmp_path / submission
+        workdir.mkdir()
+        conf = configuration(
+            pytestconfig, "echo", "c", workdir, "one.tson", submission, options
+        )
+        result = execute_config(conf)
+        updates = assert_valid_output(result, pytestconfig)
+        assert updates.find_status_enum() == [submission]
+        assert (workdir / "common" / "values.o").exists()
+        assert not (workdir / "common" / "values.c").exists()
+
+    statistics = cache_statistics()[cache_directory / "dependencies"]
+    assert statistics == (1, 1)
+
+
+def test_linter_results_are_cached(tmp_path: Path, pytestconfig: pytest.Config):
+    cache_directory = tmp_path / "cache"
+    options = {"options": {"cache_directory": str(cache_directory), "linter": True}}
+
+    annotations = []
+    for attempt in ("first", "second"):
+        workdir = tmp_path / attempt
+        workdir.mkdir()
+        conf = configuration(
+            pytestconfig,
+            "counter",
+            "python",
+            workdir,
+            "plan.yaml",
+            "solution-pylint",
+            options,
+        )
+        result = execute_config(conf)
+        updates = assert_valid_output(result, pytestconfig)
+        annotations.append(updates.find_all("annotate-code"))
+
+    assert annotations[0]
+    assert annotations[0] == annotations[1]
+    statistics = cache_statistics()[cache_directory / "linter"]
+    assert statistics == (1, 1)
+
+
+def test_class_data_sharing_archive_is_created_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    jdk = tmp_path / "jdk"
+    (jdk / "bin").mkdir(parents=True)
+    (jdk / "bin" / "java").write_text("#!/bin/sh\n")
+    (jdk / "bin" / "java").chmod(0o755)
+    (jdk / "release").write_text('JAVA_VERSION="21.0.1"\n')
+    monkeypatch.setenv("PATH", str(jdk / "bin"))
+    jdk_version.cache_clear()
+    toolchain_version.cache_clear()
+    execution = tmp_path / "execution"
+    execution.mkdir()
+    for name in ("Values.class", "EvaluationResult$Message.class", "Context.class"):
+        (execution / name).write_bytes(name.encode())
+    config = DodonaConfig(
+        resources=tmp_path,
+        source=tmp_path / "submission.java",
+        time_limit=10,
+        memory_limit=536870912,
+        natural_language="en",
+        programming_language=SupportedLanguage.JAVA,
+        workdir=execution,
+        judge=tmp_path,
+        options=Options(class_data_sharing=True, cache_directory=tmp_path / "cache"),
+    )
+    harness = ["Values*.class", "EvaluationResult*.class"]
+
+    try:
+        assert jdk_version() == 21
+        creating, classpath = shared_archive(config, execution, harness, [])
+        waiting, _ = shared_archive(config, execution, harness, [])
+        archive = Path(creating[0].removeprefix("-XX:SharedArchiveFile="))
+        archive.write_bytes(b"")
+        reading, _ = shared_archive(config, execution, harness, [])
+    finally:
+        jdk_version.cache_clear()
+        toolchain_version.cache_clear()
+
+    assert any(x.startswith("-XX:SharedArchiveFile=") for x in creating)
+    assert "-XX:+AutoCreateSharedArchive" in creating
+    # Only one execution creates the archive, and the others only read it.
+    assert waiting == []
+    assert reading[0] == creating[0]
+    assert "-XX:+AutoCreateSharedArchive" not in reading
+    jar, directory = classpath
+    assert directory == "."
+    with zipfile.ZipFile(jar) as archive:
+        assert sorted(archive.namelist()) == [
+            "EvaluationResult$Message.class",
+            "Values.class",
+        ]
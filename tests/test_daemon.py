@@ -0,0 +1,86 @@
+"""
+Tests for running TESTed as a daemon.
+"""
+
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from tested.daemon import JudgeServer, submit
+from tested.parsing import get_converter
+from tests.manual_utils import assert_valid_output, configuration
+
+# The signals that drain the daemon.
+_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+def _start_daemon(socket_path: Path, pytestconfig: pytest.Config) -> subprocess.Popen:
+    daemon = subprocess.Popen(
+        [sys.executable, "-m", "tested.daemon", "--socket", str(socket_path)],
+        cwd=pytestconfig.rootpath,
+    )
+    # Starting the daemon imports everything, which is slow on a busy machine.
+    for _ in range(600):
+        if socket_path.exists() or daemon.poll() is not None:
+            break
+        time.sleep(0.1)
+    if not socket_path.exists():
+        daemon.kill()
+        pytest.fail("Daemon did not create its socket.")
+    return daemon
+
+
+def test_daemon_judges_concurrent_jobs(tmp_path: Path, pytestconfig: pytest.Config):
+    socket_path = tmp_path / "tested.sock"
+    configs = []
+    for i in range(2):
+        workdir = tmp_path / f"job{i}"
+        workdir.mkdir()
+        conf = configuration(
+            pytestconfig, "echo-function", "python", workdir, "one.tson", "correct"
+        )
+        configs.append(get_converter().dumps(conf))
+
+    daemon = _start_daemon(socket_path, pytestconfig)
+
+    def _judge(config: str) -> str:
+        out = StringIO()
+        submit(socket_path, config, out)
+        return out.getvalue()
+
+    try:
+        with ThreadPoolExecutor() as executor:
+            results = list(executor.map(_judge, configs))
+    finally:
+        daemon.send_signal(signal.SIGTERM)
+        assert daemon.wait(timeout=30) == 0
+
+    assert not socket_path.exists()
+    for result in results:
+        updates = assert_valid_output(result, pytestconfig)
+        assert updates.find_status_enum() == ["correct"]
+
+
+def test_jobs_do_not_inherit_signal_handlers(tmp_path: Path, mocker: MockerFixture):
+    # Only the judgement itself, which would need a real connection, is skipped.
+    mocker.patch("socketserver.BaseServer.finish_request")
+    server = JudgeServer(tmp_path / "tested.sock", 1)
+    previous = {x: signal.signal(x, lambda *_: None) for x in _SIGNALS}
+    request, client = socket.socketpair()
+    try:
+        server.finish_request(request, "")
+        assert all(signal.getsignal(x) == signal.SIG_DFL for x in _SIGNALS)
+    finally:
+        for number, handler in previous.items():
+            signal.signal(number, handler)
+        request.close()
+        client.close()
+        server.server_close()
@@ -0,0 +1,82 @@
+"""
+Tests for the asyncio engine.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from tested.judge.engine import UnitRunner, run_command_async
+
+# Starts a child that outlives the shell, and prints its process id.
+_SPAWN = "sleep 60 & echo $!; wait"
+
+
+def _is_stopped(pid: int) -> bool:
+    # A killed process needs a moment to exit, and might stay a zombie for a while.
+    for _ in range(50):
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                if f.read().split(")")[-1].split()[0] in ("Z", "X"):
+                    return True
+        except FileNotFoundError:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def test_async_command_with_input_and_output(tmp_path: Path):
+    outputs = []
+    command = [sys.executable, "-c", "import sys; print(sys.stdin.read().upper())"]
+    result = asyncio.run(
+        run_command_async(
+            tmp_path,
+            60,
+            command,
+            stdin="hello",
+            on_output=lambda out, err: outputs.append(out),
+        )
+    )
+
+    assert result is not None
+    assert result.exit == 0
+    assert result.stdout == "HELLO\n"
+    assert "".join(outputs) == "HELLO\n"
+
+
+def test_async_command_timeout_kills_process_group(tmp_path: Path):
+    start = time.perf_counter()
+    result = asyncio.run(run_command_async(tmp_path, 1, ["sh", "-c", _SPAWN]))
+
+    assert result is not None
+    assert result.timeout
+    assert time.perf_counter() - start < 10
+    assert _is_stopped(int(result.stdout))
+
+
+def test_cancelled_unit_kills_process_group(tmp_path: Path):
+    pid_file = tmp_path / "pid"
+
+    async def _unit():
+        await run_command_async(tmp_path, 60, ["sh", "-c", f"({_SPAWN}) > {pid_file}"])
+
+    with UnitRunner() as runner:
+        future = runner.submit(_unit)
+        while not pid_file.exists() or not pid_file.read_text():
+            time.sleep(0.05)
+        start = time.perf_counter()
+        assert future.cancel()
+    assert time.perf_counter() - start < 10
+    assert _is_stopped(int(pid_file.read_text()))
+
+
+def test_async_command_timeout_after_output_is_closed(tmp_path: Path):
+    # The command keeps running after closing its output.
+    code = "import os, time; os.close(1); os.close(2); time.sleep(30)"
+    start = time.perf_counter()
+    result = asyncio.run(run_command_async(tmp_path, 1, [sys.executable, "-c", code]))
+
+    assert result is not None
+    assert result.timeout
+    assert time.perf_counter() - start < 3
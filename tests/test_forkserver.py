@@ -0,0 +1,108 @@
+"""
+Tests for executing the units through a forkserver.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from tested.judge.forkserver import Forkserver
+from tested.judge.utils import run_command
+from tests.manual_utils import assert_valid_output, configuration, execute_config
+from tests.test_engine import _is_stopped
+
+_FORKSERVER = {"language": {"python": {"forkserver": True}}}
+
+# Starts a child that outlives the unit, and prints its process id.
+_SPAWN = """
+import subprocess
+child = subprocess.Popen(["sleep", "60"])
+print(child.pid, flush=True)
+child.wait()
+"""
+
+
+@pytest.mark.parametrize(
+    "options",
+    [dict(), {"parallel": True}, {"parallel": True, "engine": "asyncio"}],
+    ids=["sequential", "threads", "asyncio"],
+)
+def test_python_forkserver_executes_units(
+    options: dict, tmp_path: Path, pytestconfig: pytest.Config
+):
+    config_ = {"options": {**options, **_FORKSERVER}}
+    conf = configuration(
+        pytestconfig, "echo", "python", tmp_path, "full.tson", "correct", config_
+    )
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    assert len(updates.find_all("start-testcase")) == 50
+    assert updates.find_status_enum() == ["correct"] * 50
+
+
+def test_python_forkserver_passes_arguments(
+    tmp_path: Path, pytestconfig: pytest.Config
+):
+    config_ = {"options": _FORKSERVER}
+    conf = configuration(
+        pytestconfig, "sum", "python", tmp_path, "short.tson", "correct", config_
+    )
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    assert updates.find_status_enum() == ["correct"] * 4
+
+
+def test_python_forkserver_reports_errors_like_normal_execution(
+    tmp_path: Path, pytestconfig: pytest.Config
+):
+    outcomes = []
+    for options in (dict(), _FORKSERVER):
+        workdir = tmp_path / str(len(outcomes))
+        workdir.mkdir()
+        conf = configuration(
+            pytestconfig,
+            "echo",
+            "python",
+            workdir,
+            "two.tson",
+            "run-error",
+            {"options": options},
+        )
+        result = execute_config(conf)
+        updates = assert_valid_output(result, pytestconfig)
+        outcomes.append((updates.find_status_enum(), updates.find_all("close-test")))
+    assert outcomes[0] == outcomes[1]
+
+
+def test_forkserver_timeout_kills_process_group(tmp_path: Path):
+    harness = tmp_path / "harness"
+    harness.mkdir()
+    (harness / "values.py").write_text("")
+    (tmp_path / "unit.py").write_text(_SPAWN)
+    script = Path("tested/languages/python/forkserver.py").absolute()
+    server = Forkserver.start([sys.executable, str(script), str(harness), "values"])
+    assert server is not None
+    with server:
+        result = run_command(
+            tmp_path, 1, [sys.executable, "-u", "unit.py"], forkserver=server
+        )
+    assert result is not None
+    assert result.timeout
+    assert _is_stopped(int(result.stdout))
+    assert server.process.returncode == 0
+
+
+def test_command_is_started_without_forkserver_if_it_fails(tmp_path: Path):
+    harness = tmp_path / "harness"
+    harness.mkdir()
+    (harness / "values.py").write_text("")
+    script = Path("tested/languages/python/forkserver.py").absolute()
+    server = Forkserver.start([sys.executable, str(script), str(harness), "values"])
+    assert server is not None
+    # The socket is gone once the forkserver is stopped.
+    server.stop()
+    result = run_command(tmp_path, 5, ["echo", "hello"], forkserver=server)
+    assert result is not None
+    assert result.exit == 0
+    assert result.stdout == "hello\n"
@@ -7,17 +7,26 @@ Running the tests should happen in with the root directory (the one with src/ an
 tests/) as the working directory.
 """
 
+import json
 import sys
 from pathlib import Path
+from typing import Any
 
 import pytest
 from pytest_mock import MockerFixture
 
 from tested.configs import create_bundle
 from tested.features import Construct
-from tested.judge.execution import ExecutionResult
+from tested.judge import core
+from tested.judge.execution import (
+    ContextStream,
+    ExecutionResult,
+    _get_contents_or_empty,
+)
+from tested.judge.speculation import get_compilation_history
 from tested.languages import get_language, LANGUAGES
 from tested.languages.generation import get_readable_input
+from tested.main import load_suite
 from tested.testsuite import Context, MainInput, Suite, Tab, Testcase, TextData
 from tests.language_markers import (
     ALL_LANGUAGES,
@@ -32,7 +41,10 @@ def test_global_variable(language: str, tmp_path: Path, pytestconfig: pytest.Con
     conf = configuration(
         pytestconfig, "global", language, tmp_path, "one.tson", "correct"
     )
-    if Construct.GLOBAL_VARIABLES not in get_language(None, conf.programming_language).supported_constructs():
+    if (
+        Construct.GLOBAL_VARIABLES
+        not in get_language(None, conf.programming_language).supported_constructs()
+    ):
         pytest.skip("Language doesn't support global variables")
     result = execute_config(conf)
     updates = assert_valid_output(result, pytestconfig)
@@ -46,7 +58,10 @@ def test_global_variable_yaml(
     conf = configuration(
         pytestconfig, "global", language, tmp_path, "plan.yaml", "correct"
     )
-    if Construct.GLOBAL_VARIABLES not in get_language(None, conf.programming_language).supported_constructs():
+    if (
+        Construct.GLOBAL_VARIABLES
+        not in get_language(None, conf.programming_language).supported_constructs()
+    ):
         pytest.skip("Language doesn't support global variables")
     result = execute_config(conf)
     updates = assert_valid_output(result, pytestconfig)
@@ -265,6 +280,22 @@ def test_batch_compilation(
     assert spy.call_count == 1
 
 
+@pytest.mark.parametrize("language", ["python", "c", "bash"])
+def test_contexts_are_streamed(
+    language: str, tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
+):
+    spy = mocker.spy(ContextStream, "close")
+    conf = configuration(
+        pytestconfig, "echo-function", language, tmp_path, "full.tson", "correct"
+    )
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    assert updates.find_status_enum() == ["correct"] * 50
+    # All contexts but the last one are finished before the unit ends.
+    assert spy.call_count == 1
+    assert spy.call_args.args[0].streamed == 49
+
+
 @pytest.mark.parametrize("language", ALL_LANGUAGES)
 def test_batch_compilation_fallback(
     language: str, tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
@@ -282,6 +313,106 @@ def test_batch_compilation_fallback(
     assert spy.call_count == 3
 
 
+def test_batch_compilation_fallback_bisects_units(
+    tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
+):
+    config_ = {"options": {"allow_fallback": True}}
+    spy = mocker.spy(LANGUAGES["c"], "compilation")
+    conf = configuration(
+        pytestconfig,
+        "echo-function",
+        "c",
+        tmp_path,
+        "eight-tabs-one-broken.yaml",
+        "correct",
+        config_,
+    )
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    statuses = updates.find_status_enum()
+    assert statuses.count("correct") == 7
+    assert "compilation error" in statuses
+    # The precompilation, both halves, both quarters with tab 5 and both eighths
+    # with tab 5, instead of the precompilation and every tab on its own.
+    assert spy.call_count == 7
+
+
+def test_compiled_files_are_listed_once(
+    tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
+):
+    conf = configuration(
+        pytestconfig, "echo", "csharp", tmp_path, "two.tson", "correct"
+    )
+    spy = mocker.spy(Path, "rglob")
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    assert updates.find_status_enum() == ["correct"] * 2
+    # C# gives a filter for the compiled files, which is applied once, instead of
+    # once for every execution unit.
+    assert spy.call_count == 1
+
+
+def _fail_precompilation_before(bundle_conf, judgements: int):
+    bundle = create_bundle(bundle_conf, sys.stdout, load_suite(bundle_conf))
+    history = get_compilation_history(bundle)
+    assert history is not None
+    for _ in range(judgements):
+        history.record(True)
+    return history
+
+
+def test_speculative_compilation_is_used_on_failure(
+    tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
+):
+    options = {
+        "speculative_compilation": 0.5,
+        "cache_directory": str(tmp_path / "cache"),
+    }
+    conf = configuration(
+        pytestconfig,
+        "echo-function",
+        "c",
+        tmp_path,
+        "eight-tabs-one-broken.yaml",
+        "correct",
+        {"options": options},
+    )
+    history = _fail_precompilation_before(conf, 3)
+    spy = mocker.spy(core, "_start_speculative_compilation")
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    statuses = updates.find_status_enum()
+    assert statuses.count("correct") == 7
+    assert "compilation error" in statuses
+    assert spy.spy_return is not None
+    assert history.failure_rate() == 1.0
+
+
+def test_speculative_compilation_is_discarded_on_success(
+    tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
+):
+    options = {
+        "speculative_compilation": 0.5,
+        "cache_directory": str(tmp_path / "cache"),
+    }
+    conf = configuration(
+        pytestconfig,
+        "isbn",
+        "python",
+        tmp_path,
+        "full.tson",
+        "solution",
+        {"options": options},
+    )
+    history = _fail_precompilation_before(conf, 3)
+    spy = mocker.spy(core, "_start_speculative_compilation")
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    assert set(updates.find_status_enum()) == {"correct"}
+    assert spy.spy_return is not None
+    assert history.failure_rate() == 0.75
+
+
 @pytest.mark.parametrize("language", ALL_LANGUAGES)
 def test_batch_compilation_no_fallback(
     language: str, tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
@@ -316,6 +447,61 @@ def test_batch_compilation_no_fallback_runtime(
     assert all(s in ("runtime error", "wrong") for s in updates.find_status_enum())
 
 
+@pytest.mark.parametrize("language", ["java", "kotlin"])
+@pytest.mark.parametrize("solution", ["correct", "comp-error"])
+def test_compile_server_gives_same_results(
+    language: str, solution: str, tmp_path: Path, pytestconfig: pytest.Config
+):
+    outcomes = []
+    for server in (False, True):
+        workdir = tmp_path / str(server)
+        workdir.mkdir()
+        config_ = {"options": {"compiler_server": server}}
+        conf = configuration(
+            pytestconfig, "echo", language, workdir, "two.tson", solution, config_
+        )
+        result = execute_config(conf)
+        updates = assert_valid_output(result, pytestconfig)
+        messages = updates.find_all("append-message")
+        outcomes.append((updates.find_status_enum(), messages))
+    assert outcomes[0] == outcomes[1]
+
+
+def test_csharp_incremental_build_gives_same_results(
+    tmp_path: Path, pytestconfig: pytest.Config
+):
+    cache_directory = tmp_path / "cache"
+    for solution in ("correct", "comp-error"):
+        outcomes = []
+        for incremental in (False, True):
+            workdir = tmp_path / f"{solution}-{incremental}"
+            workdir.mkdir()
+            options: dict[str, Any] = {
+                "language": {"csharp": {"incremental_build": incremental}}
+            }
+            if incremental:
+                options["cache_directory"] = str(cache_directory)
+            conf = configuration(
+                pytestconfig,
+                "echo",
+                "csharp",
+                workdir,
+                "two.tson",
+                solution,
+                {"options": options},
+            )
+            result = execute_config(conf)
+            updates = assert_valid_output(result, pytestconfig)
+            # The compiler messages contain the working directory.
+            messages = str(updates.find_all("append-message"))
+            outcomes.append(
+                (updates.find_status_enum(), messages.replace(str(workdir), ""))
+            )
+        assert outcomes[0] == outcomes[1]
+    # The project is restored only once.
+    assert len(list((cache_directory / "dotnet").glob("[!.]*"))) == 1
+
+
 @pytest.mark.parametrize(
     "lang", ["python", "java", "c", "javascript", "kotlin", "bash", "csharp"]
 )
@@ -712,3 +898,56 @@ def test_stdin_token_is_unique(tmp_path: Path, pytestconfig: pytest.Config):
     assert (
         actual.description == "$ submission hello << 'STDINN'\nOne line\nSTDIN\nSTDINN"
     )
+
+
+@pytest.mark.parametrize("language", ["python", "bash"])
+def test_output_limit_is_enforced(
+    language: str, tmp_path: Path, pytestconfig: pytest.Config
+):
+    config_ = {"output_limit": 100 * 1024, "time_limit": 20}
+    conf = configuration(
+        pytestconfig, "echo", language, tmp_path, "two.tson", "infinite-output", config_
+    )
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    # The judgement stops after the first context.
+    assert updates.find_status_enum() == ["output limit exceeded"] * 2 + ["wrong"]
+
+
+def test_values_and_exceptions_share_output_limit(tmp_path: Path):
+    (tmp_path / "values.txt").write_text("é" * 30)
+    (tmp_path / "exceptions.txt").write_text("x" * 30)
+    # The limit is in bytes, and "é" is two bytes.
+    values, size, exceeded = _get_contents_or_empty(tmp_path / "values.txt", 80)
+    assert (values, size, exceeded) == ("é" * 30, 60, False)
+    exceptions, _, exceeded = _get_contents_or_empty(
+        tmp_path / "exceptions.txt", 80 - size
+    )
+    assert (exceptions, exceeded) == ("x" * 20, True)
+
+
+@pytest.mark.parametrize("language", ["python", "c"])
+def test_timing_statistics_are_reported(
+    language: str, tmp_path: Path, pytestconfig: pytest.Config
+):
+    config_ = {"timing_statistics": True}
+    conf = configuration(
+        pytestconfig, "echo", language, tmp_path, "two.tson", "correct", config_
+    )
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    assert updates.find_status_enum() == ["correct"] * 2
+
+    messages = [x["message"] for x in updates.find_all("append-message")]
+    assert any(x.get("permission") == "staff" for x in messages)
+
+    with open(tmp_path / "timing-statistics.json") as f:
+        statistics = json.load(f)
+    phases = {(x["phase"], x["unit"]) for x in statistics["phases"]}
+    assert ("generation", None) in phases
+    executions = [x for x in statistics["phases"] if x["phase"] == "execution"]
+    assert executions
+    for execution in executions:
+        assert execution["commands"] == 1
+        assert execution["output_bytes"] > 0
+        assert 0 < execution["budget_used"] < 1
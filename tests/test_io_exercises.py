@@ -3,6 +3,7 @@ Tests specifically for IO exercises.
 """
 
 import shutil
+import stat
 from pathlib import Path
 
 import pytest
@@ -63,6 +64,35 @@ def test_io_function_file_input_exercise(
     assert updates.find_status_enum() == ["correct"]
 
 
+@pytest.mark.parametrize("language", ["python", "c"])
+def test_io_function_file_input_exercise_with_links(
+    language: str, tmp_path: Path, pytestconfig: pytest.Config
+):
+    conf = configuration(
+        pytestconfig,
+        "echo-function-file-input",
+        language,
+        tmp_path,
+        "one.tson",
+        "correct",
+        {"options": {"link_workdir_files": True}},
+    )
+    shutil.copytree(
+        Path(conf.resources).parent / "workdir", tmp_path, dirs_exist_ok=True
+    )
+    data = tmp_path / "data.txt"
+    data.chmod(0o444)
+    writable = tmp_path / "writable.txt"
+    writable.write_text("")
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    assert updates.find_status_enum() == ["correct"]
+    # The execution units share the read-only data file, but not the other file.
+    assert data.stat().st_nlink > 1
+    assert writable.stat().st_nlink == 1
+    assert writable.stat().st_mode & stat.S_IWUSR
+
+
 @pytest.mark.parametrize("language", ALL_LANGUAGES)
 def test_io_function_file_output_exercise(
     language: str, tmp_path: Path, pytestconfig: pytest.Config
@@ -0,0 +1,61 @@
+"""
+Tests for the resource limits of executions.
+"""
+
+import sys
+from pathlib import Path
+
+from tested.judge.limits import MemoryLimit
+from tested.judge.utils import run_command
+
+_ALLOCATE = (
+    "data = bytearray({size} * 1024 * 1024); data[::4096] = b'x' * len(data[::4096])"
+)
+
+
+def test_peak_memory_is_measured(tmp_path: Path):
+    command = [sys.executable, "-c", _ALLOCATE.format(size=100)]
+    result = run_command(tmp_path, 60, command, memory_limit=1024 * 1024 * 1024)
+
+    assert result is not None
+    assert result.exit == 0
+    assert result.peak_memory is not None
+    assert result.peak_memory >= 100 * 1024 * 1024
+
+
+def test_memory_limit_is_enforced(tmp_path: Path):
+    # Live long enough for the peak memory to be measured, even on a busy machine.
+    steps = [_ALLOCATE.format(size=64), "import time; time.sleep(1)"]
+    code = "; ".join([*steps, _ALLOCATE.format(size=512)])
+    command = [sys.executable, "-c", code]
+    result = run_command(
+        tmp_path,
+        60,
+        command,
+        memory_limit=256 * 1024 * 1024,
+        limit_address_space=True,
+    )
+
+    assert result is not None
+    assert result.exit != 0
+    assert result.memory
+    assert result.peak_memory is not None
+    assert result.peak_memory < 256 * 1024 * 1024
+
+
+def test_address_space_limit_is_applied_before_the_command(tmp_path: Path):
+    limit = MemoryLimit(256 * 1024 * 1024, None, True)
+    code = "import resource; print(resource.getrlimit(resource.RLIMIT_AS)[0])"
+    command = limit.wrap([sys.executable, "-c", code])
+    result = run_command(tmp_path, 60, command)
+
+    assert result is not None
+    assert result.stdout.strip() == str(256 * 1024 * 1024)
+
+
+def test_failure_without_memory_error_is_not_out_of_memory():
+    limit = MemoryLimit(256 * 1024 * 1024, None, True)
+
+    assert limit.exceeded(1, "MemoryError\n")
+    assert not limit.exceeded(1, "ZeroDivisionError\n")
+    assert not limit.exceeded(0, "MemoryError\n")
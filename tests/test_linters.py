@@ -1,7 +1,11 @@
+import os
+import shutil
 from pathlib import Path
 
 import pytest
 
+from tested.judge.servers import find_jar, nailgun_installed
+from tested.utils import recursive_dict_merge
 from tests.manual_utils import assert_valid_output, configuration, execute_config
 
 
@@ -12,6 +16,15 @@ def _get_config_options(language: str) -> list[dict]:
     ]
 
 
+def _linter_server(installed: bool):
+    # Without the server, the normal linter would run, which is tested above.
+    return pytest.param(
+        {"options": {"linter": True, "linter_server": True}},
+        id="linter_server",
+        marks=pytest.mark.skipif(not installed, reason="Linter server not installed"),
+    )
+
+
 @pytest.mark.parametrize("config", _get_config_options("c"))
 def test_cppcheck(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     conf = configuration(
@@ -28,7 +41,11 @@ def test_cppcheck(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     assert len(updates.find_all("annotate-code")) > 0
 
 
-@pytest.mark.parametrize("config", _get_config_options("java"))
+@pytest.mark.parametrize(
+    "config",
+    _get_config_options("java")
+    + [_linter_server(nailgun_installed() and find_jar("checkstyle") is not None)],
+)
 def test_checkstyle(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     conf = configuration(
         pytestconfig,
@@ -44,7 +61,11 @@ def test_checkstyle(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     assert len(updates.find_all("annotate-code")) > 0
 
 
-@pytest.mark.parametrize("config", _get_config_options("javascript"))
+@pytest.mark.parametrize(
+    "config",
+    _get_config_options("javascript")
+    + [_linter_server(shutil.which("eslint_d") is not None)],
+)
 def test_eslint(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     conf = configuration(
         pytestconfig,
@@ -86,7 +107,11 @@ def test_hlint(
     assert len(updates.find_all("annotate-code")) > 0
 
 
-@pytest.mark.parametrize("config", _get_config_options("kotlin"))
+@pytest.mark.parametrize(
+    "config",
+    _get_config_options("kotlin")
+    + [_linter_server(nailgun_installed() and find_jar("ktlint") is not None)],
+)
 def test_ktlint(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     conf = configuration(
         pytestconfig, "counter", "kotlin", tmp_path, "plan.yaml", "solution", config
@@ -96,6 +121,34 @@ def test_ktlint(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     assert len(updates.find_all("annotate-code")) > 0
 
 
+# CodeNarc is not installed as a command, so its jars (and the Nextflow rules) are
+# found in this directory.
+_CODENARC_PATH = os.environ.get("CODENARC_PATH")
+
+
+@pytest.mark.skipif(_CODENARC_PATH is None, reason="CODENARC_PATH not set")
+@pytest.mark.parametrize(
+    "config",
+    _get_config_options("nextflow") + [_linter_server(nailgun_installed())],
+)
+def test_codenarc(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
+    codenarc = {
+        "options": {"language": {"nextflow": {"codenarc_path": _CODENARC_PATH}}}
+    }
+    conf = configuration(
+        pytestconfig,
+        "echo-function",
+        "nextflow",
+        tmp_path,
+        "one.tson",
+        "correct-codenarc",
+        recursive_dict_merge(config, codenarc),
+    )
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    assert len(updates.find_all("annotate-code")) > 0
+
+
 @pytest.mark.parametrize("config", _get_config_options("python"))
 def test_pylint(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     conf = configuration(
@@ -112,6 +165,28 @@ def test_pylint(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     assert len(updates.find_all("annotate-code")) > 0
 
 
+@pytest.mark.parametrize("parallel", [False, True])
+def test_linter_results_come_before_first_tab(
+    tmp_path: Path, parallel: bool, pytestconfig: pytest.Config
+):
+    config = {"options": {"linter": True, "parallel": parallel}}
+    conf = configuration(
+        pytestconfig,
+        "counter",
+        "python",
+        tmp_path,
+        "plan.yaml",
+        "solution-pylint",
+        config,
+    )
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    commands = [x["command"] for x in updates]
+    assert "annotate-code" in commands
+    first_tab = commands.index("start-tab")
+    assert "annotate-code" not in commands[first_tab:]
+
+
 @pytest.mark.parametrize("config", _get_config_options("bash"))
 def test_shellcheck_wrong(tmp_path: Path, config: dict, pytestconfig: pytest.Config):
     conf = configuration(
@@ -132,3 +207,15 @@ def test_shellcheck_warning(tmp_path: Path, config: dict, pytestconfig: pytest.C
     assert len(updates.find_all("annotate-code")) == 1
     [annotation] = updates.find_all("annotate-code")
     assert annotation["externalUrl"]
+
+
+def test_jar_of_wrapper_script_is_found(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    script = tmp_path / "checkstyle"
+    script.write_text('#!/bin/sh\nexec java -jar /opt/checkstyle-all.jar "$@"\n')
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path))
+
+    assert find_jar("checkstyle") == "/opt/checkstyle-all.jar"
+    assert find_jar("ktlint") is None
@@ -2,10 +2,24 @@
 Test full exercises with the parallel option.
 """
 
+import sys
+import threading
 from pathlib import Path
 
 import pytest
+from pytest_mock import MockerFixture
 
+from tested.configs import create_bundle
+from tested.judge import core
+from tested.judge.durations import DurationStore, get_duration_store, longest_first
+from tested.judge.planning import (
+    PlannedContext,
+    PlannedExecutionUnit,
+    PlanStrategy,
+    plan_test_suite,
+)
+from tested.judge.scheduling import UnitScheduler, available_cpus
+from tested.main import load_suite
 from tests.language_markers import ALL_LANGUAGES
 from tests.manual_utils import assert_valid_output, configuration, execute_config
 
@@ -71,3 +85,184 @@ def test_parallel_echo(lang: str, tmp_path: Path, pytestconfig: pytest.Config):
     updates = assert_valid_output(result, pytestconfig)
     assert len(updates.find_all("start-testcase")) == 50
     assert updates.find_status_enum() == ["correct"] * 50
+
+
+@pytest.mark.parametrize("lang", ["python", "c", "bash"])
+def test_parallel_echo_with_asyncio_engine(
+    lang: str, tmp_path: Path, pytestconfig: pytest.Config
+):
+    config_ = {"options": {"parallel": True, "engine": "asyncio"}}
+    conf = configuration(
+        pytestconfig, "echo", lang, tmp_path, "full.tson", "correct", options=config_
+    )
+    result = execute_config(conf)
+    updates = assert_valid_output(result, pytestconfig)
+    assert len(updates.find_all("start-testcase")) == 50
+    assert updates.find_status_enum() == ["correct"] * 50
+
+
+def test_parallel_echo_records_durations(
+    tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
+):
+    mocker.patch("tested.judge.planning.available_cpus", return_value=2)
+    cache_directory = tmp_path / "cache"
+    config_ = {"options": {"parallel": True, "cache_directory": str(cache_directory)}}
+    orders = []
+    for run in ("first", "second"):
+        workdir = tmp_path / run
+        workdir.mkdir()
+        conf = configuration(
+            pytestconfig, "echo", "python", workdir, "full.tson", "correct", config_
+        )
+        spy = mocker.spy(core, "longest_first")
+        result = execute_config(conf)
+        updates = assert_valid_output(result, pytestconfig)
+        assert updates.find_status_enum() == ["correct"] * 50
+        units, _ = spy.call_args.args
+        orders.append((units, spy.spy_return))
+        mocker.stop(spy)
+
+        bundle = create_bundle(conf, sys.stdout, load_suite(conf))
+        durations = get_duration_store(bundle)
+        assert durations is not None
+        recorded = durations.get()
+        assert recorded and all(x > 0 for x in recorded.values())
+        if run == "first":
+            # Make the last context slow, so its unit is started first next time.
+            last = plan_test_suite(bundle, PlanStrategy.CONTEXT)[-1]
+            for _ in range(10):
+                durations.record(last, 100)
+
+    first_units, first_order = orders[0]
+    assert first_order == list(range(len(first_units)))
+    second_units, second_order = orders[1]
+    assert second_order[0] == len(second_units) - 1
+
+
+def test_longest_units_are_started_first(tmp_path: Path):
+    units = [
+        PlannedExecutionUnit(
+            contexts=[PlannedContext(context=None, tab_index=0, context_index=i)],  # type: ignore
+            name=f"execution_{i}",
+            index=i,
+        )
+        for i in range(4)
+    ]
+    store = DurationStore(tmp_path / "durations.sqlite", "exercise")
+    store.record(units[0], 1.0)
+    store.record(units[1], 3.0)
+    store.record(units[2], 2.0)
+    store.record(units[2], 4.0)
+
+    assert store.get()["0.2-0.2"] == 3.0
+    # The unit without a recorded duration is started first.
+    assert longest_first(units, store.get()) == [3, 1, 2, 0]
+
+
+def test_least_recently_updated_durations_are_removed(tmp_path: Path):
+    units = [
+        PlannedExecutionUnit(
+            contexts=[PlannedContext(context=None, tab_index=0, context_index=i)],  # type: ignore
+            name=f"execution_{i}",
+            index=i,
+        )
+        for i in range(3)
+    ]
+    store = DurationStore(tmp_path / "durations.sqlite", "exercise")
+    for unit in units:
+        store.record(unit, 1.0)
+    store.record(units[0], 1.0)
+
+    store = DurationStore(tmp_path / "durations.sqlite", "exercise", limit=2)
+    assert set(store.get()) == {"0.0-0.0", "0.2-0.2"}
+
+
+def _contexts(units: list[PlannedExecutionUnit]) -> list[tuple[int, int]]:
+    return [(c.tab_index, c.context_index) for u in units for c in u.contexts]
+
+
+@pytest.mark.parametrize("cpus", [1, 4])
+def test_balanced_plan_uses_available_workers(
+    cpus: int, tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
+):
+    mocker.patch("tested.judge.planning.available_cpus", return_value=cpus)
+    config_ = {"options": {"parallel": True}}
+    conf = configuration(
+        pytestconfig,
+        "echo-function",
+        "python",
+        tmp_path,
+        "full.tson",
+        "correct",
+        config_,
+    )
+    bundle = create_bundle(conf, sys.stdout, load_suite(conf))
+
+    optimal = plan_test_suite(bundle, PlanStrategy.OPTIMAL)
+    balanced = plan_test_suite(bundle, PlanStrategy.BALANCED)
+
+    assert len(optimal) == 1
+    assert len(balanced) == cpus
+    assert _contexts(balanced) == _contexts(optimal)
+
+
+def test_balanced_plan_uses_recorded_durations(
+    tmp_path: Path, pytestconfig: pytest.Config, mocker: MockerFixture
+):
+    mocker.patch("tested.judge.planning.available_cpus", return_value=2)
+    cache_directory = tmp_path / "cache"
+    config_ = {"options": {"parallel": True, "cache_directory": str(cache_directory)}}
+    conf = configuration(
+        pytestconfig,
+        "echo-function",
+        "python",
+        tmp_path,
+        "full.tson",
+        "correct",
+        config_,
+    )
+    bundle = create_bundle(conf, sys.stdout, load_suite(conf))
+    durations = get_duration_store(bundle)
+    assert durations is not None
+    contexts = plan_test_suite(bundle, PlanStrategy.CONTEXT)
+    durations.record(contexts[0], 10)
+    for unit in contexts[1:]:
+        durations.record(unit, 0.1)
+
+    balanced = plan_test_suite(bundle, PlanStrategy.BALANCED)
+
+    # The slow context is executed on its own.
+    assert [len(u.contexts) for u in balanced] == [1, 49]
+
+
+def test_scheduler_admits_units_within_budget():
+    scheduler = UnitScheduler(cpus=3, memory=1000)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def unit(cpus: int, memory: int):
+        with scheduler.admit(cpus, memory):
+            with lock:
+                running.append((cpus, memory))
+                peak.append((sum(x for x, _ in running), sum(y for _, y in running)))
+            threading.Event().wait(0.05)
+            with lock:
+                running.remove((cpus, memory))
+
+    threads = [
+        threading.Thread(target=unit, args=args)
+        for args in [(2, 100), (1, 100), (1, 100), (1, 600), (1, 600), (3, 100)]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(peak) == 6
+    assert max(cpus for cpus, _ in peak) <= 3
+    assert max(memory for _, memory in peak) <= 1000
+
+
+def test_available_cpus_is_positive():
+    assert available_cpus() >= 1
@@ -1,4 +1,7 @@
 import json
+import sys
+import threading
+import time
 from pathlib import Path
 
 import pytest
@@ -9,6 +12,8 @@ from tested.datatypes import (
     AdvancedSequenceTypes,
     BasicNumericTypes,
 )
+from tested.judge.directories import clone_file
+from tested.judge.utils import cancellable, run_command
 from tested.serialisation import NothingType, NumberType, SequenceType
 from tested.utils import sorted_no_duplicates, sorting_value_extract
 from tests.manual_utils import assert_valid_output, configuration, execute_config
@@ -271,3 +276,58 @@ def test_invalid_utf8_output_is_caught(tmp_path: Path, pytestconfig: pytest.Conf
     result = execute_config(conf)
     updates = assert_valid_output(result, pytestconfig)
     assert updates.find_status_enum() == ["wrong"] * 5
+
+
+def test_cloned_file_is_independent_copy(tmp_path: Path):
+    origin = tmp_path / "origin.txt"
+    origin.write_text("original")
+    clone = tmp_path / "clone.txt"
+    clone_file(origin, clone)
+
+    assert clone.read_text() == "original"
+    assert not clone.samefile(origin)
+    clone.write_text("modified")
+    assert origin.read_text() == "original"
+
+
+def test_timeout_is_precise_and_kills_process_group(tmp_path: Path):
+    # The shell starts a child that would outlive it, and prints its process id.
+    command = ["sh", "-c", "sleep 60 & echo $!; wait"]
+    start = time.monotonic()
+    result = run_command(tmp_path, 0.5, command)
+    assert result is not None
+    assert result.timeout
+    assert time.monotonic() - start < 2
+
+    # The killed child might be a zombie until its new parent reaps it.
+    for _ in range(50):
+        try:
+            stat = Path(f"/proc/{result.stdout.strip()}/stat").read_text()
+            if stat.split(")")[-1].split()[0] in ("Z", "X"):
+                break
+        except FileNotFoundError:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail("The child of the command was not killed.")
+
+
+def test_timeout_after_output_is_closed(tmp_path: Path):
+    # The command keeps running after closing its output.
+    code = "import os, time; os.close(1); os.close(2); time.sleep(30)"
+    start = time.monotonic()
+    result = run_command(tmp_path, 1, [sys.executable, "-c", code])
+    assert result is not None
+    assert result.timeout
+    assert time.monotonic() - start < 3
+
+
+def test_cancelled_command_is_killed(tmp_path: Path):
+    cancelled = threading.Event()
+    threading.Timer(0.5, cancelled.set).start()
+    start = time.monotonic()
+    with cancellable(cancelled):
+        result = run_command(tmp_path, 60, ["sleep", "30"])
+    assert result is not None
+    assert result.timeout
+    assert time.monotonic() - start < 3